@@ -0,0 +1,58 @@
+"""Operational admin endpoints (profiling, runtime settings)."""
+
+import time
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.services.auth_service import get_current_admin_user
+from app.utils.logging import logger
+from app.utils.profiling import MAX_PROFILE_SECONDS, loop_lag_monitor, profile_async
+from app.utils.settings import live_settings
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.post(
+    "/profile",
+    summary="Profile this API process",
+    response_class=PlainTextResponse,
+)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS, description="Sampling duration"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="Sampling interval in milliseconds"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Run a statistical sampling profiler on this process for N seconds.
+
+    Returns collapsed stacks (``frame;frame;frame count``) that can be
+    rendered with flamegraph.pl, speedscope or inferno. Only the worker
+    process that receives the request is profiled.
+    """
+    logger.info(
+        "Profiling requested",
+        extra={"username": current_user["username"], "seconds": seconds}
+    )
+    collapsed = await profile_async(seconds, interval=interval_ms / 1000)
+    filename = f"automation-{int(time.time())}.collapsed"
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/loop-lag", summary="Current event loop lag")
+async def loop_lag(_current_user: dict = Depends(get_current_admin_user)):
+    """Return the most recent event loop lag measurement of this process."""
+    return {
+        "lag_seconds": loop_lag_monitor.last_lag,
+        "max_lag_seconds": loop_lag_monitor.max_lag,
+        "interval": loop_lag_monitor.interval,
+    }
+
+
+@router.get("/settings", summary="Runtime settings of this process")
+async def runtime_settings(_current_user: dict = Depends(get_current_admin_user)):
+    """Return this process's runtime settings, their live overrides and sources."""
+    return live_settings.snapshot()
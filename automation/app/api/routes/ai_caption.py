@@ -1,13 +1,16 @@
 """AI caption generation endpoint routes."""
 
-from typing import List
+import math
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
 from app.services.ai_caption import AICaptionService
+from app.services.llm_usage import TokenBudgetExceeded
 from app.services.auth_service import get_current_active_user
 from app.utils.logging import logger
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
@@ -23,12 +26,33 @@ class AICaptionRequest(BaseModel):
         default=[],
         description="List of trending keywords or topics"
     )
+    platform: str = Field(
+        default="instagram",
+        description="Target platform, used for the recommended posting time"
+    )
+    audience: str = Field(
+        default="default",
+        description="Audience segment, used for the recommended posting time"
+    )
+
+
+class AICaptionResponse(BaseModel):
+    """Response model for AI caption endpoint."""
+    caption: str
+    hashtags: List[str]
+    recommended_time: Optional[str] = None
+    recommended_day: Optional[str] = None
 
 
-@router.post("/caption", summary="Generate AI caption and hashtags")
+@router.post(
+    "/caption",
+    summary="Generate AI caption and hashtags",
+    response_model=AICaptionResponse,
+    response_class=FastJSONResponse,
+)
 async def generate_ai_caption(
     request: AICaptionRequest,
-    _current_user: dict = Depends(get_current_active_user)
+    current_user: dict = Depends(get_current_active_user)
 ):
     """
     Generate social media caption and hashtags using AI.
@@ -48,16 +72,26 @@ async def generate_ai_caption(
         result = await AICaptionService.generate_caption(
             topic=request.topic,
             trend=request.trend,
-            style=request.style
+            style=request.style,
+            platform=request.platform,
+            audience=request.audience,
+            user=current_user.get("username")
         )
 
-        # Return direct format: { caption, hashtags, recommended_time }
-        return {
+        # Return direct format: { caption, hashtags, recommended_time, recommended_day }
+        return FastJSONResponse({
             "caption": result.get("caption"),
             "hashtags": result.get("hashtags"),
-            "recommended_time": result.get("recommended_time")
-        }
+            "recommended_time": result.get("recommended_time"),
+            "recommended_day": result.get("recommended_day")
+        })
 
+    except TokenBudgetExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Token budget exceeded",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
     except Exception as e:
         logger.error("AI caption generation error", extra={"error": str(e)}, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") from e
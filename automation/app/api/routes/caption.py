@@ -1,6 +1,6 @@
 """Caption generation endpoint routes."""
 
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 from app.services.caption_service import CaptionService
 from app.services.auth_service import get_current_active_user
 from app.utils.logging import logger
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api", tags=["caption"])
 
@@ -23,7 +24,27 @@ class GenerateCaptionRequest(BaseModel):
     )
 
 
-@router.post("/generate_caption", summary="Generate caption and hashtags using AI")
+class CaptionData(BaseModel):
+    """Generated caption."""
+    caption: str
+    hashtags: List[str]
+    provider: str = Field(..., description="openai or huggingface")
+    model: Optional[str] = None
+    style: Optional[str] = None
+
+
+class GenerateCaptionResponse(BaseModel):
+    """Response model for generate caption endpoint."""
+    success: bool
+    data: CaptionData
+
+
+@router.post(
+    "/generate_caption",
+    summary="Generate caption and hashtags using AI",
+    response_model=GenerateCaptionResponse,
+    response_class=FastJSONResponse,
+)
 async def generate_caption(
     request: GenerateCaptionRequest,
     _current_user: dict = Depends(get_current_active_user)
@@ -49,10 +70,10 @@ async def generate_caption(
             style=request.style
         )
 
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": result
-        }
+        })
 
     except Exception as e:
         logger.error("Caption generation error", extra={"error": str(e)}, exc_info=True)
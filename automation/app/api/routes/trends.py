@@ -1,13 +1,18 @@
 """Trends endpoint routes."""
 
-from typing import List, Optional
+import math
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.trends_export import EXPORT_MAX_KEYWORDS, MEDIA_TYPES, TrendsExport
 from app.services.trends_service import TrendsService
 from app.services.auth_service import get_current_active_user
 from app.utils.logging import logger
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api/trends", tags=["trends"])
 
@@ -25,7 +30,35 @@ class FetchTrendsRequest(BaseModel):
     )
 
 
-@router.post("/fetch", summary="Fetch trends from social media platforms")
+class TrendsData(BaseModel):
+    """Trends returned by one provider."""
+    platform: str = Field(..., description="Source platform")
+    trends: List[Dict[str, Any]] = Field(..., description="Trend records as returned by the provider")
+    timeframe: Optional[str] = Field(None, description="Timeframe (Google Trends)")
+    cached: bool = Field(False, description="Served from cache while the provider is unavailable")
+
+
+class FetchTrendsResponse(BaseModel):
+    """Response model for fetch trends endpoint."""
+    success: bool
+    data: TrendsData
+
+
+class ExportTrendsRequest(BaseModel):
+    """Request model for the export endpoint (for keyword sets too long for a URL)."""
+    platform: str = Field(..., description="Platform to fetch from (google, reddit, twitter)")
+    keywords: List[str] = Field(default=[], description="Keywords to export, in output order")
+    timeframe: str = Field(default="today 12-m", description="Timeframe for Google Trends")
+    format: Literal["ndjson", "csv"] = Field(default="ndjson", description="Output format")
+    cursor: Optional[str] = Field(None, description="Resume after the record carrying this cursor")
+
+
+@router.post(
+    "/fetch",
+    summary="Fetch trends from social media platforms",
+    response_model=FetchTrendsResponse,
+    response_class=FastJSONResponse,
+)
 async def fetch_trends(
     request: FetchTrendsRequest,
     _current_user: dict = Depends(get_current_active_user)
@@ -52,13 +85,100 @@ async def fetch_trends(
             timeframe=request.timeframe or "today 12-m"
         )
 
-        return {
+        # Returned as a response so FastAPI skips re-validating and re-encoding it
+        return FastJSONResponse({
             "success": True,
             "data": result
-        }
+        })
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    except CircuitOpenError as e:
+        raise _unavailable(e) from e
     except Exception as e:
         logger.error("Trends fetch error", extra={"error": str(e)}, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+def _unavailable(error: CircuitOpenError) -> HTTPException:
+    """503 for a provider whose circuit breaker is open."""
+    return HTTPException(
+        status_code=503,
+        detail="Trends provider temporarily unavailable",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after), 1))},
+    )
+
+
+def _export_response(request: ExportTrendsRequest) -> StreamingResponse:
+    """Validate an export request and stream it."""
+    if len(request.keywords) > EXPORT_MAX_KEYWORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {EXPORT_MAX_KEYWORDS} keywords per export"
+        )
+    try:
+        export = TrendsExport(request.platform, request.keywords, request.timeframe)
+        export.parse_cursor(request.cursor)
+    except ValueError as e:  # Unsupported platform or invalid cursor
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    try:
+        # Refuse up front rather than cutting the stream off at the first batch
+        TrendsService.breaker(export.platform).check()
+    except CircuitOpenError as e:
+        raise _unavailable(e) from e
+
+    logger.info(
+        "Trends export request",
+        extra={
+            "platform": request.platform,
+            "keyword_count": len(request.keywords),
+            "format": request.format,
+            "resumed": request.cursor is not None,
+        }
+    )
+    body = export.csv(request.cursor) if request.format == "csv" else export.ndjson(request.cursor)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[request.format],
+        headers={"Content-Disposition": f'attachment; filename="trends-{export.platform}.{request.format}"'},
+    )
+
+
+@router.get(
+    "/export",
+    summary="Stream trends for many keywords as NDJSON or CSV",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+async def export_trends(
+    platform: str = Query(..., description="Platform to fetch from (google, reddit, twitter)"),
+    keywords: List[str] = Query(default=[], description="Keywords to export (repeat the parameter)"),
+    timeframe: str = Query(default="today 12-m", description="Timeframe for Google Trends"),
+    format: Literal["ndjson", "csv"] = Query(default="ndjson", description="Output format"),  # pylint: disable=redefined-builtin
+    cursor: Optional[str] = Query(None, description="Resume after the record carrying this cursor"),
+    _current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Stream trend records while the provider fetches are still running.
+
+    Keywords are fetched in batches, a few concurrently, and written out in
+    order. Each record carries a `cursor`; after a broken download, repeat
+    the request with the `cursor` of the last complete record to resume.
+    """
+    return _export_response(ExportTrendsRequest(
+        platform=platform, keywords=keywords, timeframe=timeframe, format=format, cursor=cursor
+    ))
+
+
+@router.post(
+    "/export",
+    summary="Stream trends for many keywords as NDJSON or CSV",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}},
+)
+async def export_trends_post(
+    request: ExportTrendsRequest,
+    _current_user: dict = Depends(get_current_active_user)
+):
+    """Same as `GET /api/trends/export`, for keyword sets too long for a URL."""
+    return _export_response(request)
@@ -1,17 +1,30 @@
 """Upload endpoint routes."""
 
-from typing import List, Optional
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Union
 
-import httpx
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
+from app.services.idempotency import UploadInProgressError
+from app.services.posting_time import PLATFORM_PRIOR_HOURS, posting_time_recommender
+from app.services.upload_queue import UploadQueue
 from app.services.upload_service import UploadService
 from app.services.auth_service import get_current_active_user
 from app.utils.logging import logger
+from app.utils.responses import FastJSONResponse
+from app.utils.tracing import stage
 
 router = APIRouter(prefix="/api", tags=["upload"])
 
+# Enqueue uploads by default instead of only with "Prefer: respond-async"
+UPLOAD_ASYNC_DEFAULT = os.getenv("UPLOAD_ASYNC_DEFAULT", "false").lower() == "true"
+
+# Largest array accepted by POST /api/upload/bulk
+UPLOAD_BULK_MAX_ITEMS = int(os.getenv("UPLOAD_BULK_MAX_ITEMS", "500"))
+
 
 class UploadRequest(BaseModel):
     """Request model for upload endpoint."""
@@ -31,16 +44,101 @@ class UploadRequest(BaseModel):
     )
 
 
-@router.post("/upload", summary="Upload content to social media platform")
+class UploadResult(BaseModel):
+    """Outcome of an upload."""
+    status: str = Field(..., description="posted or failed")
+    platform: Optional[str] = None
+    scheduled_post_id: Optional[int] = None
+    post_url: Optional[str] = None
+    message: Optional[str] = None
+    duplicate: bool = Field(False, description="Result of an earlier identical upload")
+
+
+class QueuedUpload(BaseModel):
+    """Handle of an upload queued for the worker."""
+    task_id: str
+    status: str
+    status_url: str
+
+
+class UploadResponse(BaseModel):
+    """Response model for upload endpoint (QueuedUpload data with status 202)."""
+    success: bool
+    message: str
+    data: Union[UploadResult, QueuedUpload]
+
+
+class EngagementReport(BaseModel):
+    """Engagement of a published post, reported once by the backend."""
+    platform: str = Field(..., description="Platform the post was published to")
+    posted_at: datetime = Field(..., description="When the post was published (UTC if no offset)")
+    engagement: float = Field(0.0, ge=0, description="Likes + comments + shares")
+    impressions: float = Field(0.0, ge=0, description="Impressions of the post")
+    audience: str = Field("default", min_length=1, max_length=64, description="Audience segment")
+
+
+class BulkUploadItem(BaseModel):
+    """Per-item result of a bulk upload request."""
+    index: int
+    status: str = Field(..., description="queued or rejected")
+    task_id: Optional[str] = None
+    status_url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResponse(BaseModel):
+    """Response model for bulk upload endpoint."""
+    success: bool
+    message: str
+    data: List[BulkUploadItem]
+
+
+class UploadStatus(BaseModel):
+    """State of a queued upload."""
+    task_id: str
+    status: str = Field(..., description="queued, running, retrying, succeeded or failed")
+    result: Optional[UploadResult] = None
+    error: Optional[str] = None
+
+
+class UploadStatusResponse(BaseModel):
+    """Response model for upload status endpoint."""
+    success: bool
+    data: UploadStatus
+
+
+def _wants_async(prefer: Optional[str]) -> bool:
+    """Whether the client asked for (or the deployment defaults to) async mode (RFC 7240)."""
+    if prefer:
+        preferences = {p.strip().lower() for p in prefer.split(",")}
+        if "respond-async" in preferences:
+            return True
+        if "wait" in preferences or any(p.startswith("wait=") for p in preferences):
+            return False
+    return UPLOAD_ASYNC_DEFAULT
+
+
+@router.post(
+    "/upload",
+    summary="Upload content to social media platform",
+    response_model=UploadResponse,
+    response_class=FastJSONResponse,
+    responses={202: {"description": "Upload queued (async mode)"}},
+)
 async def upload_content(
     request: UploadRequest,
     background_tasks: BackgroundTasks,
+    prefer: Optional[str] = Header(None),
     _current_user: dict = Depends(get_current_active_user)
 ):
     """
     Upload content manually to Instagram or LinkedIn.
 
     If callback_url is provided, will send callback when upload is complete.
+
+    With ``Prefer: respond-async`` (or ``UPLOAD_ASYNC_DEFAULT=true``) the
+    upload is handed to the Celery worker and the response is ``202`` with
+    a task ID to poll at ``GET /api/upload/{task_id}``.
     """
     try:
         logger.info(
@@ -51,6 +149,29 @@ async def upload_content(
             }
         )
 
+        if _wants_async(prefer):
+            if request.platform.lower() not in UploadService.SUPPORTED_PLATFORMS:
+                raise ValueError(f"Unsupported platform: {request.platform}")
+            with stage('upload', 'enqueue'):
+                task_id = await run_in_threadpool(
+                    UploadQueue.enqueue,
+                    platform=request.platform,
+                    content=request.content,
+                    media_urls=request.media_urls or [],
+                    scheduled_post_id=request.scheduled_post_id,
+                    callback_url=request.callback_url,
+                )
+            status_url = f"{router.prefix}/upload/{task_id}"
+            return FastJSONResponse(
+                status_code=202,
+                headers={"Location": status_url, "Preference-Applied": "respond-async"},
+                content={
+                    "success": True,
+                    "message": "Upload queued",
+                    "data": {"task_id": task_id, "status": "queued", "status_url": status_url},
+                },
+            )
+
         # Perform upload
         result = await UploadService.upload_to_platform(
             platform=request.platform,
@@ -69,32 +190,162 @@ async def upload_content(
                 result
             )
 
-        return {
+        return FastJSONResponse({
             "success": True,
             "message": "Upload initiated successfully",
             "data": result
-        }
+        })
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    except UploadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
     except Exception as e:
         logger.error("Upload endpoint error", extra={"error": str(e)}, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
+@router.post(
+    "/upload/bulk",
+    status_code=202,
+    summary="Queue many uploads at once",
+    response_model=BulkUploadResponse,
+    response_class=FastJSONResponse,
+)
+async def upload_bulk(
+    requests: List[UploadRequest],
+    _current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Queue an array of uploads for the Celery worker in one broker round trip.
+
+    Returns one entry per item, in order: ``task_id`` for queued items (poll
+    ``GET /api/upload/{task_id}``), or ``error`` for rejected ones.
+    """
+    if not requests:
+        raise HTTPException(status_code=422, detail="No uploads given")
+    if len(requests) > UPLOAD_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {UPLOAD_BULK_MAX_ITEMS} uploads per request"
+        )
+
+    items: List[dict] = []
+    accepted = []
+    for index, request in enumerate(requests):
+        if request.platform.lower() not in UploadService.SUPPORTED_PLATFORMS:
+            items.append({
+                "index": index,
+                "status": "rejected",
+                "error": f"Unsupported platform: {request.platform}",
+            })
+            continue
+        items.append({"index": index, "status": "queued"})
+        accepted.append(request)
+
+    if accepted:
+        try:
+            with stage('upload', 'enqueue_bulk'):
+                task_ids = await run_in_threadpool(UploadQueue.enqueue_many, [
+                    {
+                        "platform": request.platform,
+                        "content": request.content,
+                        "media_urls": request.media_urls or [],
+                        "scheduled_post_id": request.scheduled_post_id,
+                        "callback_url": request.callback_url,
+                    }
+                    for request in accepted
+                ])
+        except Exception as e:
+            logger.error("Bulk upload enqueue error", extra={"error": str(e)}, exc_info=True)
+            raise HTTPException(status_code=503, detail="Task queue unavailable") from e
+        queued = iter(task_ids)
+        for item in items:
+            if item["status"] == "queued":
+                item["task_id"] = next(queued)
+                item["status_url"] = f"{router.prefix}/upload/{item['task_id']}"
+
+    logger.info(
+        "Bulk upload request received",
+        extra={"count": len(requests), "queued": len(accepted)}
+    )
+    return FastJSONResponse(
+        status_code=202,
+        content={"success": True, "message": f"{len(accepted)} uploads queued", "data": items},
+    )
+
+
+@router.post(
+    "/upload/engagement",
+    summary="Report engagement of a published post",
+    response_class=FastJSONResponse,
+)
+async def report_engagement(
+    report: EngagementReport,
+    _current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Feed posting-time recommendations with the engagement a post received.
+
+    Report each post once, after its engagement has settled (e.g. a day
+    after publishing); every report counts as one more post in its slot.
+    """
+    platform = report.platform.lower()
+    if platform not in PLATFORM_PRIOR_HOURS:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {report.platform}")
+    posted_at = report.posted_at
+    if posted_at.tzinfo is not None:
+        posted_at = posted_at.astimezone(timezone.utc).replace(tzinfo=None)
+    await posting_time_recommender.record(
+        platform,
+        posted_at,
+        engagement=report.engagement,
+        impressions=report.impressions,
+        audience=report.audience,
+    )
+    return FastJSONResponse({"success": True, "message": "Engagement recorded"})
+
+
+@router.get(
+    "/upload/{task_id}",
+    summary="Status of a queued upload",
+    response_model=UploadStatusResponse,
+    response_class=FastJSONResponse,
+)
+async def upload_status(
+    task_id: str,
+    _current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Report the state of an upload queued in async mode.
+
+    ``status`` is one of queued, running, retrying, succeeded or failed;
+    unknown or expired task IDs report queued.
+    """
+    try:
+        status = await run_in_threadpool(UploadQueue.status, task_id)
+        return FastJSONResponse({"success": True, "data": status})
+    except Exception as e:
+        logger.error("Upload status error", extra={"task_id": task_id, "error": str(e)}, exc_info=True)
+        raise HTTPException(status_code=503, detail="Task backend unavailable") from e
+
+
 async def _send_callback(callback_url: str, scheduled_post_id: int, result: dict):
     """Send callback to backend webhook."""
+    import httpx  # pylint: disable=import-outside-toplevel  # only needed for callbacks
+
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                callback_url,
-                json={
-                    "scheduled_post_id": scheduled_post_id,
-                    "status": result.get("status", "posted"),
-                    "message": result.get("message"),
-                    "post_url": result.get("post_url"),
-                }
-            )
-            logger.info("Callback sent", extra={"callback_url": callback_url})
+        with stage('upload', 'callback'):
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                await client.post(
+                    callback_url,
+                    json={
+                        "scheduled_post_id": scheduled_post_id,
+                        "status": result.get("status", "posted"),
+                        "message": result.get("message"),
+                        "post_url": result.get("post_url"),
+                    }
+                )
+        logger.info("Callback sent", extra={"callback_url": callback_url})
     except Exception as e:  # pylint: disable=broad-except
         logger.error("Failed to send callback", extra={"error": str(e)}, exc_info=True)
@@ -1,10 +1,24 @@
-"""PostgreSQL database connection using SQLAlchemy async."""
+"""PostgreSQL database connection using SQLAlchemy async.
 
+The engine and session factory are created on first use (``engine`` and
+``AsyncSessionLocal`` are resolved lazily), so importing this module for
+``Base`` does not load the asyncpg driver or configure a pool.
+"""
+
+import asyncio
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker  # type: ignore  # pylint: disable=import-error
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.exc import DBAPIError  # type: ignore  # pylint: disable=import-error
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker  # type: ignore  # pylint: disable=import-error
 from sqlalchemy.orm import declarative_base  # type: ignore  # pylint: disable=import-error
+from sqlalchemy.util import greenlet_spawn  # type: ignore  # pylint: disable=import-error
 from dotenv import load_dotenv
 
+from app.database.pool import pool_settings, process_type
+from app.utils.logging import logger
+from app.utils.settings import RuntimeSettings, live_settings
+
 load_dotenv()
 
 # Database URL from environment
@@ -17,33 +31,128 @@ DB_URL = os.getenv(
     f"{os.getenv('DB_DATABASE', 'socialtrend_db')}"
 )
 
-# Create async engine
-engine = create_async_engine(
-    DB_URL,
-    echo=False,
-    future=True,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-)
+# Retries after the server dropped a pooled connection (replaces pre-ping)
+DB_DISCONNECT_RETRIES = int(os.getenv("DB_DISCONNECT_RETRIES", "1"))
 
-# Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
 
 # Base class for models
 Base = declarative_base()
 
 
+def get_engine() -> AsyncEngine:
+    """The process-wide async engine, created on first use."""
+    global _engine  # pylint: disable=global-statement
+    if _engine is None:
+        # Pool sized for this process type (see app.database.pool)
+        _engine = create_async_engine(
+            DB_URL,
+            echo=False,
+            future=True,
+            **pool_settings(
+                size=live_settings.current.db_pool_size,
+                overflow=live_settings.current.db_max_overflow,
+            ),
+        )
+        logger.info(
+            "Database engine configured",
+            extra={"process_type": process_type(), "pool": _engine.pool.status()}
+        )
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker:
+    """The async session factory bound to ``get_engine()``."""
+    global _session_factory  # pylint: disable=global-statement
+    if _session_factory is None:
+        _session_factory = async_sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _session_factory
+
+
+async def _drain_pool(pool: Any, timeout: float = 60.0):
+    """Close a replaced pool once its checked-out connections are back (asyncpg closes on the loop)."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while pool.checkedout() > 0 and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(1)
+    await greenlet_spawn(pool.dispose)
+
+
+def _resize_pool(old: RuntimeSettings, new: RuntimeSettings):  # pylint: disable=unused-argument
+    """Swap in a pool of the new size; requests in flight finish on the old one."""
+    if _engine is None or process_type() == "celery":
+        return
+    settings = pool_settings(size=new.db_pool_size, overflow=new.db_max_overflow)
+    previous = _engine.sync_engine.pool
+    _engine.sync_engine.pool = previous.resized(settings["pool_size"], settings["max_overflow"])
+    asyncio.get_running_loop().create_task(_drain_pool(previous))
+    logger.info("Database pool resized", extra={"pool": _engine.pool.status()})
+
+
+live_settings.subscribe(_resize_pool, "db_pool_size", "db_max_overflow")
+
+
+async def dispose_engine():
+    """Close pooled connections, if the engine was ever created."""
+    if _engine is not None:
+        await _engine.dispose()
+
+
+def __getattr__(name: str):
+    """Resolve ``engine`` and ``AsyncSessionLocal`` lazily (PEP 562)."""
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 async def get_db():
     """Dependency for getting database session."""
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+async def run_with_retry(
+    operation: Callable[[AsyncSession], Awaitable[Any]],
+    session_factory: Optional[Callable] = None,
+    retries: Optional[int] = None
+) -> Any:
+    """
+    Run ``operation(session)`` in a fresh session, retrying on dropped connections.
+
+    Only errors where SQLAlchemy invalidated the connection (server restart,
+    idle timeout) are retried; the operation must be safe to repeat, i.e.
+    commit inside ``operation``.
+    """
+    session_factory = session_factory or get_session_factory()
+    retries = DB_DISCONNECT_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            async with session_factory() as session:
+                return await operation(session)
+        except DBAPIError as e:
+            if not e.connection_invalidated or attempt == retries:
+                raise
+            logger.warning(
+                "Database connection dropped, retrying",
+                extra={"attempt": attempt + 1, "error": str(e)}
+            )
+    return None
+
+
+async def init_models():
+    """Create the automation tables and indexes if they do not exist yet."""
+    import app.models  # noqa: F401  # pylint: disable=import-outside-toplevel,unused-import  # registers the tables
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,156 @@
+"""Connection-pool sizing and instrumentation for the async engine.
+
+Every process that talks to PostgreSQL holds its own pool, so the pool size
+is derived from a per-host connection budget (``DB_CONNECTION_BUDGET``)
+shared between API workers (``WEB_CONCURRENCY``) and Celery pool children
+(``CELERY_CONCURRENCY``):
+
+* Celery children run one task at a time on a short-lived event loop, so
+  they use ``NullPool`` and never hold more than one connection.
+* API workers split what is left of the budget; about two thirds become the
+  steady pool and the rest overflow.
+
+``DB_POOL_SIZE`` and ``DB_MAX_OVERFLOW`` override the split and can be
+changed at runtime (see ``app.utils.settings``); the engine then swaps in
+a resized pool and the old one drains as its connections are returned.
+
+Instead of pinging every checkout (``DB_POOL_PRE_PING``), connections are
+recycled after ``DB_POOL_RECYCLE`` seconds and dropped connections are
+retried (see ``app.database.connection.run_with_retry``).
+"""
+
+import os
+import sys
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool  # type: ignore  # pylint: disable=import-error
+
+from app.utils import metrics  # noqa: F401
+
+checkout_wait = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled database connection (including connects)',
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0]
+)
+
+pool_size = Gauge(
+    'db_pool_size',
+    'Configured steady-state pool size',
+    multiprocess_mode='livesum'
+)
+
+pool_checked_out = Gauge(
+    'db_pool_checked_out',
+    'Connections currently checked out of the pool',
+    multiprocess_mode='livesum'
+)
+
+pool_overflow = Gauge(
+    'db_pool_overflow',
+    'Connections open beyond the steady-state pool size',
+    multiprocess_mode='livesum'
+)
+
+
+def process_type(env: Optional[Mapping[str, str]] = None) -> str:
+    """Process type the pool is sized for: ``api`` or ``celery``."""
+    env = os.environ if env is None else env
+    explicit = env.get("DB_PROCESS_TYPE")
+    if explicit:
+        return explicit.lower()
+    return "celery" if "celery" in os.path.basename(sys.argv[0] if sys.argv else "") else "api"
+
+
+def pool_settings(
+    kind: Optional[str] = None,
+    env: Optional[Mapping[str, str]] = None,
+    size: Optional[int] = None,
+    overflow: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Engine pool keyword arguments for a process type.
+
+    Args:
+        kind: ``api`` or ``celery`` (detected when omitted)
+        env: Environment to read (defaults to ``os.environ``)
+        size: Steady pool size (overrides DB_POOL_SIZE and the budget split)
+        overflow: Overflow connections (overrides DB_MAX_OVERFLOW and the budget split)
+
+    Returns:
+        dict: Keyword arguments for ``create_async_engine``
+    """
+    env = os.environ if env is None else env
+    kind = kind or process_type(env)
+    common = {
+        "pool_pre_ping": env.get("DB_POOL_PRE_PING", "false").lower() == "true",
+    }
+    if kind == "celery":
+        return dict(common, poolclass=NullPool)
+
+    budget = int(env.get("DB_CONNECTION_BUDGET", "40"))
+    web_workers = max(int(env.get("WEB_CONCURRENCY", "1")), 1)
+    celery_children = int(env.get("CELERY_CONCURRENCY", str(os.cpu_count() or 1)))
+    per_worker = max((budget - celery_children) // web_workers, 1)
+
+    if size is None:
+        size = int(env.get("DB_POOL_SIZE", str(max(per_worker * 2 // 3, 1))))
+    if overflow is None:
+        overflow = int(env.get("DB_MAX_OVERFLOW", str(max(per_worker - size, 0))))
+    return dict(
+        common,
+        poolclass=InstrumentedQueuePool,
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=float(env.get("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(env.get("DB_POOL_RECYCLE", "1800")),
+    )
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool exporting checkout wait, size and overflow."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_size.inc(self.size())
+
+    def _update_gauges(self):
+        pool_checked_out.set(self.checkedout())
+        pool_overflow.set(max(self.overflow(), 0))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait.observe(time.perf_counter() - start)
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._update_gauges()
+
+    def recreate(self):
+        pool_size.dec(self.size())
+        return super().recreate()
+
+    def resized(self, size: int, overflow: int) -> "InstrumentedQueuePool":
+        """A new pool with the same connection settings and a different size."""
+        pool_size.dec(self.size())
+        return self.__class__(
+            self._creator,
+            pool_size=size,
+            max_overflow=overflow,
+            pre_ping=self._pre_ping,
+            use_lifo=self._pool.use_lifo,
+            timeout=self._timeout,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
@@ -0,0 +1,168 @@
+"""Repositories for trend snapshots, generated captions and upload results.
+
+Writes go through ``bulk_insert``: batches are sent as one executemany
+(batched multi-row INSERT), and large batches on PostgreSQL use COPY.
+Reads match the indexes declared on the models.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import JSON, insert, select  # type: ignore  # pylint: disable=import-error
+from sqlalchemy.ext.asyncio import AsyncSession  # type: ignore  # pylint: disable=import-error
+
+from app.models import GeneratedCaption, TrendSnapshot, UploadResult
+
+# Batches at least this large use COPY on PostgreSQL (asyncpg)
+COPY_THRESHOLD = int(os.getenv("DB_COPY_THRESHOLD", "1000"))
+
+
+def _column_value(row: Dict[str, Any], column) -> Any:
+    """Value for ``column`` in a COPY record, applying Python-side defaults."""
+    if column.name in row:
+        value = row[column.name]
+    elif column.default is not None and column.default.is_callable:
+        value = column.default.arg(None)
+    elif column.default is not None:
+        value = column.default.arg
+    else:
+        value = None
+    # asyncpg's JSON codecs (as set up by SQLAlchemy) expect serialized text
+    if value is not None and isinstance(column.type, JSON):
+        value = json.dumps(value)
+    return value
+
+
+async def _copy_rows(session: AsyncSession, model, rows: Sequence[Dict[str, Any]]):
+    """Insert ``rows`` with PostgreSQL COPY on the session's connection."""
+    table = model.__table__
+    columns = [column for column in table.columns if not column.primary_key]
+    records = [tuple(_column_value(row, column) for column in columns) for row in rows]
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table.name, records=records, columns=[column.name for column in columns]
+    )
+
+
+async def bulk_insert(session: AsyncSession, model, rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    Insert many rows of ``model`` in one round trip.
+
+    Args:
+        session: Open session (the caller commits)
+        model: Mapped model class
+        rows: Column values per row
+
+    Returns:
+        int: Number of rows inserted
+    """
+    if not rows:
+        return 0
+    connection = await session.connection()
+    if len(rows) >= COPY_THRESHOLD and connection.dialect.driver == "asyncpg":
+        await _copy_rows(session, model, rows)
+    else:
+        await session.execute(insert(model), list(rows))
+    return len(rows)
+
+
+class TrendRepository:
+    """Trend snapshots."""
+
+    @staticmethod
+    async def add_many(session: AsyncSession, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert snapshot rows (see ``app.database.rows.trend_rows``)."""
+        return await bulk_insert(session, TrendSnapshot, rows)
+
+    @staticmethod
+    async def history(
+        session: AsyncSession,
+        platform: str,
+        keyword: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> List[TrendSnapshot]:
+        """Snapshots of one keyword on one platform, newest first."""
+        query = select(TrendSnapshot).where(
+            TrendSnapshot.platform == platform.lower(),
+            TrendSnapshot.keyword == keyword,
+        )
+        if since is not None:
+            query = query.where(TrendSnapshot.fetched_at >= since)
+        if until is not None:
+            query = query.where(TrendSnapshot.fetched_at < until)
+        query = query.order_by(TrendSnapshot.fetched_at.desc()).limit(limit)
+        return list((await session.scalars(query)).all())
+
+    @staticmethod
+    async def latest(
+        session: AsyncSession,
+        platform: str,
+        since: Optional[datetime] = None,
+        limit: int = 50
+    ) -> List[TrendSnapshot]:
+        """Most recent snapshots of a platform."""
+        query = select(TrendSnapshot).where(TrendSnapshot.platform == platform.lower())
+        if since is not None:
+            query = query.where(TrendSnapshot.fetched_at >= since)
+        query = query.order_by(TrendSnapshot.fetched_at.desc()).limit(limit)
+        return list((await session.scalars(query)).all())
+
+
+class CaptionRepository:
+    """Generated captions."""
+
+    @staticmethod
+    async def add_many(session: AsyncSession, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert caption rows (see ``app.database.rows.caption_row``)."""
+        return await bulk_insert(session, GeneratedCaption, rows)
+
+    @staticmethod
+    async def recent(
+        session: AsyncSession,
+        platform: Optional[str] = None,
+        limit: int = 50
+    ) -> List[GeneratedCaption]:
+        """Most recent captions, optionally for one platform."""
+        query = select(GeneratedCaption)
+        if platform:
+            query = query.where(GeneratedCaption.platform == platform)
+        query = query.order_by(GeneratedCaption.created_at.desc()).limit(limit)
+        return list((await session.scalars(query)).all())
+
+
+class UploadResultRepository:
+    """Upload outcomes."""
+
+    @staticmethod
+    async def add_many(session: AsyncSession, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert upload rows (see ``app.database.rows.upload_row``)."""
+        return await bulk_insert(session, UploadResult, rows)
+
+    @staticmethod
+    async def for_post(session: AsyncSession, scheduled_post_id: int) -> List[UploadResult]:
+        """All attempts for a scheduled post, newest first."""
+        query = (
+            select(UploadResult)
+            .where(UploadResult.scheduled_post_id == scheduled_post_id)
+            .order_by(UploadResult.created_at.desc())
+        )
+        return list((await session.scalars(query)).all())
+
+    @staticmethod
+    async def recent(
+        session: AsyncSession,
+        platform: str,
+        since: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[UploadResult]:
+        """Most recent uploads to a platform."""
+        query = select(UploadResult).where(UploadResult.platform == platform.lower())
+        if since is not None:
+            query = query.where(UploadResult.created_at >= since)
+        query = query.order_by(UploadResult.created_at.desc()).limit(limit)
+        return list((await session.scalars(query)).all())
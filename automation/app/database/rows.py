@@ -0,0 +1,73 @@
+"""Row builders for the write-behind buffer.
+
+Turn service results into column values for the automation models. Kept
+free of SQLAlchemy imports so services can queue rows without loading the
+ORM (it is only imported when the buffer flushes).
+
+String values are cut to their column lengths here: several come from
+request fields, and one oversized value would fail the whole bulk insert.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.services.hashtag_index import TREND_LABEL_KEYS, TREND_SCORE_KEYS
+
+
+def _clip(value: Any, length: int) -> Optional[str]:
+    """``value`` as a string of at most ``length`` characters (None stays None)."""
+    return None if value is None else str(value)[:length]
+
+
+def trend_rows(platform: str, trends: List[Dict[str, Any]], fetched_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Build ``TrendSnapshot`` rows from a ``TrendsService`` provider response."""
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    rows = []
+    for trend in trends:
+        label = next((trend[key] for key in TREND_LABEL_KEYS if trend.get(key)), None)
+        if not label:
+            continue
+        score = next((trend[key] for key in TREND_SCORE_KEYS if trend.get(key) is not None), None)
+        rows.append({
+            "platform": _clip(platform.lower(), 32),
+            "keyword": _clip(label, 255),
+            "score": float(score) if score is not None else None,
+            "data": trend,
+            "fetched_at": fetched_at,
+        })
+    return rows
+
+
+def caption_row(result: Dict[str, Any], topic: Optional[str] = None, platform: Optional[str] = None) -> Dict[str, Any]:
+    """Build a ``GeneratedCaption`` row from a caption service result."""
+    return {
+        "platform": _clip(platform, 32),
+        "topic": _clip(topic, 255) or None,
+        "style": _clip(result.get("style"), 32),
+        "provider": _clip(result.get("provider", "unknown"), 32),
+        "model": _clip(result.get("model"), 64),
+        "caption": result.get("caption") or "",
+        "hashtags": result.get("hashtags"),
+        "recommended_time": _clip(result.get("recommended_time"), 16),
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def upload_row(
+    platform: str,
+    status: str,
+    scheduled_post_id: Optional[int] = None,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build an ``UploadResult`` row from an ``UploadService`` result or error."""
+    result = result or {}
+    return {
+        "scheduled_post_id": scheduled_post_id,
+        "platform": _clip(platform.lower(), 32),
+        "status": _clip(status, 16),
+        "post_url": _clip(result.get("post_url"), 512),
+        "error": error,
+        "metrics": result.get("metrics"),
+        "created_at": datetime.now(timezone.utc),
+    }
@@ -0,0 +1,263 @@
+"""Write-behind buffer for persistence off the request path.
+
+Request handlers call ``write_buffer.add()``, which only appends to an
+in-memory queue. A background task flushes the queue in batches (every
+``DB_FLUSH_INTERVAL`` seconds, or sooner once ``DB_FLUSH_BATCH_SIZE`` rows
+are pending) with one bulk insert per table and one commit per flush.
+Batches that fail because the database is unavailable are kept for the
+next flush; beyond ``DB_MAX_PENDING`` rows the oldest are dropped so an
+outage cannot exhaust memory. A batch the database rejects (bad data) is
+split to find the offending rows, which are dropped.
+
+Rows are queued by model name (``"TrendSnapshot"``) so that callers do not
+import SQLAlchemy; the models, repositories and engine are only loaded when
+the buffer first flushes.
+
+Persistence is enabled with ``DB_PERSISTENCE_ENABLED=true``.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from prometheus_client import Counter, Gauge
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+from app.utils.tracing import stage
+
+pending_rows = Gauge(
+    'db_write_buffer_pending_rows',
+    'Rows waiting in the write-behind buffer',
+    multiprocess_mode='livesum'
+)
+
+buffered_rows = Counter(
+    'db_write_buffer_rows_total',
+    'Rows leaving the write-behind buffer',
+    ['table', 'status']
+)
+
+
+# Metric label per model name, matching the table names in app.models
+TABLES = {
+    "TrendSnapshot": "automation_trend_snapshots",
+    "GeneratedCaption": "automation_generated_captions",
+    "UploadResult": "automation_upload_results",
+}
+
+
+def _table(model: str) -> str:
+    return TABLES.get(model, model)
+
+
+def _is_data_error(error: Exception) -> bool:
+    """Whether the database rejected the rows themselves (retrying the same rows cannot succeed)."""
+    from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError  # pylint: disable=import-outside-toplevel
+    if isinstance(error, (DataError, IntegrityError)):
+        return True
+    # Raised while binding the values, before the database was reached
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+class WriteBehindBuffer:
+    """Batches inserts and writes them from a background task."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        enabled: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        """
+        Initialize the buffer.
+
+        Args:
+            session_factory: Async session factory (defaults to AsyncSessionLocal, created on first flush)
+            enabled: Accept rows at all (DB_PERSISTENCE_ENABLED, default false)
+            flush_interval: Seconds between flushes (DB_FLUSH_INTERVAL, default 2)
+            batch_size: Pending rows that trigger an early flush (DB_FLUSH_BATCH_SIZE, default 500)
+            max_pending: Rows kept while the database is unavailable (DB_MAX_PENDING, default 50000)
+        """
+        self.session_factory = session_factory
+        if enabled is None:
+            enabled = os.getenv("DB_PERSISTENCE_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.flush_interval = flush_interval or float(os.getenv("DB_FLUSH_INTERVAL", "2"))
+        self.batch_size = batch_size or int(os.getenv("DB_FLUSH_BATCH_SIZE", "500"))
+        self.max_pending = max_pending or int(os.getenv("DB_MAX_PENDING", "50000"))
+
+        self._pending: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, model: str, rows: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """
+        Queue rows for insertion. Never blocks and never raises.
+
+        Args:
+            model: Model name exported by ``app.models`` (e.g. ``"TrendSnapshot"``)
+            rows: One row or a list of rows (see ``app.database.rows``)
+        """
+        if not self.enabled:
+            return
+        for row in [rows] if isinstance(rows, dict) else rows:
+            if len(self._pending) >= self.max_pending:
+                dropped_model, _ = self._pending.popleft()
+                buffered_rows.labels(table=_table(dropped_model), status='dropped').inc()
+            self._pending.append((model, row))
+        pending_rows.set(len(self._pending))
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the background flusher on the running loop."""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    async def close(self):
+        """
+        Flush and release pooled connections.
+
+        For callers that run a short-lived event loop (Celery tasks): pooled
+        asyncpg connections cannot be reused from another loop.
+        """
+        if not self.enabled:
+            return
+        await self.flush()
+        from app.database.connection import dispose_engine  # pylint: disable=import-outside-toplevel
+        await dispose_engine()
+
+    async def _run(self):
+        """Flush periodically, or early when a full batch is waiting."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write all pending rows.
+
+        Returns:
+            int: Number of rows written
+        """
+        if not self._pending:
+            return 0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+            pending_rows.set(0)
+
+            by_model: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+            for model, row in batch:
+                by_model.setdefault(model, []).append(row)
+
+            try:
+                with stage('db', 'flush'):
+                    await self._write(by_model)
+            except Exception as e:  # pylint: disable=broad-except
+                if not _is_data_error(e):
+                    self._keep_failed(batch, e)
+                    return 0
+                logger.warning(
+                    "Write-behind flush rejected by the database, isolating the bad rows",
+                    extra={"rows": len(batch), "error": str(e)}
+                )
+                return await self._write_isolating(by_model)
+
+            for model, rows in by_model.items():
+                buffered_rows.labels(table=_table(model), status='written').inc(len(rows))
+            return len(batch)
+
+    async def _write(self, by_model: Dict[str, List[Dict[str, Any]]]):
+        """Insert rows per model in one transaction (reconnecting on dropped connections)."""
+        from app.database.connection import run_with_retry  # pylint: disable=import-outside-toplevel
+
+        async def write(session):
+            import app.models  # pylint: disable=import-outside-toplevel
+            from app.database import repositories  # pylint: disable=import-outside-toplevel
+            for model, rows in by_model.items():
+                await repositories.bulk_insert(session, getattr(app.models, model), rows)
+            await session.commit()
+
+        await run_with_retry(write, self.session_factory)
+
+    async def _write_isolating(self, by_model: Dict[str, List[Dict[str, Any]]]) -> int:
+        """
+        Write a batch the database rejected, halving failing chunks until the bad rows are found.
+
+        Rejected rows are dropped; retrying them would fail every later
+        flush. If the database becomes unavailable meanwhile, the rows not
+        written yet are kept for the next flush.
+        """
+        chunks = deque(by_model.items())
+        written = 0
+        while chunks:
+            model, rows = chunks.popleft()
+            try:
+                await self._write({model: rows})
+            except Exception as e:  # pylint: disable=broad-except
+                if not _is_data_error(e):
+                    remaining = [(model, row) for row in rows]
+                    remaining += [(other, row) for other, other_rows in chunks for row in other_rows]
+                    self._keep_failed(remaining, e)
+                    return written
+                if len(rows) > 1:
+                    middle = len(rows) // 2
+                    chunks.extendleft([(model, rows[middle:]), (model, rows[:middle])])
+                    continue
+                buffered_rows.labels(table=_table(model), status='rejected').inc()
+                logger.error(
+                    "Dropping row rejected by the database",
+                    extra={"table": _table(model), "error": str(e)}
+                )
+                continue
+            buffered_rows.labels(table=_table(model), status='written').inc(len(rows))
+            written += len(rows)
+        return written
+
+    def _keep_failed(self, batch: List[Tuple[str, Dict[str, Any]]], error: Exception):
+        """Queue rows that could not be written ahead of newer ones, dropping the oldest beyond max_pending."""
+        logger.error(
+            "Write-behind flush failed, keeping rows for the next flush",
+            extra={"rows": len(batch), "error": str(error)}
+        )
+        for model, _ in batch:
+            buffered_rows.labels(table=_table(model), status='failed').inc()
+        room = max(self.max_pending - len(self._pending), 0)
+        kept = batch[len(batch) - room:] if room else []
+        for model, _ in batch[:len(batch) - len(kept)]:
+            buffered_rows.labels(table=_table(model), status='dropped').inc()
+        self._pending.extendleft(reversed(kept))
+        pending_rows.set(len(self._pending))
+
+
+# Process-wide buffer
+write_buffer = WriteBehindBuffer()
@@ -1 +1,7 @@
 """Database models."""
+
+from app.models.caption import GeneratedCaption
+from app.models.trend_snapshot import TrendSnapshot
+from app.models.upload_result import UploadResult
+
+__all__ = ["GeneratedCaption", "TrendSnapshot", "UploadResult"]
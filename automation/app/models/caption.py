@@ -0,0 +1,27 @@
+"""Generated caption model."""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, Text  # type: ignore  # pylint: disable=import-error
+
+from app.database.connection import Base
+from app.models.types import JSONType, utcnow
+
+
+class GeneratedCaption(Base):  # pylint: disable=too-few-public-methods
+    """A caption returned by the caption endpoints."""
+
+    __tablename__ = "automation_generated_captions"
+
+    id = Column(BigInteger, primary_key=True)
+    platform = Column(String(32), nullable=True)
+    topic = Column(String(255), nullable=True)
+    style = Column(String(32), nullable=True)
+    provider = Column(String(32), nullable=False)
+    model = Column(String(64), nullable=True)
+    caption = Column(Text, nullable=False)
+    hashtags = Column(JSONType, nullable=True)
+    recommended_time = Column(String(16), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_generated_captions_platform_time", "platform", "created_at"),
+    )
@@ -0,0 +1,26 @@
+"""Trend snapshot model."""
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, String  # type: ignore  # pylint: disable=import-error
+
+from app.database.connection import Base
+from app.models.types import JSONType, utcnow
+
+
+class TrendSnapshot(Base):  # pylint: disable=too-few-public-methods
+    """One trend as returned by a provider at fetch time."""
+
+    __tablename__ = "automation_trend_snapshots"
+
+    id = Column(BigInteger, primary_key=True)
+    platform = Column(String(32), nullable=False)
+    keyword = Column(String(255), nullable=False)
+    score = Column(Float, nullable=True)
+    data = Column(JSONType, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        # Dashboard queries: history of a keyword on a platform over time
+        Index("ix_trend_snapshots_platform_keyword_time", "platform", "keyword", "fetched_at"),
+        # Latest trends per platform
+        Index("ix_trend_snapshots_platform_time", "platform", "fetched_at"),
+    )
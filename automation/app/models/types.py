@@ -0,0 +1,14 @@
+"""Column types shared by the automation models."""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON  # type: ignore  # pylint: disable=import-error
+from sqlalchemy.dialects.postgresql import JSONB  # type: ignore  # pylint: disable=import-error
+
+# JSONB on PostgreSQL, plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+def utcnow() -> datetime:
+    """Timezone-aware current time for timestamp defaults."""
+    return datetime.now(timezone.utc)
@@ -0,0 +1,26 @@
+"""Upload result model."""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, Text  # type: ignore  # pylint: disable=import-error
+
+from app.database.connection import Base
+from app.models.types import JSONType, utcnow
+
+
+class UploadResult(Base):  # pylint: disable=too-few-public-methods
+    """Outcome of one upload attempt to a platform."""
+
+    __tablename__ = "automation_upload_results"
+
+    id = Column(BigInteger, primary_key=True)
+    scheduled_post_id = Column(BigInteger, nullable=True)
+    platform = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)
+    post_url = Column(String(512), nullable=True)
+    error = Column(Text, nullable=True)
+    metrics = Column(JSONType, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_upload_results_platform_time", "platform", "created_at"),
+        Index("ix_upload_results_scheduled_post", "scheduled_post_id"),
+    )
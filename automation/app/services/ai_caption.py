@@ -1,10 +1,35 @@
 """AI-powered caption generation with OpenAI integration."""
 
+import asyncio
+import importlib
 import os
-import re
-from typing import Any, Dict, List
-
+import time
+from typing import Any, Dict, List, Optional
+
+from app.database.rows import caption_row
+from app.database.write_buffer import write_buffer
+from app.services.caption_parser import DEFAULT_TIME, parse_completion
+from app.services.circuit_breaker import CircuitOpenError, get_breaker
+from app.services.hashtag_index import hashtag_index
+from app.services.llm_usage import KNOWN_STYLES, TokenBudgetExceeded, output_lengths, record_usage, token_budget
+from app.services.posting_time import posting_time_recommender
+from app.services.prompts import PLATFORM_HINTS, RenderedPrompt, registry as prompt_registry
+from app.services.prompts import observe as observe_prompt
+from app.services.semantic_cache import caption_cache
 from app.utils.logging import logger
+from app.utils.settings import live_settings
+from app.utils.tracing import stage
+
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+
+def _is_request_error(error: BaseException) -> bool:
+    """OpenAI rejected this request (bad request, unknown model, no access) while being up."""
+    return getattr(error, "status_code", None) in (400, 403, 404, 422)
+
+
+# Shared by every OpenAI call in the process (see app.services.circuit_breaker)
+openai_breaker = get_breaker("openai", timeout_seconds=30, slow_call_seconds=10, ignore=_is_request_error)
 
 
 class AICaptionService:
@@ -14,18 +39,35 @@ class AICaptionService:
     async def generate_caption(
         topic: str,
         trend: List[str] = None,
-        style: str = "professional"
+        style: str = "professional",
+        platform: str = "instagram",
+        audience: str = "default",
+        user: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate caption and hashtags using OpenAI API.
 
+        The recommended posting time comes from the engagement-history
+        recommender rather than from the model. Near-duplicates of earlier
+        requests are answered from the semantic cache (see
+        ``app.services.semantic_cache``). OpenAI tokens count against
+        the caller's and the global token budget (see
+        ``app.services.llm_usage``); once the global one is spent, captions
+        come from the fallback.
+
         Args:
             topic: Main topic or subject
             trend: List of trending keywords or topics
             style: Caption style (professional, casual, creative)
+            platform: Target platform for the posting-time recommendation
+            audience: Audience segment for the posting-time recommendation
+            user: Username the tokens are counted against
 
         Returns:
             dict: Generated caption, hashtags, and recommended posting time
+
+        Raises:
+            TokenBudgetExceeded: The user's token budget is spent
         """
         logger.info(
             "Generating AI caption",
@@ -39,27 +81,62 @@ class AICaptionService:
         try:
             # Check if OpenAI API key is available
             openai_key = os.getenv("OPENAI_API_KEY")
+            result = None
 
             if not openai_key:
                 logger.warning("OPENAI_API_KEY not found, using fallback method")
-                return AICaptionService._generate_fallback(topic, trend, style)
-
-            # Use OpenAI API
-            result = await AICaptionService._generate_with_openai(
-                topic, trend, style, openai_key
-            )
-
-            logger.info(
-                "AI caption generated successfully",
-                extra={
-                    "topic": topic,
-                    "style": style,
-                    "provider": "openai",
-                }
-            )
+            else:
+                try:
+                    # Near-identical requests reuse an earlier caption written
+                    # for the same style, platform and prompt template version;
+                    # free-form styles and platforms are not cached (unbounded buckets)
+                    bucket = None
+                    if style in KNOWN_STYLES and platform in PLATFORM_HINTS:
+                        template = prompt_registry.get("ai_caption", style, platform, key=user or topic)
+                        bucket = f"{style}:{platform}:{template.name}:{template.version}"
+                        result = await caption_cache.lookup(topic, bucket, trend)
+                    if result is None:
+                        result = await AICaptionService._generate_with_openai(
+                            topic, trend, style, openai_key, user, platform
+                        )
+                        if bucket is not None:
+                            await caption_cache.store(topic, bucket, trend, result)
+                except TokenBudgetExceeded as e:
+                    if e.scope == "user":
+                        raise
+                    logger.info("Global token budget spent, using fallback method")
+                except CircuitOpenError as e:
+                    # OpenAI is degraded; answer from the fallback right away
+                    logger.info(
+                        "OpenAI circuit open, using fallback method",
+                        extra={"retry_after": round(e.retry_after, 1)}
+                    )
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning(
+                        "OpenAI caption generation failed, using fallback method",
+                        extra={"topic": topic, "error": str(e)}
+                    )
+
+            if result is None:
+                with stage('ai_caption', 'fallback'):
+                    result = AICaptionService._generate_fallback(topic, trend, style)
+            result.update(posting_time_recommender.best_slot(platform, audience))
+            write_buffer.add("GeneratedCaption", caption_row(result, topic, platform))
+
+            if result["provider"] == "openai":
+                logger.info(
+                    "AI caption generated successfully",
+                    extra={
+                        "topic": topic,
+                        "style": style,
+                        "provider": "openai",
+                    }
+                )
 
             return result
 
+        except TokenBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(
                 "Failed to generate AI caption",
@@ -76,74 +153,68 @@ class AICaptionService:
         topic: str,
         trend: List[str],
         style: str,
-        api_key: str
+        api_key: str,
+        user: Optional[str] = None,
+        platform: str = "instagram"
     ) -> Dict[str, Any]:
-        """Generate caption using OpenAI API."""
+        """Generate caption using OpenAI API with the prompt template for the style and platform."""
+        openai_breaker.check()
+        await token_budget.check(user)
         try:
-            from openai import OpenAI  # pylint: disable=import-outside-toplevel
-
-            client = OpenAI(api_key=api_key)
+            # Imported on first use, off the event loop (it takes ~0.5s)
+            openai = await asyncio.to_thread(importlib.import_module, "openai")
+
+            # The breaker bounds each call; the client's own timeout frees the
+            # worker thread, and its retries would only stretch an outage
+            client = openai.OpenAI(
+                api_key=api_key,
+                timeout=openai_breaker.timeout_seconds or None,
+                max_retries=OPENAI_MAX_RETRIES
+            )
 
-            # Build prompt
-            prompt = f"Generate a {style} social media caption"
-            if topic:
-                prompt += f" about: {topic}"
-            if trend:
-                prompt += f" incorporating these trends: {', '.join(trend[:5])}"
-            prompt += "\n\nInclude relevant hashtags (10-15) and suggest the best time to post."
+            # Hashtags come from the trend index; only ask the model when it
+            # cannot supply enough relevant ones yet
+            indexed_hashtags = hashtag_index.top_k(" ".join([topic] + list(trend or [])), 10)
+            template = prompt_registry.get("ai_caption", style, platform, key=user or topic)
+            prompt = template.render(
+                topic,
+                trend,
+                style=style,
+                platform=platform,
+                want_hashtags=len(indexed_hashtags) < 5,
+                json_output=os.getenv("AI_CAPTION_JSON_OUTPUT", "false").lower() == "true"
+            )
+            logger.debug(
+                "Prompt rendered",
+                extra={"template": prompt.template, "version": prompt.version, "prefix_id": prompt.prefix_id}
+            )
 
-            # Call OpenAI API - Use GPT-4 (or gpt-3.5-turbo as fallback)
-            model = "gpt-4"
+            # Call OpenAI API - OPENAI_MODEL (or OPENAI_FALLBACK_MODEL), changeable at runtime
+            config = live_settings.current
+            model = config.openai_model
+            max_tokens = output_lengths.max_tokens(style)
             try:
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are an expert social media content creator "
-                                "specializing in viral, engaging captions."
-                            )
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=300,
-                    temperature=0.7
-                )
+                response = await AICaptionService._complete(client, model, prompt, max_tokens, style, user)
             except Exception as model_error:  # pylint: disable=broad-except
-                # Fallback to gpt-3.5-turbo if GPT-4 unavailable
+                if not _is_request_error(model_error):
+                    # OpenAI itself is failing or slow; don't wait out a second model
+                    raise
+                # Fallback model if the primary one is unavailable
                 logger.warning(
-                    "GPT-4 unavailable, trying gpt-3.5-turbo",
-                    extra={"error": str(model_error)}
-                )
-                model = "gpt-3.5-turbo"
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are an expert social media content creator "
-                                "specializing in viral, engaging captions."
-                            )
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=300,
-                    temperature=0.7
+                    "OpenAI model unavailable, trying fallback model",
+                    extra={"model": model, "fallback_model": config.openai_fallback_model, "error": str(model_error)}
                 )
+                model = config.openai_fallback_model
+                response = await AICaptionService._complete(client, model, prompt, max_tokens, style, user)
 
             # Parse response
             content = response.choices[0].message.content.strip()
 
             # Extract caption and hashtags
-            caption, hashtags, recommended_time = AICaptionService._parse_response(content)
+            with stage('ai_caption', 'parse'):
+                caption, hashtags, recommended_time = AICaptionService._parse_response(
+                    content, topic, trend
+                )
 
             return {
                 "caption": caption,
@@ -157,6 +228,8 @@ class AICaptionService:
         except ImportError:
             logger.error("OpenAI library not installed, using fallback")
             return AICaptionService._generate_fallback(topic, trend, style)
+        except (CircuitOpenError, TokenBudgetExceeded):
+            raise
         except Exception as e:
             logger.error(
                 "OpenAI API error",
@@ -165,55 +238,52 @@ class AICaptionService:
             raise
 
     @staticmethod
-    def _parse_response(content: str) -> tuple:
+    async def _complete(
+        client: Any,
+        model: str,
+        prompt: RenderedPrompt,
+        max_tokens: int,
+        style: str,
+        user: Optional[str] = None
+    ) -> Any:
+        """Run one chat completion through the OpenAI circuit breaker and account for its tokens."""
+        start = time.perf_counter()
+        with stage('ai_caption', 'openai_request', model=model):
+            # The client is synchronous; run it off the event loop
+            response = await openai_breaker.call(
+                asyncio.to_thread,
+                client.chat.completions.create,
+                model=model,
+                messages=prompt.messages,
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
+        duration = time.perf_counter() - start
+        observe_prompt(prompt, duration, getattr(response, "usage", None))
+        await record_usage(response, model, style, "ai_caption", duration, max_tokens, user)
+        return response
+
+    @staticmethod
+    def _parse_response(content: str, topic: str = "", trend: List[str] = None) -> tuple:
         """
         Parse OpenAI response into caption, hashtags, and recommended time.
 
         Args:
             content: Raw response from OpenAI
+            topic: Caption topic, used to look up hashtags in the index
+            trend: Trending keywords, used to look up hashtags in the index
 
         Returns:
             tuple: (caption, hashtags, recommended_time)
         """
-        lines = content.split('\n')
-
-        # Extract caption (first paragraph)
-        caption_lines = []
-        hashtags = []
-        recommended_time = "09:00 AM"
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#'):
-                hashtags.append(line)
-            elif 'time' in line.lower() or 'post' in line.lower():
-                # Try to extract time
-                recommended_time = AICaptionService._extract_time(line)
-            elif line and not line.startswith('Recommended'):
-                caption_lines.append(line)
-
-        caption = '\n\n'.join(caption_lines) if caption_lines else content
-
-        # If no hashtags found, generate some
-        if not hashtags:
-            hashtags = [
-                "#socialmedia", "#trending", "#viral",
-                "#content", "#engagement", "#digital",
-                "#marketing", "#creative", "#inspiration",
-                "#community"
-            ]
-
-        return caption, hashtags[:15], recommended_time
+        caption, hashtags, recommended_time = parse_completion(content)
 
-    @staticmethod
-    def _extract_time(text: str) -> str:
-        """Extract recommended posting time from text."""
-        # Simple time extraction
-        time_pattern = r'\d{1,2}:\d{2}\s?(AM|PM|am|pm)'
-        match = re.search(time_pattern, text)
-        if match:
-            return match.group(0)
-        return "09:00 AM"
+        if hashtags:
+            hashtag_index.add_caption(topic, hashtags)
+        else:
+            hashtags = hashtag_index.recommend(topic, trend)
+
+        return caption, hashtags[:15], recommended_time or DEFAULT_TIME
 
     @staticmethod
     def _generate_fallback(
@@ -228,30 +298,12 @@ class AICaptionService:
             caption += f"Trending topics: {', '.join(trend[:3])}\n\n"
         caption += "Share your thoughts below! 💭✨"
 
-        # Generate hashtags
-        hashtags = [
-            f"#{topic.lower().replace(' ', '')}",
-            "#trending",
-            "#viral",
-            "#socialmedia",
-            "#content",
-            "#engagement",
-            "#digital",
-            "#marketing",
-            "#creative",
-            "#inspiration"
-        ]
-
-        if trend:
-            for t in trend[:5]:
-                hashtag = f"#{t.lower().replace(' ', '')}"
-                if hashtag not in hashtags:
-                    hashtags.append(hashtag)
+        # Hashtags for the topic and trends, filled up from the trend index
+        hashtags = hashtag_index.recommend(topic, trend)
 
         return {
             "caption": caption,
             "hashtags": hashtags[:15],
-            "recommended_time": "09:00 AM",
             "provider": "fallback",
             "style": style,
         }
@@ -2,6 +2,8 @@
 
 NOTE: This application uses flat access control.
 All authenticated users have full access - no role/permission checks.
+The only exception are operational endpoints (profiling), which are
+limited to the usernames listed in ADMIN_USERNAMES (nobody by default).
 """
 
 import os
@@ -14,13 +16,16 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.utils.logging import logger
+from app.utils.settings import live_settings
 
 # Security configuration - Load from environment
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-this-secret-key-in-production")
 if SECRET_KEY == "change-this-secret-key-in-production":
     logger.warning("Using default JWT_SECRET_KEY! Change this in production!")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ADMIN_USERNAMES = {
+    name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -45,7 +50,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + timedelta(minutes=live_settings.current.jwt_access_token_expire_minutes)
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -80,3 +85,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
 async def get_current_active_user(current_user: dict = Depends(get_current_user)) -> dict:
     """Get current active user."""
     return current_user
+
+
+async def get_current_admin_user(current_user: dict = Depends(get_current_active_user)) -> dict:
+    """Get current user, requiring them to be listed in ADMIN_USERNAMES."""
+    if current_user["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
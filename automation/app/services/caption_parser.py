@@ -0,0 +1,137 @@
+"""Single-pass parser for LLM caption completions.
+
+Turns a raw completion into caption text, hashtags and an optional posting
+time. Plain-text completions are tokenized line by line with precompiled
+patterns; completions that are (or contain) a JSON object are read as
+structured output.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+DEFAULT_TIME = "09:00 AM"
+MAX_HASHTAGS = 15
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+TIME_PATTERN = re.compile(r"\b\d{1,2}:\d{2}\s?[AaPp][Mm]\b")
+# Lines such as "Best time to post: 9:00 AM" or "Recommended posting time - ..."
+TIME_LINE_PATTERN = re.compile(
+    r"^\W*(?:recommended|best|suggested|optimal|ideal)\b[^:]*\b(?:time|post)", re.IGNORECASE
+)
+# "Caption:" / "Hashtags:" style labels some completions put in front of a line
+LABEL_PATTERN = re.compile(
+    r"^\W*(?:(?:recommended|suggested|relevant)\s+)?(caption|hashtags?|tags)\s*[:\-]\s*",
+    re.IGNORECASE,
+)
+# A line made only of hashtags (and separators)
+HASHTAG_ROW_PATTERN = re.compile(r"^(?:#\w+[\s,]*)+$")
+# Hashtags trailing a caption sentence ("Big news today! #ai #tech")
+TRAILING_HASHTAGS_PATTERN = re.compile(r"(?:[\s,]+#\w+)+[\s,]*$")
+# Markdown headings ("# Caption") are not hashtags
+HEADING_PATTERN = re.compile(r"^#+\s")
+JSON_BLOCK_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class ParsedCaption(NamedTuple):
+    """Result of parsing a caption completion."""
+    caption: str
+    hashtags: List[str]
+    recommended_time: Optional[str]
+
+
+def _dedupe_hashtags(tags: List[str]) -> List[str]:
+    """Normalize to ``#tag`` form and drop case-insensitive duplicates."""
+    seen = set()
+    result = []
+    for tag in tags:
+        tag = tag.strip().lstrip("#")
+        if not tag:
+            continue
+        key = tag.lower()
+        if key not in seen:
+            seen.add(key)
+            result.append(f"#{tag}")
+    return result[:MAX_HASHTAGS]
+
+
+def _parse_json(content: str) -> Optional[ParsedCaption]:
+    """Parse structured output, returning None when the completion is not JSON."""
+    match = JSON_BLOCK_PATTERN.search(content)
+    if not match:
+        return None
+    try:
+        data: Dict[str, Any] = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or "caption" not in data:
+        return None
+
+    hashtags = data.get("hashtags") or []
+    if isinstance(hashtags, str):
+        hashtags = HASHTAG_PATTERN.findall(hashtags) or hashtags.split()
+    recommended_time = data.get("recommended_time") or data.get("best_time")
+    if recommended_time:
+        time_match = TIME_PATTERN.search(str(recommended_time))
+        recommended_time = time_match.group(0) if time_match else None
+
+    return ParsedCaption(
+        caption=str(data.get("caption") or "").strip(),
+        hashtags=_dedupe_hashtags([str(tag) for tag in hashtags]),
+        recommended_time=recommended_time,
+    )
+
+
+def parse_completion(content: str) -> ParsedCaption:
+    """
+    Parse a caption completion in a single pass.
+
+    Args:
+        content: Raw completion text
+
+    Returns:
+        ParsedCaption: caption, deduplicated hashtags and the first posting
+        time found (None when the completion has none)
+    """
+    content = (content or "").strip()
+    if "{" in content:
+        structured = _parse_json(content)
+        if structured is not None:
+            return structured
+
+    caption_lines = []
+    hashtags: List[str] = []
+    recommended_time = None
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if not line or HEADING_PATTERN.match(line):
+            continue
+
+        label = LABEL_PATTERN.match(line)
+        if label:
+            line = line[label.end():]
+            if label.group(1).lower() != "caption":
+                hashtags.extend(HASHTAG_PATTERN.findall(line) or line.replace(",", " ").split())
+                continue
+
+        if line.startswith("#") and HASHTAG_ROW_PATTERN.match(line):
+            hashtags.extend(HASHTAG_PATTERN.findall(line))
+        elif TIME_LINE_PATTERN.match(line):
+            if recommended_time is None:
+                time_match = TIME_PATTERN.search(line)
+                if time_match:
+                    recommended_time = time_match.group(0)
+        else:
+            trailing = TRAILING_HASHTAGS_PATTERN.search(line) if "#" in line else None
+            if trailing:
+                hashtags.extend(HASHTAG_PATTERN.findall(trailing.group(0)))
+                line = line[:trailing.start()].rstrip()
+            if line:
+                caption_lines.append(line)
+
+    return ParsedCaption(
+        caption="\n\n".join(caption_lines) if caption_lines else content,
+        hashtags=_dedupe_hashtags(hashtags),
+        recommended_time=recommended_time,
+    )
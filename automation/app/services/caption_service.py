@@ -2,7 +2,13 @@
 
 import os
 from typing import Dict, Any
+from app.database.rows import caption_row
+from app.database.write_buffer import write_buffer
+from app.services.hashtag_index import hashtag_index
+from app.services.local_generation import local_engine
+from app.services.prompts import registry as prompt_registry
 from app.utils.logging import logger
+from app.utils.tracing import stage
 
 
 class CaptionService:
@@ -41,20 +47,33 @@ class CaptionService:
             # Try OpenAI first, fallback to HuggingFace
             use_openai = os.getenv("OPENAI_API_KEY") is not None
 
+            result = None
             if use_openai:
-                result = await CaptionService._generate_with_openai(
-                    content, image_description, platform, style
-                )
-            else:
+                # Not behind openai_breaker: the stub makes no OpenAI request, so its
+                # successes would dilute the breaker's failure rate and close it while
+                # OpenAI is down. Wrap it once it calls the API.
+                try:
+                    result = await CaptionService._generate_with_openai(
+                        content, image_description, platform, style
+                    )
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning(
+                        "OpenAI caption generation failed, using HuggingFace",
+                        extra={"platform": platform, "error": str(e)}
+                    )
+            if result is None:
                 result = await CaptionService._generate_with_huggingface(
                     content, image_description, platform, style
                 )
+            write_buffer.add(
+                "GeneratedCaption", caption_row(result, content or image_description, platform)
+            )
 
             logger.info(
                 "Caption generated successfully",
                 extra={
                     "platform": platform,
-                    "provider": "openai" if use_openai else "huggingface",
+                    "provider": result["provider"],
                 }
             )
 
@@ -82,15 +101,13 @@ class CaptionService:
         # TODO: Implement OpenAI API integration  # pylint: disable=fixme
         # from openai import OpenAI
         # client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        prompt = f"Generate a {style} {platform} caption"
-        if content:
-            prompt += f" about: {content}"
-        if image_description:
-            prompt += f" with image: {image_description}"
+        prompt = prompt_registry.get("caption", style, platform, key=content or "").render(
+            content, style=style, platform=platform, image_description=image_description
+        )
 
         return {
-            "caption": f"{prompt}\n\nAmazing content! Share your thoughts! 🚀",
-            "hashtags": ["#socialmedia", "#trending", "#viral", "#inspiration"],
+            "caption": f"{prompt.messages[-1]['content']}\n\nAmazing content! Share your thoughts! 🚀",
+            "hashtags": hashtag_index.recommend(content or image_description or platform),
             "provider": "openai",
             "style": style,
         }
@@ -98,16 +115,42 @@ class CaptionService:
     @staticmethod
     async def _generate_with_huggingface(
         content: str,
-        image_description: str,  # pylint: disable=unused-argument
-        platform: str,  # pylint: disable=unused-argument
+        image_description: str,
+        platform: str,
         style: str
     ) -> Dict[str, Any]:
-        """Generate caption using HuggingFace transformers."""
-        # TODO: Implement HuggingFace model integration  # pylint: disable=fixme
-        # from transformers import pipeline
-        return {
+        """Generate caption using the local HuggingFace model engine."""
+        hashtags = hashtag_index.recommend(content or image_description or platform)
+        template_result = {
             "caption": f"Check out this amazing content! {content or 'Something interesting'}",
-            "hashtags": ["#trending", "#viral", "#content"],
+            "hashtags": hashtags,
+            "provider": "huggingface",
+            "style": style,
+        }
+
+        if not local_engine.available:
+            return template_result
+
+        prompt = f"Write a {style} {platform} caption"
+        if content:
+            prompt += f" about: {content}"
+        if image_description:
+            prompt += f". The image shows: {image_description}"
+
+        try:
+            with stage('caption', 'local_generation', model=local_engine.model_name):
+                caption = await local_engine.generate(prompt)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(
+                "Local caption generation failed, using template caption",
+                extra={"platform": platform, "error": str(e)}
+            )
+            return template_result
+
+        return {
+            "caption": caption or template_result["caption"],
+            "hashtags": hashtags,
             "provider": "huggingface",
+            "model": local_engine.model_name,
             "style": style,
         }
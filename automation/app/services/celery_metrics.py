@@ -1,8 +1,13 @@
-"""Celery metrics exporter for Prometheus."""
+"""Celery metrics exporter for Prometheus.
+
+Metrics are shared across prefork children when PROMETHEUS_MULTIPROC_DIR
+is set and served by the worker exporter (see app.utils.metrics).
+"""
 
 from prometheus_client import Counter, Histogram, Gauge
 from celery import current_app
 from app.utils.logging import logger
+from app.utils import metrics  # noqa: F401
 
 # Celery task metrics
 task_duration = Histogram(
@@ -21,7 +26,8 @@ task_count = Counter(
 queue_length = Gauge(
     'celery_queue_length',
     'Number of tasks in queue',
-    ['queue_name']
+    ['queue_name'],
+    multiprocess_mode='livemax'
 )
 
 
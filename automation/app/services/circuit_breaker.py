@@ -0,0 +1,244 @@
+"""Circuit breakers for slow or failing dependencies.
+
+A degraded dependency (OpenAI, a trends provider) otherwise makes every
+request wait out its full timeout. Each dependency gets a breaker that
+tracks its last ``window`` calls:
+
+* **closed** - calls go through. Once at least ``min_calls`` are recorded
+  and the share of failures reaches ``failure_rate`` (timeouts count as
+  failures), or the share of calls slower than ``slow_call_seconds``
+  reaches ``slow_call_rate``, the breaker opens.
+* **open** - calls raise ``CircuitOpenError`` immediately, so callers take
+  their fallback path. After ``open_seconds`` the breaker half-opens.
+* **half-open** - up to ``half_open_calls`` probe calls go through while
+  the rest are rejected. If all of them succeed the breaker closes; a
+  failed or slow probe opens it again.
+
+Thresholds can be set per dependency with ``CIRCUIT_<NAME>_<SETTING>``
+(e.g. ``CIRCUIT_OPENAI_TIMEOUT_SECONDS``) or for all of them with
+``CIRCUIT_<SETTING>`` (e.g. ``CIRCUIT_FAILURE_RATE``). Breakers are per
+process and are not thread-safe; use them from the event loop.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter, Gauge
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = Gauge(
+    'circuit_breaker_state',
+    'Circuit breaker state (0 closed, 1 half-open, 2 open)',
+    ['dependency'],
+    multiprocess_mode='livemax'
+)
+breaker_calls = Counter(
+    'circuit_breaker_calls_total',
+    'Calls through circuit breakers by outcome (success, slow, failure, rejected)',
+    ['dependency', 'outcome']
+)
+
+
+class CircuitOpenError(Exception):
+    """The dependency's breaker is open; use the fallback."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker for {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _setting(name: str, setting: str, value: Optional[float], default: float) -> float:
+    """``CIRCUIT_<NAME>_<SETTING>``, else ``value``, else ``CIRCUIT_<SETTING>``, else ``default``."""
+    specific = os.getenv(f"CIRCUIT_{name.upper().replace(':', '_').replace('-', '_')}_{setting}")
+    if specific:
+        return float(specific)
+    if value is not None:
+        return value
+    return float(os.getenv(f"CIRCUIT_{setting}") or default)
+
+
+class CircuitBreaker:
+    """Count-window circuit breaker with failure-rate and slow-call thresholds."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        timeout_seconds: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        slow_call_rate: Optional[float] = None,
+        window: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        open_seconds: Optional[float] = None,
+        half_open_calls: Optional[int] = None,
+        ignore: Optional[Callable[[BaseException], bool]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the breaker.
+
+        ``CIRCUIT_<NAME>_<SETTING>`` overrides each threshold argument; an
+        argument left as None falls back to ``CIRCUIT_<SETTING>`` and then
+        to the default given below.
+
+        Args:
+            name: Dependency name, used in metrics, logs and settings
+            timeout_seconds: Cancel calls after this long (TIMEOUT_SECONDS, default 30; 0 disables)
+            slow_call_seconds: Calls slower than this are slow (SLOW_CALL_SECONDS, default 10)
+            failure_rate: Failure share that opens the breaker (FAILURE_RATE, default 0.5)
+            slow_call_rate: Slow-call share that opens the breaker (SLOW_CALL_RATE, default 0.8)
+            window: Calls the rates are computed over (WINDOW, default 20)
+            min_calls: Calls needed before the rates apply (MIN_CALLS, default 10)
+            open_seconds: Time spent open before probing (OPEN_SECONDS, default 30)
+            half_open_calls: Probe calls while half-open (HALF_OPEN_CALLS, default 2)
+            ignore: Returns True for errors that say nothing about the
+                dependency's health (e.g. bad requests); they are not recorded
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.timeout_seconds = _setting(name, "TIMEOUT_SECONDS", timeout_seconds, 30)
+        self.slow_call_seconds = _setting(name, "SLOW_CALL_SECONDS", slow_call_seconds, 10)
+        self.failure_rate = _setting(name, "FAILURE_RATE", failure_rate, 0.5)
+        self.slow_call_rate = _setting(name, "SLOW_CALL_RATE", slow_call_rate, 0.8)
+        self.window = int(_setting(name, "WINDOW", window, 20))
+        self.min_calls = int(_setting(name, "MIN_CALLS", min_calls, 10))
+        self.open_seconds = _setting(name, "OPEN_SECONDS", open_seconds, 30)
+        self.half_open_calls = int(_setting(name, "HALF_OPEN_CALLS", half_open_calls, 2))
+        self._ignore = ignore or (lambda error: False)
+        self._clock = clock
+
+        self.state = CLOSED
+        # (failed, slow) per recorded call
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=self.window)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        breaker_state.labels(dependency=name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the breaker half-opens (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - self._clock(), 0.0)
+
+    def allows_request(self) -> bool:
+        """Whether a call would be let through now (does not reserve a probe)."""
+        if self.state == OPEN and self.retry_after <= 0:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            return self._probes_started < self.half_open_calls
+        return self.state == CLOSED
+
+    def check(self):
+        """
+        Fail fast before preparing a call the breaker would reject.
+
+        Raises:
+            CircuitOpenError: The breaker is open (or its probes are taken)
+        """
+        if not self.allows_request():
+            breaker_calls.labels(dependency=self.name, outcome="rejected").inc()
+            raise CircuitOpenError(self.name, self.retry_after)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        Await ``func(*args, **kwargs)`` through the breaker.
+
+        Raises:
+            CircuitOpenError: The breaker is open (or its probes are taken)
+            asyncio.TimeoutError: The call took longer than ``timeout_seconds``
+        """
+        self.check()
+        probe = self.state == HALF_OPEN
+        if probe:
+            self._probes_started += 1
+
+        start = self._clock()
+        outcome = None
+        try:
+            if self.timeout_seconds:
+                result = await asyncio.wait_for(func(*args, **kwargs), self.timeout_seconds)
+            else:
+                result = await func(*args, **kwargs)
+            outcome = "slow" if self._clock() - start > self.slow_call_seconds else "success"
+            return result
+        except Exception as e:
+            if not self._ignore(e):
+                outcome = "failure"
+            raise
+        finally:
+            if outcome is not None:
+                self._record(outcome, probe)
+            elif probe and self.state == HALF_OPEN and self._probes_started:
+                self._probes_started -= 1  # Cancelled or ignored; free the probe slot
+
+    def _record(self, outcome: str, probe: bool):
+        breaker_calls.labels(dependency=self.name, outcome=outcome).inc()
+        if probe and self.state == HALF_OPEN:
+            if outcome != "success":
+                self._transition(OPEN)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            return  # Late result of a call started before the breaker opened
+        self._calls.append((outcome == "failure", outcome == "slow"))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(failed for failed, _ in self._calls) / len(self._calls)
+        slow = sum(slow for _, slow in self._calls) / len(self._calls)
+        if failures >= self.failure_rate or slow >= self.slow_call_rate:
+            self._transition(OPEN, failure_rate=round(failures, 2), slow_call_rate=round(slow, 2))
+
+    def _transition(self, state: str, **details: Any):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        self._probes_started = self._probes_succeeded = 0
+        if state == CLOSED:
+            self._calls.clear()
+        breaker_state.labels(dependency=self.name).set(STATE_VALUES[state])
+        log = logger.warning if state == OPEN else logger.info
+        log(
+            "Circuit breaker state changed",
+            extra={"dependency": self.name, "from_state": previous, "to_state": state, **details}
+        )
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **defaults: Any) -> CircuitBreaker:
+    """
+    Process-wide breaker for a dependency, created on first use.
+
+    Args:
+        name: Dependency name (e.g. ``openai``, ``trends:google``)
+        **defaults: Constructor arguments for this dependency (only used
+            when the breaker is created)
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **defaults)
+    return breaker
+
+
+def breaker_states() -> Dict[str, str]:
+    """State of every breaker created in this process."""
+    return {name: breaker.state for name, breaker in _breakers.items()}
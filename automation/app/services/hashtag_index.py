@@ -0,0 +1,257 @@
+"""In-memory hashtag recommendation index built from trend data.
+
+The index maps normalized tokens to scored hashtags (an inverted index)
+and keeps hashtag co-occurrence counts so tags that trend together are
+recommended together. It is updated incrementally every time trends are
+fetched or a caption is generated, and snapshotted to disk as JSON.
+
+Every API worker builds its own index, so a snapshot adds the scores this
+worker learned since its last snapshot to the file instead of replacing
+it (see ``app.utils.snapshots``); workers pick up each other's scores
+when they load the file on startup.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.utils.logging import logger
+from app.utils.snapshots import update_json, update_json_later
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+CAMEL_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+# Last-resort tags when the index has nothing relevant yet
+DEFAULT_HASHTAGS = [
+    "#trending", "#socialmedia", "#content", "#digital", "#marketing",
+]
+
+# Keys trend providers use for the trend label and its popularity
+TREND_LABEL_KEYS = ("keyword", "hashtag", "subreddit", "name", "title")
+TREND_SCORE_KEYS = ("score", "tweet_count", "volume")
+
+# Weight of co-occurring tags relative to direct token matches
+COOCCURRENCE_WEIGHT = 0.25
+# Co-occurrence is only tracked among the top trends of a single fetch
+COOCCURRENCE_TOP_N = 10
+
+# Posting lists are pruned to their best entries so lookups stay bounded
+MAX_POSTINGS_PER_TOKEN = 100
+MAX_COOCCURRENCE_PER_TAG = 30
+
+
+def merge_snapshot(current: Optional[Dict[str, Any]], changes: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Any]:
+    """Add score increments (``{"postings": ..., "cooccurrence": ...}``) to a snapshot."""
+    merged = {}
+    for section, limit in (("postings", MAX_POSTINGS_PER_TOKEN), ("cooccurrence", MAX_COOCCURRENCE_PER_TAG)):
+        table = dict((current or {}).get(section, {}))
+        for key, increments in changes[section].items():
+            scores = dict(table.get(key, {}))
+            for entry, weight in increments.items():
+                scores[entry] = scores.get(entry, 0.0) + weight
+            table[key] = HashtagIndex._prune(scores, limit) if len(scores) > 2 * limit else scores
+        merged[section] = table
+    return merged
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Split text into lowercase tokens with a naive plural strip."""
+    text = CAMEL_PATTERN.sub(" ", text or "")
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def to_hashtag(label: str) -> Optional[str]:
+    """Convert a trend label into a hashtag (``"Machine Learning"`` -> ``#machinelearning``)."""
+    slug = "".join(TOKEN_PATTERN.findall((label or "").lower()))
+    return f"#{slug}" if slug else None
+
+
+class HashtagIndex:
+    """Inverted index from normalized tokens to scored hashtags."""
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: float = 300.0):
+        """
+        Initialize the index.
+
+        Args:
+            snapshot_path: JSON file used for snapshots (disabled when None)
+            snapshot_interval: Minimum seconds between automatic snapshots
+        """
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._cooccurrence: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # Increments since the last snapshot, merged into the file by save()
+        self._new_postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._new_cooccurrence: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._last_snapshot = time.monotonic()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        """Number of distinct tokens in the index."""
+        return len(self._postings)
+
+    def add_hashtag(self, hashtag: str, text: str, weight: float = 1.0):
+        """Index ``hashtag`` under every token of ``text`` (and of the tag itself)."""
+        hashtag = hashtag.lower()
+        for token in set(normalize_tokens(text) + normalize_tokens(hashtag)):
+            for table in (self._postings, self._new_postings):
+                self._add(table, token, hashtag, weight, MAX_POSTINGS_PER_TOKEN)
+        self._dirty = True
+
+    def add_cooccurrence(self, hashtags: Iterable[str], weight: float = 1.0):
+        """Record that ``hashtags`` appeared together."""
+        tags = {tag.lower() for tag in hashtags}
+        for tag in tags:
+            for other in tags:
+                if other != tag:
+                    for table in (self._cooccurrence, self._new_cooccurrence):
+                        self._add(table, tag, other, weight, MAX_COOCCURRENCE_PER_TAG)
+        self._dirty = True
+
+    @classmethod
+    def _add(cls, table: Dict[str, Dict[str, float]], key: str, entry: str, weight: float, limit: int):
+        """Add ``weight`` to ``table[key][entry]``, pruning the entries of ``key`` to ``limit`` when they double."""
+        scores = table[key]
+        scores[entry] = scores.get(entry, 0.0) + weight
+        if len(scores) > 2 * limit:
+            table[key] = cls._prune(scores, limit)
+
+    @staticmethod
+    def _prune(scores: Dict[str, float], keep: int) -> Dict[str, float]:
+        """Keep only the ``keep`` highest-scored entries."""
+        return dict(heapq.nlargest(keep, scores.items(), key=lambda item: item[1]))
+
+    def add_trends(self, trends: List[Dict[str, Any]]):
+        """
+        Update the index from a trends provider response.
+
+        Args:
+            trends: Trend dicts as returned by ``TrendsService`` providers
+        """
+        indexed = []
+        for trend in trends:
+            label = next((trend[key] for key in TREND_LABEL_KEYS if trend.get(key)), None)
+            hashtag = to_hashtag(str(label)) if label else None
+            if not hashtag:
+                continue
+            score = next((trend[key] for key in TREND_SCORE_KEYS if trend.get(key) is not None), 1)
+            # Log-scale so one viral trend does not drown out everything else
+            weight = 1.0 + math.log1p(max(float(score), 0.0))
+            self.add_hashtag(hashtag, str(label), weight)
+            indexed.append((weight, hashtag))
+
+        top = [tag for _, tag in heapq.nlargest(COOCCURRENCE_TOP_N, indexed)]
+        if len(top) > 1:
+            self.add_cooccurrence(top)
+        self.snapshot_if_due()
+
+    def add_caption(self, topic: str, hashtags: List[str]):
+        """Learn from the hashtags attached to a generated caption."""
+        for hashtag in hashtags:
+            self.add_hashtag(hashtag, topic, weight=0.5)
+        if len(hashtags) > 1:
+            self.add_cooccurrence(hashtags[:COOCCURRENCE_TOP_N], weight=0.5)
+
+    def top_k(self, topic: str, k: int = 10) -> List[str]:
+        """
+        Return the ``k`` best hashtags for ``topic``.
+
+        Args:
+            topic: Free-text topic
+            k: Number of hashtags to return
+
+        Returns:
+            list: Hashtags ordered by descending score
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        for token in set(normalize_tokens(topic)):
+            for hashtag, score in self._postings.get(token, {}).items():
+                scores[hashtag] += score
+
+        direct = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        for hashtag, score in direct:
+            for other, count in self._cooccurrence.get(hashtag, {}).items():
+                scores[other] += COOCCURRENCE_WEIGHT * score * count / (count + 1.0)
+
+        return [tag for tag, _ in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+
+    def recommend(self, topic: str, trend: List[str] = None, k: int = 15) -> List[str]:
+        """
+        Build a hashtag list for a caption.
+
+        Starts with tags for the topic and explicit trends, fills up from
+        the index and only then pads with ``DEFAULT_HASHTAGS``.
+        """
+        hashtags: List[str] = []
+        for label in [topic] + list(trend or [])[:5]:
+            hashtag = to_hashtag(label)
+            if hashtag and hashtag not in hashtags:
+                hashtags.append(hashtag)
+
+        query = " ".join([topic or ""] + list(trend or []))
+        for hashtag in self.top_k(query, k) + DEFAULT_HASHTAGS:
+            if len(hashtags) >= k:
+                break
+            if hashtag not in hashtags:
+                hashtags.append(hashtag)
+        return hashtags
+
+    def _take_changes(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Hand over the increments since the last snapshot (safe to merge from another thread)."""
+        changes = {"postings": dict(self._new_postings), "cooccurrence": dict(self._new_cooccurrence)}
+        self._new_postings = defaultdict(dict)
+        self._new_cooccurrence = defaultdict(dict)
+        self._last_snapshot = time.monotonic()
+        self._dirty = False
+        return changes
+
+    def save(self, path: Optional[str] = None):
+        """Merge this worker's changes into the JSON snapshot atomically."""
+        path = path or self.snapshot_path
+        if not path:
+            return
+        changes = self._take_changes()
+        update_json(path, lambda current: merge_snapshot(current, changes))
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Load a snapshot if one exists. Returns True when loaded."""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Failed to load hashtag index snapshot", extra={"error": str(e)})
+            return False
+        self._postings = defaultdict(dict, data.get("postings", {}))
+        self._cooccurrence = defaultdict(dict, data.get("cooccurrence", {}))
+        logger.info("Hashtag index loaded", extra={"tokens": len(self._postings)})
+        return True
+
+    def snapshot_if_due(self):
+        """Save a snapshot when the index changed and the interval has passed."""
+        if not self._dirty or not self.snapshot_path:
+            return
+        if time.monotonic() - self._last_snapshot < self.snapshot_interval:
+            return
+        changes = self._take_changes()
+        update_json_later(self.snapshot_path, lambda current: merge_snapshot(current, changes), "hashtag_index")
+
+
+# Process-wide index
+hashtag_index = HashtagIndex(
+    snapshot_path=os.getenv("HASHTAG_INDEX_PATH", "data/hashtag_index.json"),
+    snapshot_interval=float(os.getenv("HASHTAG_INDEX_SNAPSHOT_INTERVAL", "300")),
+)
@@ -0,0 +1,197 @@
+"""Duplicate suppression for uploads, backed by Redis.
+
+Laravel job retries, Celery retries and client retries can each resend the
+same scheduled post. Every upload with a ``scheduled_post_id`` is keyed on
+that ID plus a hash of platform, content and media, and runs through
+``IdempotencyStore.run``:
+
+* the first attempt claims the key (``SET NX`` with ``IDEMPOTENCY_LOCK_TTL``,
+  so a crashed worker's claim expires) and stores its result for
+  ``IDEMPOTENCY_TTL`` seconds;
+* duplicates arriving meanwhile poll the key and return that result, or
+  take over when the first attempt failed and released the key; after
+  ``IDEMPOTENCY_WAIT_TIMEOUT`` seconds they raise ``UploadInProgressError``;
+* duplicates arriving later return the stored result straight away.
+
+If Redis is unreachable, uploads go ahead unprotected rather than failing.
+Enabled with ``IDEMPOTENCY_ENABLED=true``.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+from app.utils.redis_clients import LoopClients
+
+idempotency_outcomes = Counter(
+    'upload_idempotency_total',
+    'Uploads by idempotency outcome (executed, replayed, waited, conflict, bypassed)',
+    ['outcome']
+)
+
+# Delete the claim only if it is still ours (it may have expired and been re-claimed)
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class UploadInProgressError(Exception):
+    """A duplicate upload did not finish within the wait timeout."""
+
+
+class IdempotencyStore:
+    """Runs each upload once per idempotency key and replays its result."""
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], Any]] = None,
+        enabled: Optional[bool] = None,
+        ttl: Optional[int] = None,
+        lock_ttl: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+        poll_interval: float = 0.2
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            client_factory: Returns an asyncio Redis client (defaults to REDIS_URL)
+            enabled: Deduplicate at all (IDEMPOTENCY_ENABLED, default false)
+            ttl: Seconds a finished result is replayed (IDEMPOTENCY_TTL, default 86400)
+            lock_ttl: Seconds an unfinished claim is held (IDEMPOTENCY_LOCK_TTL, default 300)
+            wait_timeout: Seconds a duplicate waits for the first attempt
+                (IDEMPOTENCY_WAIT_TIMEOUT, default 30)
+            poll_interval: Seconds between checks while waiting
+        """
+        if enabled is None:
+            enabled = os.getenv("IDEMPOTENCY_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.ttl = ttl or int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+        self.lock_ttl = lock_ttl or int(os.getenv("IDEMPOTENCY_LOCK_TTL", "300"))
+        self.wait_timeout = (
+            wait_timeout if wait_timeout is not None
+            else float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+        )
+        self.poll_interval = poll_interval
+        self._clients = LoopClients(client_factory)
+
+    @staticmethod
+    def key(
+        scheduled_post_id: Optional[int],
+        platform: str,
+        content: str,
+        media_urls: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """Idempotency key of an upload, or None when it has no scheduled post."""
+        if scheduled_post_id is None:
+            return None
+        payload = json.dumps([platform.lower(), content, list(media_urls or [])], ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+        return f"upload:idempotency:{scheduled_post_id}:{digest}"
+
+    def _client(self):
+        return self._clients.get()
+
+    async def close(self):
+        """Close the Redis client of the running loop (call before closing a short-lived loop)."""
+        await self._clients.close()
+
+    async def _claim(self, key: str, token: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Claim ``key``; returns ("claimed" | "done" | "in_progress", result)."""
+        client = self._client()
+        claim = json.dumps({"state": "in_progress", "token": token})
+        if await client.set(key, claim, nx=True, ex=self.lock_ttl):
+            return "claimed", None
+        raw = await client.get(key)
+        if raw is None:
+            return "released", None
+        record = json.loads(raw)
+        if record.get("state") == "done":
+            return "done", record.get("result")
+        return "in_progress", None
+
+    async def run(
+        self,
+        key: Optional[str],
+        operation: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Run ``operation`` unless an attempt with the same key ran or is running.
+
+        Args:
+            key: Idempotency key (see ``key``); None runs the operation as is
+            operation: Performs the upload and returns its (JSON-serializable) result
+
+        Returns:
+            dict: The operation's result, or the first attempt's result with
+            ``duplicate`` set to True
+
+        Raises:
+            UploadInProgressError: A concurrent duplicate is still running
+        """
+        if not self.enabled or key is None:
+            return await operation()
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        try:
+            while True:
+                state, result = await self._claim(key, token)
+                if state == "claimed":
+                    break
+                if state == "done":
+                    idempotency_outcomes.labels(outcome="waited" if waited else "replayed").inc()
+                    logger.info("Duplicate upload suppressed", extra={"idempotency_key": key})
+                    return dict(result or {}, duplicate=True)
+                if state == "released":
+                    continue  # The first attempt failed; claim it ourselves
+                if time.monotonic() >= deadline:
+                    idempotency_outcomes.labels(outcome="conflict").inc()
+                    raise UploadInProgressError(f"Upload {key} is already in progress")
+                waited = True
+                await asyncio.sleep(self.poll_interval)
+        except UploadInProgressError:
+            raise
+        except Exception as e:  # pylint: disable=broad-except
+            idempotency_outcomes.labels(outcome="bypassed").inc()
+            logger.warning(
+                "Idempotency store unavailable, uploading without duplicate check",
+                extra={"idempotency_key": key, "error": str(e)}
+            )
+            return await operation()
+
+        try:
+            result = await operation()
+        except BaseException:
+            await self._release(key, token)
+            raise
+        idempotency_outcomes.labels(outcome="executed").inc()
+        try:
+            await self._client().set(key, json.dumps({"state": "done", "result": result}), ex=self.ttl)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to store upload result", extra={"idempotency_key": key, "error": str(e)})
+        return result
+
+    async def _release(self, key: str, token: str):
+        """Drop our claim so a retry (or a waiting duplicate) can upload."""
+        claim = json.dumps({"state": "in_progress", "token": token})
+        try:
+            await self._client().eval(RELEASE_SCRIPT, 1, key, claim)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to release upload claim", extra={"idempotency_key": key, "error": str(e)})
+
+
+# Process-wide store
+idempotency_store = IdempotencyStore()
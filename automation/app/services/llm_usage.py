@@ -0,0 +1,312 @@
+"""Token accounting, budgets and output-length limits for LLM calls.
+
+* ``record_usage`` counts prompt and completion tokens from each response's
+  ``usage`` field, with their estimated cost (``LLM_PRICES``) and latency,
+  per model, style and route.
+* ``TokenBudget`` caps the tokens spent per user and in total over a
+  sliding window of ``LLM_BUDGET_WINDOW_SECONDS``, counted in Redis so
+  every worker shares it. The window is split into 60 buckets, so tokens
+  leave it a bucket at a time. A request is allowed while usage is below
+  the budget, so the last one can overshoot by one response. If Redis is
+  unreachable, calls go ahead. Enabled with ``LLM_BUDGET_ENABLED=true``.
+* ``OutputLengths`` learns how many completion tokens each caption style
+  needs and sets ``max_tokens`` a little above that (the
+  ``LLM_MAX_TOKENS_PERCENTILE`` of recent completions times
+  ``LLM_MAX_TOKENS_HEADROOM``), so a runaway generation stops sooner.
+  Truncated completions count as needing more tokens, so the limit
+  cannot shrink into truncating captions.
+
+Styles come from requests, so only ``LLM_KNOWN_STYLES`` get their own
+metric labels and learned limits; every other value is counted as
+``other``, keeping label cardinality and memory bounded.
+"""
+
+import json
+import math
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+from app.utils.redis_clients import LoopClients
+
+# USD per 1K tokens: model -> (prompt, completion); extend with LLM_PRICES (same JSON shape)
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0015, 0.002),
+}
+PRICES.update({model: tuple(price) for model, price in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+BUDGET_BUCKETS = 60
+
+KNOWN_STYLES = frozenset(
+    style.strip().lower()
+    for style in os.getenv("LLM_KNOWN_STYLES", "professional,casual,creative,humorous").split(",")
+    if style.strip()
+)
+
+llm_tokens = Counter(
+    'llm_tokens_total',
+    'LLM tokens used by model, style, route and kind (prompt, completion)',
+    ['model', 'style', 'route', 'kind']
+)
+llm_cost = Counter(
+    'llm_cost_usd_total',
+    'Estimated LLM spend in USD',
+    ['model', 'route']
+)
+llm_request_duration = Histogram(
+    'llm_request_duration_seconds',
+    'LLM completion latency in seconds',
+    ['model', 'route'],
+    buckets=[0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0]
+)
+llm_completion_size = Histogram(
+    'llm_completion_tokens',
+    'Completion tokens per LLM response',
+    ['model', 'style'],
+    buckets=[16, 32, 64, 96, 128, 192, 256, 384, 512, 1024]
+)
+llm_budget_rejections = Counter(
+    'llm_budget_rejections_total',
+    'LLM calls refused because a token budget was spent (user, global)',
+    ['scope']
+)
+
+
+class TokenBudgetExceeded(Exception):
+    """A user's or the global token budget is spent for now."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope.capitalize()} LLM token budget exceeded")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBudget:
+    """Per-user and global token budgets over a sliding window, kept in Redis."""
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], Any]] = None,
+        enabled: Optional[bool] = None,
+        global_budget: Optional[int] = None,
+        user_budget: Optional[int] = None,
+        window_seconds: Optional[int] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            client_factory: Returns an asyncio Redis client (defaults to REDIS_URL)
+            enabled: Enforce budgets at all (LLM_BUDGET_ENABLED, default false)
+            global_budget: Tokens per window for all users (LLM_GLOBAL_TOKEN_BUDGET; 0 = unlimited)
+            user_budget: Tokens per window per user (LLM_USER_TOKEN_BUDGET; 0 = unlimited)
+            window_seconds: Length of the sliding window (LLM_BUDGET_WINDOW_SECONDS, default 3600)
+            clock: Wall-clock time source (bucket keys are shared between processes)
+        """
+        if enabled is None:
+            enabled = os.getenv("LLM_BUDGET_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.global_budget = (
+            global_budget if global_budget is not None else int(os.getenv("LLM_GLOBAL_TOKEN_BUDGET", "0"))
+        )
+        self.user_budget = user_budget if user_budget is not None else int(os.getenv("LLM_USER_TOKEN_BUDGET", "0"))
+        self.window_seconds = window_seconds or int(os.getenv("LLM_BUDGET_WINDOW_SECONDS", "3600"))
+        self.bucket_seconds = self.window_seconds / BUDGET_BUCKETS
+        self._clock = clock
+        self._clients = LoopClients(client_factory)
+
+    def _client(self):
+        return self._clients.get()
+
+    async def close(self):
+        """Close the Redis client of the running loop (call before closing a short-lived loop)."""
+        await self._clients.close()
+
+    def _scopes(self, user: Optional[str]) -> List[Tuple[str, int]]:
+        """(scope, budget) pairs that apply to ``user``."""
+        scopes = []
+        if self.user_budget and user:
+            scopes.append((f"user:{user}", self.user_budget))
+        if self.global_budget:
+            scopes.append(("global", self.global_budget))
+        return scopes
+
+    def _buckets(self) -> List[int]:
+        """Bucket numbers in the current window, oldest first."""
+        current = int(self._clock() // self.bucket_seconds)
+        return list(range(current - BUDGET_BUCKETS + 1, current + 1))
+
+    async def check(self, user: Optional[str] = None):
+        """
+        Refuse a call when a budget it counts against is spent.
+
+        Raises:
+            TokenBudgetExceeded: With ``scope`` "user" or "global" and the
+            seconds until enough tokens leave the window
+        """
+        scopes = self._scopes(user) if self.enabled else []
+        if not scopes:
+            return
+        buckets = self._buckets()
+        keys = [f"llm:tokens:{scope}:{bucket}" for scope, _ in scopes for bucket in buckets]
+        try:
+            values = await self._client().mget(keys)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Token budget store unavailable, not enforcing budgets", extra={"error": str(e)})
+            return
+
+        for index, (scope, budget) in enumerate(scopes):
+            counts = [int(value or 0) for value in values[index * BUDGET_BUCKETS:(index + 1) * BUDGET_BUCKETS]]
+            excess = sum(counts) - budget
+            if excess < 0:
+                continue
+            # Wait until enough of the oldest buckets have left the window
+            for position, count in enumerate(counts):
+                excess -= count
+                if excess < 0:
+                    break
+            bucket_end = (buckets[position] + 1) * self.bucket_seconds
+            retry_after = max(bucket_end + self.window_seconds - self._clock(), 1.0)
+            kind = "user" if scope.startswith("user:") else "global"
+            llm_budget_rejections.labels(scope=kind).inc()
+            logger.warning(
+                "LLM token budget exceeded",
+                extra={"scope": scope, "budget": budget, "retry_after": round(retry_after)}
+            )
+            raise TokenBudgetExceeded(kind, retry_after)
+
+    async def consume(self, tokens: int, user: Optional[str] = None):
+        """Count ``tokens`` against every budget that applies to ``user``."""
+        if not self.enabled or not tokens:
+            return
+        bucket = self._buckets()[-1]
+        ttl = int(self.window_seconds + self.bucket_seconds) + 1
+        try:
+            client = self._client()
+            for scope, _ in self._scopes(user):
+                key = f"llm:tokens:{scope}:{bucket}"
+                await client.incrby(key, tokens)
+                await client.expire(key, ttl)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to record token usage", extra={"error": str(e)})
+
+
+def style_label(style: Optional[str]) -> str:
+    """``style`` when it is one of ``KNOWN_STYLES``, else ``other``."""
+    style = (style or "").strip().lower()
+    return style if style in KNOWN_STYLES else "other"
+
+
+class OutputLengths:
+    """Per-style ``max_tokens`` from recently observed completion lengths."""
+
+    def __init__(
+        self,
+        default: Optional[int] = None,
+        minimum: Optional[int] = None,
+        percentile: Optional[float] = None,
+        headroom: Optional[float] = None,
+        sample_size: int = 200,
+        min_samples: int = 20
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            default: Limit until enough samples exist, and the upper bound
+                (LLM_MAX_TOKENS, default 300)
+            minimum: Lower bound of the learned limit (LLM_MIN_MAX_TOKENS, default 64)
+            percentile: Completion length the limit is based on (LLM_MAX_TOKENS_PERCENTILE, default 0.95)
+            headroom: Factor applied to that length (LLM_MAX_TOKENS_HEADROOM, default 1.25)
+            sample_size: Recent completions kept per style
+            min_samples: Completions needed before learning a limit
+        """
+        self.default = default or int(os.getenv("LLM_MAX_TOKENS", "300"))
+        self.minimum = minimum or int(os.getenv("LLM_MIN_MAX_TOKENS", "64"))
+        self.percentile = percentile or float(os.getenv("LLM_MAX_TOKENS_PERCENTILE", "0.95"))
+        self.headroom = headroom or float(os.getenv("LLM_MAX_TOKENS_HEADROOM", "1.25"))
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[int]] = defaultdict(lambda: deque(maxlen=sample_size))
+
+    def observe(self, style: str, completion_tokens: int, truncated: bool = False):
+        """Record one completion; a truncated one counts as needing the full default."""
+        self._samples[style_label(style)].append(self.default if truncated else completion_tokens)
+
+    def max_tokens(self, style: str) -> int:
+        """``max_tokens`` to request for ``style``."""
+        samples = self._samples.get(style_label(style))
+        if not samples or len(samples) < self.min_samples:
+            return self.default
+        ordered = sorted(samples)
+        observed = ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)]
+        return max(self.minimum, min(self.default, math.ceil(observed * self.headroom)))
+
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call (0 for models without a price)."""
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+async def record_usage(
+    response: Any,
+    model: str,
+    style: str,
+    route: str,
+    duration: float,
+    max_tokens: int,
+    user: Optional[str] = None
+):
+    """
+    Account for one chat completion.
+
+    Args:
+        response: OpenAI chat completion (its ``usage`` may be missing)
+        model: Model that served it
+        style: Caption style
+        route: Calling operation, e.g. ``ai_caption``
+        duration: Seconds the call took
+        max_tokens: ``max_tokens`` the call was made with
+        user: User the tokens count against
+    """
+    llm_request_duration.labels(model=model, route=route).observe(duration)
+    style = style_label(style)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    llm_tokens.labels(model=model, style=style, route=route, kind="prompt").inc(prompt_tokens)
+    llm_tokens.labels(model=model, style=style, route=route, kind="completion").inc(completion_tokens)
+    llm_cost.labels(model=model, route=route).inc(cost(model, prompt_tokens, completion_tokens))
+    llm_completion_size.labels(model=model, style=style).observe(completion_tokens)
+
+    truncated = response.choices[0].finish_reason == "length"
+    output_lengths.observe(style, completion_tokens, truncated=truncated)
+    await token_budget.consume(prompt_tokens + completion_tokens, user)
+    logger.info(
+        "LLM usage",
+        extra={
+            "model": model,
+            "style": style,
+            "route": route,
+            "user": user,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "max_tokens": max_tokens,
+            "truncated": truncated,
+            "duration": round(duration, 3),
+        }
+    )
+
+
+# Process-wide instances
+token_budget = TokenBudget()
+output_lengths = OutputLengths()
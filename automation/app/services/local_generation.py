@@ -0,0 +1,229 @@
+"""CPU-only local text generation engine with dynamic batching.
+
+Used by ``CaptionService`` when no ``OPENAI_API_KEY`` is configured. The
+model is loaded once per process, concurrent requests are grouped into
+batches within a short window, and inference runs on a dedicated
+single-thread executor so the event loop never blocks on the model.
+
+Configuration (environment):
+    HF_MODEL_NAME: HuggingFace model id (default google/flan-t5-small)
+    HF_BATCH_WINDOW_MS: How long to wait for more requests (default 5)
+    HF_MAX_BATCH_SIZE: Maximum prompts per batch (default 16)
+    HF_MAX_NEW_TOKENS: Generation length limit (default 60)
+    HF_USE_ONNX: Load ONNX weights through optimum (default false)
+    HF_QUANTIZE: Apply dynamic int8 quantization to torch weights (default false)
+    HF_LOAD_RETRY_SECONDS: How long the engine stays unavailable after the
+        model failed to load, e.g. offline or a bad model id (default 300)
+
+transformers and torch are not in requirements.txt; install
+requirements-local.txt (or build the image with INSTALL_LOCAL_MODEL=true).
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from app.utils.logging import logger
+
+# Checked without importing: transformers/torch are only loaded with the model
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+GenerateFn = Callable[[List[str]], List[str]]
+
+
+class LocalGenerationEngine:
+    """Batched local text generation backed by a small seq2seq/causal model."""
+
+    def __init__(
+        self,
+        generate_fn: Optional[GenerateFn] = None,
+        batch_window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            generate_fn: Optional batch generation callable; the configured
+                HuggingFace model is loaded when omitted
+            batch_window_ms: Batching window in milliseconds
+            max_batch_size: Maximum prompts per batch
+        """
+        self.model_name = os.getenv("HF_MODEL_NAME", "google/flan-t5-small")
+        self.batch_window = (
+            batch_window_ms if batch_window_ms is not None
+            else float(os.getenv("HF_BATCH_WINDOW_MS", "5"))
+        ) / 1000
+        self.max_batch_size = max_batch_size or int(os.getenv("HF_MAX_BATCH_SIZE", "16"))
+        self.max_new_tokens = int(os.getenv("HF_MAX_NEW_TOKENS", "60"))
+        self.load_retry_seconds = float(os.getenv("HF_LOAD_RETRY_SECONDS", "300"))
+
+        self._generate_fn = generate_fn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-gen")
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._load_failed_at: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether the engine can generate text in this process (False for a while after a failed load)."""
+        if self._generate_fn is not None:
+            return True
+        if not TRANSFORMERS_AVAILABLE:
+            return False
+        return self._load_failed_at is None or time.monotonic() - self._load_failed_at >= self.load_retry_seconds
+
+    async def warm_up(self):
+        """Load the model and run one generation so the first request is fast."""
+        if not self.available:
+            logger.warning(
+                "transformers not available - local caption generation disabled "
+                "(install with: pip install transformers torch)"
+            )
+            return
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._run_batch, ["Write a caption about AI"])
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Local generation warm-up failed", extra={"error": str(e)}, exc_info=True)
+            return
+        logger.info(
+            "Local generation model warmed up",
+            extra={"model": self.model_name, "duration": time.perf_counter() - start},
+        )
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Generate text for a single prompt.
+
+        Requests arriving within the batching window are executed together.
+
+        Args:
+            prompt: Input prompt
+
+        Returns:
+            str: Generated text
+        """
+        if not self.available:
+            raise RuntimeError("Local generation engine is not available")
+
+        self._ensure_batcher()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    def _ensure_batcher(self):
+        """Start the batching task on the current event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._batcher is None or self._batcher.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._batcher = loop.create_task(self._batch_loop())
+
+    async def _batch_loop(self):
+        """Collect queued prompts into batches and run them on the executor."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                outputs = await loop.run_in_executor(self._executor, self._run_batch, prompts)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Local generation failed", extra={"error": str(e)}, exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def _run_batch(self, prompts: List[str]) -> List[str]:
+        """Run one batch synchronously (executor thread only)."""
+        if self._generate_fn is None:
+            # Batches queued behind a failed load fail fast instead of loading again
+            if not self.available:
+                raise RuntimeError("Local generation model failed to load; retrying later")
+            try:
+                self._generate_fn = self._load_model()
+            except Exception:
+                self._load_failed_at = time.monotonic()
+                raise
+        return self._generate_fn(prompts)
+
+    def _load_model(self) -> GenerateFn:
+        """Load tokenizer and model, returning a batch generation callable."""
+        from transformers import AutoConfig, AutoTokenizer  # pylint: disable=import-outside-toplevel
+
+        start = time.perf_counter()
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        is_seq2seq = AutoConfig.from_pretrained(self.model_name).is_encoder_decoder
+
+        if os.getenv("HF_USE_ONNX", "false").lower() == "true":
+            from optimum import onnxruntime  # pylint: disable=import-outside-toplevel
+            model_cls = (
+                onnxruntime.ORTModelForSeq2SeqLM if is_seq2seq
+                else onnxruntime.ORTModelForCausalLM
+            )
+            model = model_cls.from_pretrained(self.model_name, export=True)
+        else:
+            import torch  # pylint: disable=import-outside-toplevel
+            from transformers import (  # pylint: disable=import-outside-toplevel
+                AutoModelForCausalLM,
+                AutoModelForSeq2SeqLM,
+            )
+            model_cls = AutoModelForSeq2SeqLM if is_seq2seq else AutoModelForCausalLM
+            model = model_cls.from_pretrained(self.model_name)
+            model.eval()
+            if os.getenv("HF_QUANTIZE", "false").lower() == "true":
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            torch.set_grad_enabled(False)
+
+        if not is_seq2seq:
+            tokenizer.padding_side = "left"
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+
+        logger.info(
+            "Local generation model loaded",
+            extra={"model": self.model_name, "duration": time.perf_counter() - start},
+        )
+
+        def generate(prompts: List[str]) -> List[str]:
+            inputs = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True)
+            output_ids = model.generate(
+                **inputs,
+                max_new_tokens=self.max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id,
+            )
+            if not is_seq2seq:
+                output_ids = output_ids[:, inputs["input_ids"].shape[1]:]
+            return [
+                text.strip()
+                for text in tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+            ]
+
+        return generate
+
+
+# Process-wide engine (model is loaded once per process)
+local_engine = LocalGenerationEngine()
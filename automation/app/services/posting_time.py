@@ -0,0 +1,298 @@
+"""Posting-time recommender built from engagement history.
+
+Keeps one compact hour-of-week histogram per (platform, audience): a flat
+``array('d')`` of 168 slots x metrics, with the best slot maintained on
+every update so recommendations are constant-time lookups.
+
+The histograms live in Redis (``REDIS_URL``) so that every process sees
+the same history: uploads in API workers and Celery children count each
+published post, and the backend reports engagement of published posts at
+``POST /api/upload/engagement`` (the platform uploads do not return
+engagement). Each key ``posting_time:<platform>|<audience>`` is a hash of
+slot metric -> total, updated with ``HINCRBYFLOAT``. API workers keep a
+local copy, reloaded every ``POSTING_TIME_REFRESH_SECONDS``; with
+``POSTING_TIME_ENABLED=false`` histograms only live in the process.
+
+Only posts with reported engagement are scored; a post without it would
+read as a zero-engagement slot. Until engagement arrives, recommendations
+come from the platform priors below. Recommending never creates a
+histogram: platform and audience are request fields, so lookups for
+unseen pairs fall back to the platform's default audience and then to its
+prior.
+"""
+
+import asyncio
+import os
+from array import array
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.utils.logging import logger
+from app.utils.redis_clients import LoopClients
+
+HOURS_PER_WEEK = 7 * 24
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Metric columns of each slot
+METRIC_POSTS = 0  # Posts with reported engagement
+METRIC_ENGAGEMENT = 1
+METRIC_IMPRESSIONS = 2
+METRIC_PUBLISHED = 3  # All published posts
+METRIC_COUNT = 4
+
+# Redis layout: a set of "<platform>|<audience>" names and one hash per name
+INDEX_KEY = "posting_time:histograms"
+KEY_PREFIX = "posting_time:"
+
+# Bayesian smoothing: every slot starts with PRIOR_POSTS posts at the
+# platform prior, so one lucky post does not win the week
+PRIOR_POSTS = 3.0
+
+# Prior engagement per hour of day (weekdays) until real data arrives
+PLATFORM_PRIOR_HOURS = {
+    "instagram": {9: 1.2, 12: 1.3, 19: 1.4},
+    "linkedin": {8: 1.3, 9: 1.4, 12: 1.2},
+    "twitter": {9: 1.2, 12: 1.3, 17: 1.2},
+}
+
+
+def hour_of_week(moment: datetime) -> int:
+    """Slot index (0 = Monday 00:00) for a datetime."""
+    return moment.weekday() * 24 + moment.hour
+
+
+def format_slot(slot: int) -> Tuple[str, str]:
+    """Return ``(day name, "09:00 AM")`` for a slot index."""
+    day, hour = divmod(slot, 24)
+    return DAY_NAMES[day], f"{hour % 12 or 12:02d}:00 {'AM' if hour < 12 else 'PM'}"
+
+
+class EngagementHistogram:
+    """Hour-of-week engagement histogram with an incrementally maintained best slot."""
+
+    __slots__ = ("platform", "values", "best")
+
+    def __init__(self, platform: str, values: Optional[array] = None):
+        """Create an empty histogram (or wrap existing values)."""
+        self.platform = platform
+        self.values = values if values is not None else array("d", bytes(8 * HOURS_PER_WEEK * METRIC_COUNT))
+        self.best = 0
+        self._rescan()
+
+    def prior(self, slot: int) -> float:
+        """Prior engagement per post for a slot."""
+        day, hour = divmod(slot, 24)
+        weight = PLATFORM_PRIOR_HOURS.get(self.platform, PLATFORM_PRIOR_HOURS["instagram"]).get(hour, 1.0)
+        return weight if day < 5 else weight * 0.9
+
+    def score(self, slot: int) -> float:
+        """Smoothed mean engagement per post for a slot."""
+        base = slot * METRIC_COUNT
+        posts = self.values[base + METRIC_POSTS]
+        engagement = self.values[base + METRIC_ENGAGEMENT]
+        return (engagement + self.prior(slot) * PRIOR_POSTS) / (posts + PRIOR_POSTS)
+
+    def add(self, slot: int, increments: Dict[int, float]):
+        """Add ``{metric: amount}`` to a slot and update the best slot."""
+        base = slot * METRIC_COUNT
+        for metric, amount in increments.items():
+            self.values[base + metric] += amount
+
+        if slot == self.best:
+            # The leader may have dropped; rescanning 168 slots is still O(1)
+            self._rescan()
+        elif self.score(slot) > self.score(self.best):
+            self.best = slot
+
+    def _rescan(self):
+        """Recompute the best slot from scratch."""
+        self.best = max(range(HOURS_PER_WEEK), key=self.score)
+
+
+class PostingTimeRecommender:
+    """Per-platform, per-audience best posting slot recommendations."""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        refresh_interval: Optional[float] = None,
+        client_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize the recommender.
+
+        Args:
+            enabled: Share histograms through Redis (POSTING_TIME_ENABLED, default true)
+            refresh_interval: Seconds between reloads in API workers (POSTING_TIME_REFRESH_SECONDS, default 60)
+            client_factory: Returns an asyncio Redis client (defaults to REDIS_URL)
+        """
+        if enabled is None:
+            enabled = os.getenv("POSTING_TIME_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval or float(os.getenv("POSTING_TIME_REFRESH_SECONDS", "60"))
+        self._clients = LoopClients(client_factory)
+        self._histograms: Dict[Tuple[str, str], EngagementHistogram] = {}
+        # Best slot by prior alone, per platform with a prior
+        self._prior_slots: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(
+        self,
+        platform: str,
+        posted_at: datetime,
+        engagement: float = 0.0,
+        impressions: float = 0.0,
+        audience: str = "default",
+        posts: float = 1.0,
+        published: float = 0.0,
+    ):
+        """
+        Record a post (and any engagement it received) in its time slot.
+
+        Never raises: if Redis is unavailable, the post is only counted in
+        this process until the next refresh.
+
+        Args:
+            platform: Platform the post went to
+            posted_at: When the post was published (UTC)
+            engagement: Likes + comments + shares observed for the post
+            impressions: Impressions observed for the post
+            audience: Audience segment (default "default")
+            posts: Posts with engagement data to count (0 for a post without it)
+            published: Published posts to count
+        """
+        key = (platform.lower(), audience or "default")
+        slot = hour_of_week(posted_at)
+        increments = {
+            metric: float(amount)
+            for metric, amount in (
+                (METRIC_POSTS, posts),
+                (METRIC_ENGAGEMENT, engagement),
+                (METRIC_IMPRESSIONS, impressions),
+                (METRIC_PUBLISHED, published),
+            )
+            if amount
+        }
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = EngagementHistogram(key[0])
+        histogram.add(slot, increments)
+
+        if not self.enabled or not increments:
+            return
+        name = f"{key[0]}|{key[1]}"
+        try:
+            pipe = self._clients.get().pipeline(transaction=False)
+            pipe.sadd(INDEX_KEY, name)
+            for metric, amount in increments.items():
+                pipe.hincrbyfloat(KEY_PREFIX + name, str(slot * METRIC_COUNT + metric), amount)
+            await pipe.execute()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to record posting time", extra={"histogram": name, "error": str(e)})
+
+    async def record_upload_result(self, result: Dict, audience: str = "default"):
+        """
+        Count a post published by ``UploadService``.
+
+        Engagement is only recorded when the result carries ``metrics``;
+        otherwise it arrives later through ``POST /api/upload/engagement``.
+        """
+        if result.get("status") != "posted" or not result.get("platform"):
+            return
+        metrics = result.get("metrics") or {}
+        await self.record(
+            platform=result["platform"],
+            posted_at=datetime.utcnow(),
+            engagement=float(metrics.get("engagement", 0.0)),
+            impressions=float(metrics.get("impressions", 0.0)),
+            audience=audience,
+            posts=1.0 if metrics else 0.0,
+            published=1.0,
+        )
+
+    def best_slot(self, platform: str, audience: str = "default") -> Dict[str, str]:
+        """
+        Return the best day and time to post.
+
+        Args:
+            platform: Target platform
+            audience: Audience segment
+
+        Returns:
+            dict: ``{"recommended_day": "Tuesday", "recommended_time": "09:00 AM"}``
+        """
+        platform = platform.lower()
+        histogram = self._histograms.get((platform, audience or "default")) or self._histograms.get(
+            (platform, "default")
+        )
+        slot = histogram.best if histogram is not None else self._prior_slot(platform)
+        day, time_of_day = format_slot(slot)
+        return {"recommended_day": day, "recommended_time": time_of_day}
+
+    def _prior_slot(self, platform: str) -> int:
+        """Best slot by the platform prior alone (unknown platforms use Instagram's)."""
+        platform = platform if platform in PLATFORM_PRIOR_HOURS else "instagram"
+        slot = self._prior_slots.get(platform)
+        if slot is None:
+            slot = self._prior_slots[platform] = EngagementHistogram(platform).best
+        return slot
+
+    async def refresh(self) -> bool:
+        """Replace the local histograms with the shared ones. Returns True when loaded."""
+        if not self.enabled:
+            return False
+        try:
+            client = self._clients.get()
+            names = sorted(
+                name.decode() if isinstance(name, bytes) else name
+                for name in await client.smembers(INDEX_KEY)
+            )
+            pipe = client.pipeline(transaction=False)
+            for name in names:
+                pipe.hgetall(KEY_PREFIX + name)
+            hashes = await pipe.execute()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to load posting time histograms", extra={"error": str(e)})
+            return False
+
+        histograms: Dict[Tuple[str, str], EngagementHistogram] = {}
+        for name, fields in zip(names, hashes):
+            platform, _, audience = name.partition("|")
+            values = array("d", bytes(8 * HOURS_PER_WEEK * METRIC_COUNT))
+            for field, total in fields.items():
+                index = int(field)
+                if 0 <= index < len(values):
+                    values[index] = float(total)
+            histograms[(platform, audience)] = EngagementHistogram(platform, values)
+        self._histograms = histograms
+        return True
+
+    def start(self):
+        """Reload the shared histograms periodically from the running event loop."""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self):
+        """Stop reloading and close the Redis client of the running loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.close()
+
+    async def close(self):
+        """Close the Redis client of the running loop (call before closing a short-lived loop)."""
+        await self._clients.close()
+
+    async def _poll(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+
+# Process-wide recommender
+posting_time_recommender = PostingTimeRecommender()
@@ -0,0 +1,257 @@
+"""Versioned prompt templates for caption generation.
+
+Templates are registered once at import. The system message (persona,
+style and platform instructions, output format) is built into a message
+dict the first time a style and platform are used and reused after that;
+the per-request part is a short format string, so rendering only fills in
+the topic, trends and image.
+
+Everything that does not depend on the request sits in the system message,
+which always comes first. Requests for the same style and platform
+therefore share an identical prefix (``RenderedPrompt.prefix_id``), which
+providers with prompt caching (OpenAI caches repeated prefixes
+automatically) can reuse.
+
+Each template is identified by name and version, and may be specific to a
+style and/or platform; the most specific registered match is used.
+``v1`` keeps the original wording; ``v2`` is the compact default with
+about a third fewer input tokens. ``PROMPT_VERSIONS`` splits traffic between
+versions for A/B tests, e.g. ``{"ai_caption": {"v1": 0.2, "v2": 0.8}}``;
+assignment is stable per user (or topic). Every version has its own
+request, latency and token metrics.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from app.utils import metrics  # noqa: F401
+
+ANY = "*"
+
+# Compiled system messages kept per template; style and platform come from
+# requests, so further combinations are rendered without being kept
+MAX_COMPILED = 64
+
+JSON_OUTPUT_INSTRUCTION = 'Respond only with JSON: {"caption": "...", "hashtags": ["#..."]}'
+
+prompt_requests = Counter(
+    'prompt_template_requests_total',
+    'LLM requests per prompt template version',
+    ['template', 'version']
+)
+prompt_tokens = Counter(
+    'prompt_template_tokens_total',
+    'LLM tokens per prompt template version and kind (prompt, completion)',
+    ['template', 'version', 'kind']
+)
+prompt_duration = Histogram(
+    'prompt_template_duration_seconds',
+    'LLM completion latency per prompt template version in seconds',
+    ['template', 'version'],
+    buckets=[0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0]
+)
+
+
+class RenderedPrompt(NamedTuple):
+    """Messages for one request and the template they came from."""
+    messages: List[Dict[str, str]]
+    template: str
+    version: str
+    prefix_id: str  # Identifies the shared system message (the cacheable prefix)
+
+
+class PromptTemplate:
+    """A compiled prompt: a fixed system message and a per-request user message."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        version: str,
+        system: str,
+        user: str,
+        style: str = ANY,
+        platform: str = ANY,
+        trends_clause: str = "",
+        image_clause: str = "",
+        hashtags_wanted: str = "",
+        hashtags_unwanted: str = ""
+    ):
+        """
+        Compile a template.
+
+        Args:
+            name: Template name (the calling operation, e.g. ``ai_caption``)
+            version: Template version, e.g. ``v2``
+            system: System message; ``{style}`` and ``{platform}`` are filled in
+                once per style and platform
+            user: User message format with ``{topic}``, ``{trends}``, ``{image}``,
+                ``{hashtags}``, ``{style}`` and ``{platform}``
+            style: Caption style this template is for (``*`` for any)
+            platform: Platform this template is for (``*`` for any)
+            trends_clause: ``{trends}`` when there are trends (``{}`` is the list)
+            image_clause: ``{image}`` when there is an image description
+            hashtags_wanted: Appended when the model should add hashtags
+            hashtags_unwanted: Appended when the hashtag index supplies them
+        """
+        self.name = name
+        self.version = version
+        self.style = style
+        self.platform = platform
+        self._system = system
+        self._user = user
+        self._trends_clause = trends_clause
+        self._image_clause = image_clause
+        self._hashtags = {True: hashtags_wanted, False: hashtags_unwanted}
+        # (style, platform, json_output) -> (system message, prefix id)
+        self._compiled: Dict[Tuple[str, str, bool], Tuple[Dict[str, str], str]] = {}
+
+    def _system_message(self, style: str, platform: str, json_output: bool) -> Tuple[Dict[str, str], str]:
+        key = (style, platform, json_output)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            content = self._system.format(style=style, platform=platform)
+            if json_output:
+                content += " " + JSON_OUTPUT_INSTRUCTION
+            prefix_id = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+            compiled = ({"role": "system", "content": content}, prefix_id)
+            if len(self._compiled) < MAX_COMPILED:
+                self._compiled[key] = compiled
+        return compiled
+
+    def render(
+        self,
+        topic: str,
+        trends: Optional[List[str]] = None,
+        style: str = "professional",
+        platform: str = "instagram",
+        image_description: Optional[str] = None,
+        want_hashtags: bool = True,
+        json_output: bool = False
+    ) -> RenderedPrompt:
+        """Messages for one request (the system message dict is shared; do not modify it)."""
+        system, prefix_id = self._system_message(style, platform, json_output)
+        user = self._user.format(
+            topic=topic or "",
+            trends=self._trends_clause.format(", ".join(trends[:5])) if trends else "",
+            image=self._image_clause.format(image_description) if image_description else "",
+            hashtags=self._hashtags[want_hashtags],
+            style=style,
+            platform=platform,
+        ).strip()
+        return RenderedPrompt([system, {"role": "user", "content": user}], self.name, self.version, prefix_id)
+
+
+def observe(prompt: RenderedPrompt, duration: float, usage: Any = None):
+    """Record one completion made with ``prompt`` against its template version."""
+    prompt_requests.labels(template=prompt.template, version=prompt.version).inc()
+    prompt_duration.labels(template=prompt.template, version=prompt.version).observe(duration)
+    if usage is not None:
+        prompt_tokens.labels(template=prompt.template, version=prompt.version, kind="prompt").inc(
+            usage.prompt_tokens or 0
+        )
+        prompt_tokens.labels(template=prompt.template, version=prompt.version, kind="completion").inc(
+            usage.completion_tokens or 0
+        )
+
+
+class PromptRegistry:
+    """Templates by name, version, style and platform."""
+
+    def __init__(self, versions: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            versions: Traffic split per template name, ``{name: {version: weight}}``
+                (PROMPT_VERSIONS); names without a split use their latest version
+        """
+        if versions is None:
+            versions = json.loads(os.getenv("PROMPT_VERSIONS", "{}"))
+        self.versions = versions
+        self._templates: Dict[Tuple[str, str, str, str], PromptTemplate] = {}
+        self._latest: Dict[str, str] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        """Add a template; the last version registered for a name is its default."""
+        self._templates[(template.name, template.version, template.style, template.platform)] = template
+        self._latest[template.name] = template.version
+        return template
+
+    def version_for(self, name: str, key: str = "") -> str:
+        """Version of ``name`` serving ``key`` (stable for the same key)."""
+        split = self.versions.get(name)
+        if not split:
+            return self._latest[name]
+        point = (zlib.crc32(f"{name}:{key}".encode("utf-8")) % 10000) / 10000 * sum(split.values())
+        for version, weight in split.items():
+            point -= weight
+            if point < 0:
+                return version
+        return list(split)[-1]
+
+    def get(self, name: str, style: str = ANY, platform: str = ANY, key: str = "") -> PromptTemplate:
+        """
+        Most specific template of the version serving ``key``.
+
+        Raises:
+            KeyError: No template registered for the name and version
+        """
+        version = self.version_for(name, key)
+        for candidate in ((style, platform), (style, ANY), (ANY, platform), (ANY, ANY)):
+            template = self._templates.get((name, version, *candidate))
+            if template is not None:
+                return template
+        raise KeyError(f"No prompt template {name} {version}")
+
+
+registry = PromptRegistry()
+
+# Original wording, kept as the A/B baseline
+registry.register(PromptTemplate(
+    "ai_caption", "v1",
+    system=(
+        "You are an expert social media content creator "
+        "specializing in viral, engaging captions."
+    ),
+    user="Generate a {style} social media caption about: {topic}{trends}\n\n{hashtags}",
+    trends_clause=" incorporating these trends: {}",
+    hashtags_wanted="Include relevant hashtags (10-15).",
+    hashtags_unwanted="Do not include hashtags.",
+))
+registry.register(PromptTemplate(
+    "caption", "v1",
+    system="You are an expert social media content creator.",
+    user="Generate a {style} {platform} caption about: {topic}{image}",
+    image_clause=" with image: {}",
+))
+
+# Compact default: fixed instructions in the shared system message, only the
+# request itself in the user message
+PLATFORM_HINTS = {
+    ANY: "",
+    "instagram": " Line breaks and a few emojis are welcome.",
+    "linkedin": " Keep it professional, at most two emojis.",
+    "twitter": " Stay under 280 characters.",
+}
+for _platform, _hint in PLATFORM_HINTS.items():
+    registry.register(PromptTemplate(
+        "ai_caption", "v2",
+        system="Write one viral, engaging {style} {platform} caption." + _hint,
+        user="Topic: {topic}{trends}\n{hashtags}",
+        platform=_platform,
+        trends_clause="\nTrends: {}",
+        hashtags_wanted="Add 10-15 hashtags.",
+        hashtags_unwanted="No hashtags.",
+    ))
+    registry.register(PromptTemplate(
+        "caption", "v2",
+        system="Write one {style} {platform} caption." + _hint,
+        user="Topic: {topic}{image}",
+        platform=_platform,
+        image_clause="\nImage: {}",
+    ))
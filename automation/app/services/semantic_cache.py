@@ -0,0 +1,250 @@
+"""Semantic cache for AI captions.
+
+Caption requests that differ only trivially ("AI trends" vs "ai trend")
+would miss an exact-match cache. Each request's normalized topic and its
+trends are embedded into separate unit vectors. An OpenAI caption stored
+for a request in the same bucket (the caller's key for everything that
+shapes the caption besides the text: style, platform, prompt version) is
+returned instead of calling the model again when both the topics and the
+trends have cosine similarity of at least ``SEMANTIC_CACHE_THRESHOLD`` and
+the topics contain the same numbers. Requests share their trend lists, so one combined vector would
+let different topics ("vegan menu", "keto menu") match on the trends
+alone; numbers ("20% off", "50% off") change the meaning of otherwise
+near-identical topics.
+
+Vectors come from a small sentence-embedding model when
+``SEMANTIC_CACHE_MODEL`` names one and ``sentence-transformers`` is
+installed, and otherwise from ``HashingVectorizer`` (hashed word and
+character-trigram features, no dependencies). They live in preallocated
+NumPy matrices of ``SEMANTIC_CACHE_SIZE`` rows, overwritten oldest first;
+a lookup is one matrix-vector product per matrix.
+Entries expire after ``SEMANTIC_CACHE_TTL`` seconds.
+
+Enabled with ``SEMANTIC_CACHE_ENABLED=true``.
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+from app.services.hashtag_index import normalize_tokens
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+
+# Checked without importing: sentence-transformers/torch are only loaded with the model
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+cache_requests = Counter(
+    'semantic_cache_requests_total',
+    'Semantic caption cache lookups by outcome (hit, miss)',
+    ['outcome']
+)
+cache_lookup_duration = Histogram(
+    'semantic_cache_lookup_seconds',
+    'Semantic caption cache lookup latency (embedding and search) in seconds',
+    buckets=[0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+cache_similarity = Histogram(
+    'semantic_cache_best_similarity',
+    'Cosine similarity of the closest cached caption per lookup (the lower of topic and trend similarity)',
+    buckets=[0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0]
+)
+
+
+def cache_text(topic: str, trend: Optional[List[str]] = None) -> Tuple[str, str]:
+    """Normalized request text: the topic tokens and the sorted trend tokens."""
+    trend_tokens = sorted({token for item in trend or [] for token in normalize_tokens(item)})
+    return " ".join(normalize_tokens(topic)), " ".join(trend_tokens)
+
+
+def numbers_key(topic_text: str) -> int:
+    """Stable key of the numbers in a normalized topic (0 when there are none)."""
+    numbers = sorted(token for token in topic_text.split() if any(char.isdigit() for char in token))
+    return zlib.crc32(" ".join(numbers).encode("utf-8")) if numbers else 0
+
+
+class HashingVectorizer:
+    """Signed feature hashing of words and character trigrams into unit vectors."""
+
+    def __init__(self, dims: int = 512):
+        self.dims = dims
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in text.split():
+            features.append(f"w:{word}")
+            padded = f"^{word}$"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dims) float32 matrix of unit rows."""
+        vectors = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, digest % self.dims] += 1.0 if digest & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SemanticCache:
+    """Nearest-neighbour cache of captions over request embeddings."""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        threshold: Optional[float] = None,
+        capacity: Optional[int] = None,
+        ttl: Optional[float] = None,
+        embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+        dims: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            enabled: Serve and store captions at all (SEMANTIC_CACHE_ENABLED, default false)
+            threshold: Minimum cosine similarity of both the topics and the trends
+                of a hit (SEMANTIC_CACHE_THRESHOLD, default 0.9)
+            capacity: Entries kept (SEMANTIC_CACHE_SIZE, default 5000)
+            ttl: Seconds an entry is served (SEMANTIC_CACHE_TTL, default 86400)
+            embed: Batch embedding callable returning unit rows; defaults to
+                SEMANTIC_CACHE_MODEL, else the hashing vectorizer
+            dims: Hashing vectorizer size (SEMANTIC_CACHE_DIMS, default 512)
+            clock: Monotonic time source
+        """
+        if enabled is None:
+            enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.capacity = capacity or int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+        self.ttl = ttl or float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+        self._clock = clock
+
+        self._embed = embed
+        self._offload = False  # Model inference runs in a thread; hashing inline
+        self.model_name = os.getenv("SEMANTIC_CACHE_MODEL", "")
+        if embed is None:
+            if self.model_name and SENTENCE_TRANSFORMERS_AVAILABLE:
+                self._embed = self._model_embed
+                self._offload = True
+            else:
+                if self.model_name:
+                    logger.warning(
+                        "sentence-transformers not available - using hashed n-gram embeddings "
+                        "(install with: pip install sentence-transformers)"
+                    )
+                self.model_name = "hashing"
+                self._embed = HashingVectorizer(dims or int(os.getenv("SEMANTIC_CACHE_DIMS", "512"))).embed
+        self._model: Any = None
+
+        # Allocated on first store (the model's dimension is known then)
+        self._topics: Optional[np.ndarray] = None
+        self._trends: Optional[np.ndarray] = None
+        self._has_trends = np.zeros(self.capacity, dtype=bool)
+        self._numbers = np.zeros(self.capacity, dtype=np.int64)
+        self._bucket_ids: Dict[str, int] = {}
+        self._buckets = np.full(self.capacity, -1, dtype=np.int32)
+        self._expires = np.zeros(self.capacity, dtype=np.float64)
+        self._payloads: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._next = 0
+
+    def __len__(self) -> int:
+        """Number of unexpired entries."""
+        return int(np.count_nonzero(self._expires > self._clock()))
+
+    def _model_embed(self, texts: List[str]) -> np.ndarray:
+        """Embed with the sentence-transformers model (loaded on first use)."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer  # pylint: disable=import-outside-toplevel,import-error
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+            logger.info("Semantic cache model loaded", extra={"model": self.model_name})
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    async def _vectors(self, topic_text: str, trend_text: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Topic and trend vectors (no trend vector without trends)."""
+        texts = [topic_text, trend_text] if trend_text else [topic_text]
+        vectors = await asyncio.to_thread(self._embed, texts) if self._offload else self._embed(texts)
+        return vectors[0], (vectors[1] if trend_text else None)
+
+    async def lookup(self, topic: str, bucket: str, trend: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cached caption for a near-identical request in the same bucket.
+
+        Returns:
+            dict: A copy of the stored result marked ``cached``, or None
+        """
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        best, index = 0.0, -1
+        bucket_id = self._bucket_ids.get(bucket)
+        if bucket_id is not None:
+            topic_text, trend_text = cache_text(topic, trend)
+            topic_vector, trend_vector = await self._vectors(topic_text, trend_text)
+            scores = self._topics @ topic_vector
+            # Other buckets, other numbers and expired (or empty) rows never match
+            scores[
+                (self._buckets != bucket_id)
+                | (self._numbers != numbers_key(topic_text))
+                | (self._expires <= self._clock())
+            ] = -1.0
+            index = int(np.argmax(scores))
+            best = float(scores[index])
+            # A hit also needs similar trends; no trends only match no trends
+            candidates = np.flatnonzero(scores >= self.threshold)
+            if candidates.size:
+                if trend_vector is None:
+                    trend_scores = np.where(self._has_trends[candidates], 0.0, 1.0)
+                else:
+                    trend_scores = np.where(
+                        self._has_trends[candidates], self._trends[candidates] @ trend_vector, 0.0
+                    )
+                combined = np.minimum(scores[candidates], trend_scores)
+                best_candidate = int(np.argmax(combined))
+                index, best = int(candidates[best_candidate]), float(combined[best_candidate])
+        cache_lookup_duration.observe(time.perf_counter() - start)
+        cache_similarity.observe(max(best, 0.0))
+
+        if index < 0 or best < self.threshold:
+            cache_requests.labels(outcome="miss").inc()
+            return None
+        cache_requests.labels(outcome="hit").inc()
+        logger.info(
+            "Semantic cache hit",
+            extra={"topic": topic, "bucket": bucket, "similarity": round(best, 3)}
+        )
+        return dict(self._payloads[index], cached=True)
+
+    async def store(self, topic: str, bucket: str, trend: Optional[List[str]], result: Dict[str, Any]):
+        """Remember a generated caption, replacing the oldest entry when full."""
+        if not self.enabled:
+            return
+        topic_text, trend_text = cache_text(topic, trend)
+        topic_vector, trend_vector = await self._vectors(topic_text, trend_text)
+        if self._topics is None:
+            self._topics = np.zeros((self.capacity, topic_vector.shape[0]), dtype=np.float32)
+            self._trends = np.zeros((self.capacity, topic_vector.shape[0]), dtype=np.float32)
+        slot = self._next
+        self._next = (slot + 1) % self.capacity
+        self._topics[slot] = topic_vector
+        self._has_trends[slot] = trend_vector is not None
+        if trend_vector is not None:
+            self._trends[slot] = trend_vector
+        self._numbers[slot] = numbers_key(topic_text)
+        self._buckets[slot] = self._bucket_ids.setdefault(bucket, len(self._bucket_ids))
+        self._expires[slot] = self._clock() + self.ttl
+        self._payloads[slot] = dict(result)
+
+
+# Process-wide cache
+caption_cache = SemanticCache()
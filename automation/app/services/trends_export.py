@@ -0,0 +1,172 @@
+"""Streaming export of trends for large keyword sets.
+
+``GET``/``POST /api/trends/export`` split the keywords into batches of
+``TRENDS_EXPORT_BATCH_SIZE`` (pytrends compares at most five keywords per
+request) and fetch up to ``TRENDS_EXPORT_PREFETCH`` batches concurrently
+while earlier ones are written out, in keyword order, as NDJSON or CSV.
+At most that many batches are held at once, so memory stays flat however
+many keywords are exported.
+
+Every record carries a ``cursor``: an opaque token for the position right
+after it. Passing the cursor of the last complete line back restarts the
+export there (the batch is fetched again and the records already sent are
+skipped). Cursors are bound to the platform, keywords, timeframe and batch
+size they were issued for. If a provider fails mid-export the stream is cut
+off rather than ended cleanly, so clients notice and resume.
+"""
+
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.trends_service import TrendsService
+from app.utils.logging import logger
+
+EXPORT_BATCH_SIZE = int(os.getenv("TRENDS_EXPORT_BATCH_SIZE", "5"))
+EXPORT_PREFETCH = int(os.getenv("TRENDS_EXPORT_PREFETCH", "4"))
+EXPORT_MAX_KEYWORDS = int(os.getenv("TRENDS_EXPORT_MAX_KEYWORDS", "10000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# CSV columns per platform, after "cursor" (other record fields are dropped)
+CSV_FIELDS = {
+    "google": ["keyword", "score"],
+    "reddit": ["subreddit", "score"],
+    "twitter": ["hashtag", "tweet_count"],
+}
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or belongs to a different export."""
+
+
+class TrendsExport:
+    """One export request: its batches, cursors and encoders."""
+
+    def __init__(
+        self,
+        platform: str,
+        keywords: List[str],
+        timeframe: str = "today 12-m",
+        batch_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ):
+        """
+        Initialize the export.
+
+        Args:
+            platform: Source platform (google, reddit, twitter)
+            keywords: Keywords to export, in output order
+            timeframe: Timeframe for Google Trends
+            batch_size: Keywords per provider request (TRENDS_EXPORT_BATCH_SIZE)
+            prefetch: Batches fetched ahead of the writer (TRENDS_EXPORT_PREFETCH)
+
+        Raises:
+            ValueError: Unsupported platform
+        """
+        platform = platform.lower()
+        if platform not in TrendsService.SUPPORTED_PLATFORMS:
+            raise ValueError(f"Unsupported platform: {platform}")
+        self.platform = platform
+        self.keywords = keywords
+        self.timeframe = timeframe
+        self.batch_size = max(batch_size or EXPORT_BATCH_SIZE, 1)
+        self.prefetch = max(prefetch or EXPORT_PREFETCH, 1)
+        fingerprint = json.dumps([platform, keywords, timeframe, self.batch_size], ensure_ascii=False)
+        self._fingerprint = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+    def cursor(self, batch: int, record: int) -> str:
+        """Opaque cursor for the position before ``record`` of ``batch``."""
+        raw = json.dumps([self._fingerprint, batch, record]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def parse_cursor(self, cursor: Optional[str]) -> Tuple[int, int]:
+        """
+        Position a cursor points to.
+
+        Returns:
+            tuple: (batch, record); (0, 0) without a cursor
+
+        Raises:
+            InvalidCursorError: Malformed or issued for another export
+        """
+        if not cursor:
+            return 0, 0
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            fingerprint, batch, record = json.loads(raw)
+            valid = isinstance(batch, int) and isinstance(record, int) and batch >= 0 and record >= 0
+        except (ValueError, TypeError) as e:
+            raise InvalidCursorError("Malformed cursor") from e
+        if fingerprint != self._fingerprint or not valid:
+            raise InvalidCursorError("Cursor does not belong to this export")
+        return batch, record
+
+    def _batch_keywords(self, batch: int) -> List[str]:
+        return self.keywords[batch * self.batch_size:(batch + 1) * self.batch_size]
+
+    async def _fetch(self, batch: int) -> List[Dict[str, Any]]:
+        result = await TrendsService.fetch_batch(self.platform, self._batch_keywords(batch), self.timeframe)
+        return result.get("trends", [])
+
+    async def records(self, cursor: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Trend records batch by batch, each with its resume ``cursor``.
+
+        Fetches run up to ``prefetch`` batches ahead; results are yielded in
+        keyword order. Pending fetches are cancelled when the consumer stops.
+        """
+        start_batch, skip = self.parse_cursor(cursor)
+        batches = max((len(self.keywords) + self.batch_size - 1) // self.batch_size, 1)
+        pending: "deque[Tuple[int, asyncio.Task]]" = deque()
+        next_batch = start_batch
+        try:
+            while pending or next_batch < batches:
+                while next_batch < batches and len(pending) < self.prefetch:
+                    pending.append((next_batch, asyncio.create_task(self._fetch(next_batch))))
+                    next_batch += 1
+                batch, task = pending.popleft()
+                trends = await task
+                records = []
+                for index, trend in enumerate(trends):
+                    if batch == start_batch and index < skip:
+                        continue
+                    last = index == len(trends) - 1
+                    position = (batch + 1, 0) if last else (batch, index + 1)
+                    records.append(dict(trend, cursor=self.cursor(*position)))
+                yield records
+        except Exception as e:
+            logger.error(
+                "Trends export failed",
+                extra={"platform": self.platform, "keyword_count": len(self.keywords), "error": str(e)},
+                exc_info=True
+            )
+            raise
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def ndjson(self, cursor: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Records as newline-delimited JSON, one chunk per batch."""
+        async for records in self.records(cursor):
+            if records:
+                yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+    async def csv(self, cursor: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Records as CSV, one chunk per batch; the header is left out when resuming."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=["cursor"] + CSV_FIELDS[self.platform], extrasaction="ignore")
+        if not cursor:
+            writer.writeheader()
+        async for records in self.records(cursor):
+            writer.writerows(records)
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
@@ -1,12 +1,52 @@
 """Service for fetching trends from various platforms."""
 
-from typing import Dict, Any, List
+import os
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from app.database.rows import trend_rows
+from app.database.write_buffer import write_buffer
+from app.services.circuit_breaker import CircuitBreaker, get_breaker
+from app.services.hashtag_index import hashtag_index
 from app.utils.logging import logger
+from app.utils.tracing import stage
+
+FALLBACK_CACHE_SIZE = int(os.getenv("TRENDS_FALLBACK_CACHE_SIZE", "256"))
+
+
+class RecentTrends:
+    """Last good result per request, served while a provider is failing."""
+
+    def __init__(self, size: int = FALLBACK_CACHE_SIZE):
+        self.size = size
+        self._results: "OrderedDict[Tuple[str, Tuple[str, ...], str], Dict[str, Any]]" = OrderedDict()
+
+    def put(self, platform: str, keywords: List[str], timeframe: str, result: Dict[str, Any]):
+        """Remember a fresh result."""
+        key = (platform.lower(), tuple(keywords or []), timeframe)
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+    def get(self, platform: str, keywords: List[str], timeframe: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for the same platform, keywords and timeframe.
+
+        Returns:
+            dict: The result marked ``cached``, or None if this request has none
+        """
+        result = self._results.get((platform.lower(), tuple(keywords or []), timeframe))
+        return None if result is None else dict(result, cached=True)
+
+
+recent_trends = RecentTrends()
 
 
 class TrendsService:
     """Service for fetching trends from social media platforms."""
 
+    SUPPORTED_PLATFORMS = ("google", "reddit", "twitter")
+
     @staticmethod
     async def fetch_trends(
         platform: str,
@@ -33,14 +73,26 @@ class TrendsService:
         )
 
         try:
-            if platform.lower() == "google":
-                result = await TrendsService._fetch_google_trends(keywords, timeframe)
-            elif platform.lower() == "reddit":
-                result = await TrendsService._fetch_reddit_trends(keywords)
-            elif platform.lower() == "twitter":
-                result = await TrendsService._fetch_twitter_trends(keywords)
-            else:
-                raise ValueError(f"Unsupported platform: {platform}")
+            try:
+                result = await TrendsService.fetch_batch(platform, keywords, timeframe)
+            except ValueError:
+                raise
+            except Exception as e:  # Includes CircuitOpenError
+                # Degrade to the last good trends instead of failing
+                cached = recent_trends.get(platform, keywords, timeframe)
+                if cached is None:
+                    raise
+                logger.warning(
+                    "Trends provider unavailable, serving cached trends",
+                    extra={"platform": platform, "error": str(e)}
+                )
+                return cached
+            recent_trends.put(platform, keywords, timeframe, result)
+
+            # Feed the hashtag recommendation index
+            hashtag_index.add_trends(result.get("trends", []))
+            # Keep a snapshot for trend history (written in the background)
+            write_buffer.add("TrendSnapshot", trend_rows(platform, result.get("trends", [])))
 
             logger.info(
                 "Trends fetched successfully",
@@ -63,6 +115,39 @@ class TrendsService:
             )
             raise
 
+    @staticmethod
+    async def fetch_batch(
+        platform: str,
+        keywords: List[str] = None,
+        timeframe: str = "today 12-m"
+    ) -> Dict[str, Any]:
+        """
+        Fetch trends from the platform's provider only.
+
+        Unlike ``fetch_trends`` this neither logs nor records the trends (no
+        hashtag index update, no snapshot, no cached fallback), so exports can
+        call it per batch. Calls go through the provider's circuit breaker.
+
+        Raises:
+            ValueError: Unsupported platform
+            CircuitOpenError: The provider's breaker is open
+        """
+        platform = platform.lower()
+        fetchers = {
+            "google": lambda: TrendsService._fetch_google_trends(keywords, timeframe),
+            "reddit": lambda: TrendsService._fetch_reddit_trends(keywords),
+            "twitter": lambda: TrendsService._fetch_twitter_trends(keywords),
+        }
+        if platform not in fetchers:
+            raise ValueError(f"Unsupported platform: {platform}")
+        with stage('trends', f'fetch_{platform}'):
+            return await TrendsService.breaker(platform).call(fetchers[platform])
+
+    @staticmethod
+    def breaker(platform: str) -> CircuitBreaker:
+        """Circuit breaker of a platform's provider (``trends:<platform>``)."""
+        return get_breaker(f"trends:{platform.lower()}", timeout_seconds=10, slow_call_seconds=5)
+
     @staticmethod
     async def _fetch_google_trends(
         keywords: List[str] = None,  # pylint: disable=unused-argument
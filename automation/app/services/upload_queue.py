@@ -0,0 +1,111 @@
+"""Enqueue uploads for the Celery worker and report their progress.
+
+Used by ``POST /api/upload`` in async mode: the request is validated and
+handed to ``tasks.auto_upload`` instead of being uploaded inline, and the
+returned task ID is polled with ``GET /api/upload/{task_id}`` (the worker
+also delivers the callback). ``POST /api/upload/bulk`` publishes a single
+``tasks.auto_upload_bulk`` message whose items carry pre-assigned task IDs;
+the worker fans it out into ``tasks.auto_upload`` tasks with those IDs.
+Broker and result-backend calls block, so the API runs these functions in
+the threadpool.
+"""
+
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.utils.logging import logger
+
+# Celery task states as reported by GET /api/upload/{task_id}.
+# PENDING also covers unknown (or expired) task IDs.
+TASK_STATUS = {
+    "PENDING": "queued",
+    "RECEIVED": "queued",
+    "STARTED": "running",
+    "RETRY": "retrying",
+    "SUCCESS": "succeeded",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+
+
+def _celery_app():
+    """The worker's Celery app (imported on first use to keep API startup light)."""
+    from tasks import celery_app  # pylint: disable=import-outside-toplevel
+    return celery_app
+
+
+class UploadQueue:
+    """Hands uploads to ``tasks.auto_upload`` and looks up their state."""
+
+    @staticmethod
+    def enqueue(
+        platform: str,
+        content: str,
+        media_urls: Optional[List[str]] = None,
+        scheduled_post_id: Optional[int] = None,
+        callback_url: Optional[str] = None
+    ) -> str:
+        """
+        Publish one upload to the ``uploads`` queue.
+
+        Returns:
+            str: Celery task ID
+        """
+        from tasks import auto_upload  # pylint: disable=import-outside-toplevel
+        async_result = auto_upload.apply_async(
+            kwargs={
+                "scheduled_post_id": scheduled_post_id,
+                "platform": platform,
+                "content": content,
+                "media_urls": media_urls or [],
+                "callback_url": callback_url,
+            },
+            queue="uploads",
+        )
+        logger.info(
+            "Upload queued",
+            extra={
+                "task_id": async_result.id,
+                "platform": platform,
+                "scheduled_post_id": scheduled_post_id,
+            }
+        )
+        return async_result.id
+
+    @staticmethod
+    def enqueue_many(uploads: List[Dict[str, Any]]) -> List[str]:
+        """
+        Publish many uploads in one broker message.
+
+        Args:
+            uploads: ``auto_upload`` keyword arguments per upload
+
+        Returns:
+            list: Task ID of each upload, in order
+        """
+        from tasks import auto_upload_bulk  # pylint: disable=import-outside-toplevel
+        task_ids = [str(uuid.uuid4()) for _ in uploads]
+        auto_upload_bulk.apply_async(
+            kwargs={"uploads": [dict(upload, task_id=task_id) for upload, task_id in zip(uploads, task_ids)]},
+            queue="uploads",
+        )
+        logger.info("Uploads queued in bulk", extra={"count": len(uploads)})
+        return task_ids
+
+    @staticmethod
+    def status(task_id: str) -> Dict[str, Any]:
+        """
+        Current state of an upload task.
+
+        Returns:
+            dict: ``task_id``, ``status`` (see ``TASK_STATUS``) and the upload
+            ``result`` or ``error`` once finished
+        """
+        async_result = _celery_app().AsyncResult(task_id)
+        state = async_result.state
+        status = {"task_id": task_id, "status": TASK_STATUS.get(state, state.lower())}
+        if state == "SUCCESS":
+            status["result"] = async_result.result
+        elif state in ("FAILURE", "RETRY", "REVOKED"):
+            status["error"] = str(async_result.result)
+        return status
@@ -1,12 +1,19 @@
 """Service for handling social media uploads."""
 
 from typing import Dict, Any
+from app.database.rows import upload_row
+from app.database.write_buffer import write_buffer
+from app.services.idempotency import idempotency_store
+from app.services.posting_time import posting_time_recommender
 from app.utils.logging import logger
+from app.utils.tracing import stage
 
 
 class UploadService:
     """Service for uploading content to social media platforms."""
 
+    SUPPORTED_PLATFORMS = ("instagram", "linkedin")
+
     @staticmethod
     async def upload_to_platform(
         platform: str,
@@ -18,6 +25,10 @@ class UploadService:
         """
         Upload content to specified social media platform.
 
+        Repeated uploads of the same scheduled post and content run once; the
+        duplicates get the first result back with ``duplicate`` set (see
+        ``app.services.idempotency``).
+
         Args:
             platform: Target platform (instagram, linkedin, twitter, etc.)
             content: Text content to post
@@ -27,7 +38,24 @@ class UploadService:
 
         Returns:
             dict: Upload result with status and details
+
+        Raises:
+            UploadInProgressError: The same upload is still running elsewhere
         """
+        key = idempotency_store.key(scheduled_post_id, platform, content, media_urls)
+        return await idempotency_store.run(
+            key,
+            lambda: UploadService._upload(platform, content, media_urls, scheduled_post_id),
+        )
+
+    @staticmethod
+    async def _upload(
+        platform: str,
+        content: str,
+        media_urls: list,
+        scheduled_post_id: int
+    ) -> Dict[str, Any]:
+        """Upload once and record the outcome."""
         logger.info(
             "Starting upload",
             extra={
@@ -40,19 +68,27 @@ class UploadService:
         try:
             # Platform-specific upload logic
             if platform.lower() == "instagram":
-                result = await UploadService._upload_to_instagram(
-                    content, media_urls or []
-                )
+                with stage('upload', 'platform_api', platform=platform):
+                    result = await UploadService._upload_to_instagram(
+                        content, media_urls or []
+                    )
             elif platform.lower() == "linkedin":
-                result = await UploadService._upload_to_linkedin(
-                    content, media_urls or []
-                )
+                with stage('upload', 'platform_api', platform=platform):
+                    result = await UploadService._upload_to_linkedin(
+                        content, media_urls or []
+                    )
             else:
                 raise ValueError(f"Unsupported platform: {platform}")
 
             result["scheduled_post_id"] = scheduled_post_id
             result["platform"] = platform
 
+            # Count the post for posting-time recommendations
+            await posting_time_recommender.record_upload_result(result)
+            write_buffer.add("UploadResult", upload_row(
+                platform, result.get("status", "posted"), scheduled_post_id, result=result
+            ))
+
             logger.info(
                 "Upload successful",
                 extra={
@@ -64,6 +100,9 @@ class UploadService:
             return result
 
         except Exception as e:
+            write_buffer.add("UploadResult", upload_row(
+                platform, "failed", scheduled_post_id, error=str(e)
+            ))
             logger.error(
                 "Upload failed",
                 extra={
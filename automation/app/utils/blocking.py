@@ -0,0 +1,200 @@
+"""Event loop blocking detection with per-route attribution.
+
+A heartbeat task on the event loop stamps the time every few milliseconds.
+A watchdog thread notices when the stamp goes stale for longer than
+``LOOP_BLOCK_THRESHOLD_MS``, captures the stack of the loop thread at that
+moment (the code that is blocking) and looks up the route served by the
+running task. When the loop comes back, the stall is logged and recorded in
+``event_loop_blocked_total`` and ``event_loop_blocked_seconds``.
+
+``BlockingDetectorMiddleware`` registers each request's ASGI scope against
+its task so stalls can be attributed to a FastAPI route.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+
+# Stalls not attributable to a request (startup, background tasks, timers)
+BACKGROUND_ROUTE = "background"
+# Innermost frames kept in the captured stack
+STACK_LIMIT = 20
+
+blocked_total = Counter(
+    'event_loop_blocked_total',
+    'Number of times the event loop was blocked longer than the threshold',
+    ['route']
+)
+
+blocked_seconds = Histogram(
+    'event_loop_blocked_seconds',
+    'Duration of event loop stalls longer than the threshold',
+    ['route'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+)
+
+
+class BlockingEvent(NamedTuple):
+    """A detected event loop stall."""
+    route: str
+    duration: float
+    stack: str
+
+
+def _route_path(scope: Dict[str, Any]) -> str:
+    """Resolve the route template (``/api/upload/{task_id}``) for a request scope."""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is not None and app is not None:
+        for route in getattr(app, "routes", []):
+            if getattr(route, "endpoint", None) is endpoint:
+                return route.path
+    return "unmatched"
+
+
+class BlockingDetector:
+    """Detects event loop stalls from a watchdog thread."""
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        interval: Optional[float] = None,
+        max_events: int = 100
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            threshold: Seconds the loop may stay unresponsive before a stall
+                is reported (LOOP_BLOCK_THRESHOLD_MS, default 100ms)
+            interval: Heartbeat period (defaults to a quarter of the threshold)
+            max_events: Number of recent stalls kept in ``events``
+        """
+        if threshold is None:
+            threshold = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")) / 1000
+        self.threshold = threshold
+        self.interval = interval or min(threshold / 4, 0.025)
+        self.events: Deque[BlockingEvent] = deque(maxlen=max_events)
+
+        # Request scope per task, read by the watchdog thread
+        self._scopes: "weakref.WeakKeyDictionary[asyncio.Task, Dict[str, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._heartbeat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def track(self, scope: Dict[str, Any]):
+        """Associate the current task with a request scope."""
+        task = asyncio.current_task()
+        if task is not None:
+            self._scopes[task] = scope
+
+    def start(self):
+        """Start the heartbeat and the watchdog for the running loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = self._loop.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        """Stop monitoring."""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _beat(self):
+        """Stamp the heartbeat while the loop is responsive."""
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _capture(self) -> Tuple[str, str]:
+        """Return the route and stack of whatever is running on the loop thread."""
+        task = asyncio.current_task(self._loop) if self._loop else None
+        scope = self._scopes.get(task) if task is not None else None
+        route = _route_path(scope) if scope is not None else BACKGROUND_ROUTE
+
+        frame = sys._current_frames().get(self._loop_thread)  # pylint: disable=protected-access
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame else ""
+        return route, stack
+
+    def _watch(self):
+        """Watchdog thread: report heartbeats that go stale."""
+        while not self._stopping.wait(self.interval):
+            beat = self._heartbeat
+            if time.monotonic() - beat - self.interval < self.threshold:
+                continue
+
+            route, stack = self._capture()
+            # Wait for the loop to come back to measure the whole stall
+            while self._heartbeat == beat and not self._stopping.wait(self.interval / 4):
+                pass
+            end = self._heartbeat if self._heartbeat != beat else time.monotonic()
+            self._record(BlockingEvent(route, max(end - beat - self.interval, 0.0), stack))
+
+    def _record(self, event: BlockingEvent):
+        """Export and log a stall."""
+        self.events.append(event)
+        blocked_total.labels(route=event.route).inc()
+        blocked_seconds.labels(route=event.route).observe(event.duration)
+        logger.warning(
+            "Event loop blocked",
+            extra={
+                "route": event.route,
+                "duration_ms": round(event.duration * 1000, 1),
+                "stack": event.stack,
+            }
+        )
+
+
+class BlockingDetectorMiddleware:
+    """ASGI middleware attributing event loop stalls to the request's route."""
+
+    def __init__(self, app, detector: Optional[BlockingDetector] = None):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Downstream ASGI application
+            detector: Detector to register requests with (process-wide by default)
+        """
+        self.app = app
+        self.detector = detector or blocking_detector
+
+    async def __call__(self, scope, receive, send):
+        """Register the request and pass it on unchanged."""
+        if scope["type"] == "http":
+            self.detector.track(scope)
+        await self.app(scope, receive, send)
+
+
+# Process-wide detector for the API event loop
+blocking_detector = BlockingDetector()
@@ -1,7 +1,10 @@
 """JSON logging configuration compatible with ELK stack."""
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import socket
 import sys
 from datetime import datetime
@@ -46,6 +49,10 @@ class LogstashTcpHandler(logging.handlers.SocketHandler):
         return formatted.encode('utf-8') + b'\n'
 
 
+# Ships records to Logstash from a background thread
+_logstash_listener = None
+
+
 def setup_logging(log_level: str = "INFO"):
     """
     Setup JSON logging compatible with ELK stack.
@@ -53,6 +60,7 @@ def setup_logging(log_level: str = "INFO"):
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
     """
+    global _logstash_listener  # pylint: disable=global-statement
     handlers = []
 
     # Console handler (stdout)
@@ -72,11 +80,23 @@ def setup_logging(log_level: str = "INFO"):
             logstash_port = int(os.getenv('LOGSTASH_PORT', '5000'))
             logstash_handler = LogstashTcpHandler(logstash_host, logstash_port)
             logstash_handler.setFormatter(formatter)
-            handlers.append(logstash_handler)
+
+            # Connecting and sending happen on the listener thread, so a slow
+            # or unreachable Logstash never blocks the caller (or the event loop)
+            if _logstash_listener is not None:
+                _logstash_listener.stop()
+            log_queue = queue.SimpleQueue()
+            _logstash_listener = logging.handlers.QueueListener(log_queue, logstash_handler)
+            _logstash_listener.start()
+            handlers.append(logging.handlers.QueueHandler(log_queue))
         except (socket.error, OSError) as e:
             # If Logstash is not available, log to console only
             print(f"Warning: Could not connect to Logstash: {e}", file=sys.stderr)
 
+    if not logstash_enabled and _logstash_listener is not None:
+        _logstash_listener.stop()
+        _logstash_listener = None
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
@@ -90,5 +110,38 @@ def setup_logging(log_level: str = "INFO"):
     return root_logger
 
 
+def _stop_logstash_listener():
+    """Flush queued records to Logstash on interpreter exit."""
+    if _logstash_listener is not None:
+        _logstash_listener.stop()
+
+
+def _restart_logstash_listener():
+    """
+    Give a forked child its own Logstash listener.
+
+    Threads do not survive fork, so records queued in a preloaded gunicorn
+    worker or Celery prefork child would never be shipped. The child also
+    drops the socket inherited from its parent and opens its own.
+    """
+    global _logstash_listener  # pylint: disable=global-statement
+    if _logstash_listener is None:
+        return
+    handlers = _logstash_listener.handlers
+    for handler in handlers:
+        if isinstance(handler, logging.handlers.SocketHandler) and handler.sock is not None:
+            handler.sock.close()
+            handler.sock = None
+    log_queue = queue.SimpleQueue()
+    _logstash_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _logstash_listener.start()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            handler.queue = log_queue
+
+
+atexit.register(_stop_logstash_listener)
+os.register_at_fork(after_in_child=_restart_logstash_listener)
+
 # Create module-level logger (will be initialized when setup_logging is called)
 logger = logging.getLogger(__name__)
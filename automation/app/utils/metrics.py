@@ -0,0 +1,143 @@
+"""Prometheus metrics registry helpers with multiprocess support.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (it must be set before
+prometheus_client is first imported), every process writes its metric
+values to mmap'd files in that directory. Uvicorn workers and Celery
+prefork children therefore share one view, aggregated at scrape time.
+Without the variable, the default in-process registry is used.
+
+Importing this module creates that directory, so modules that define
+metrics import it first (``from app.utils import metrics  # noqa: F401``).
+"""
+
+import glob
+import os
+import re
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+from app.utils.logging import logger
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    # Metric values are mmap'd into this directory as soon as they are created
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# Metric files are named like "counter_1234.db" or "gauge_livesum_1234.db"
+PID_FILE_PATTERN = re.compile(r"_(\d+)\.db$")
+
+
+def is_multiprocess() -> bool:
+    """Whether metrics are shared across processes through mmap'd files."""
+    return bool(MULTIPROC_DIR)
+
+
+def prepare_multiproc_dir():
+    """
+    Create an empty multiprocess directory.
+
+    Must run once in the parent process (before workers fork) so files
+    left by a previous run are not aggregated into the new one.
+    """
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    own_suffix = f"_{os.getpid()}.db"
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.db")):
+        if not path.endswith(own_suffix):
+            os.remove(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process with ``pid`` exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def mark_process_dead(pid: int):
+    """Drop live gauges of an exited process so they stop being reported."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def cleanup_dead_processes() -> int:
+    """
+    Remove live-gauge files of processes that no longer exist.
+
+    Catches children that were killed without running their shutdown
+    hooks (OOM kills, SIGKILL). Counter and histogram files are kept so
+    totals do not go backwards.
+
+    Returns:
+        int: Number of dead processes cleaned up
+    """
+    if not MULTIPROC_DIR:
+        return 0
+    dead = set()
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "gauge_live*.db")):
+        match = PID_FILE_PATTERN.search(path)
+        if match and not _pid_alive(int(match.group(1))):
+            dead.add(int(match.group(1)))
+    for pid in dead:
+        mark_process_dead(pid)
+    return len(dead)
+
+
+class CleaningMultiProcessCollector(multiprocess.MultiProcessCollector):
+    """Multiprocess collector that drops dead processes before each scrape."""
+
+    def collect(self):
+        """Collect aggregated metrics from all live process files."""
+        try:
+            cleanup_dead_processes()
+        except OSError as e:
+            logger.error("Failed to clean up metric files: %s", str(e))
+        return super().collect()
+
+
+_SCRAPE_REGISTRY = None
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry to scrape: aggregated across processes in multiprocess mode."""
+    global _SCRAPE_REGISTRY  # pylint: disable=global-statement
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    if _SCRAPE_REGISTRY is None:
+        _SCRAPE_REGISTRY = CollectorRegistry()
+        CleaningMultiProcessCollector(_SCRAPE_REGISTRY, MULTIPROC_DIR)
+    return _SCRAPE_REGISTRY
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render the exposition format for a scrape."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+def start_exporter(port: int, addr: str = "0.0.0.0"):
+    """
+    Start a standalone HTTP exporter thread (used by the Celery worker).
+
+    Args:
+        port: Port to listen on
+        addr: Address to bind
+    """
+    start_http_server(port, addr=addr, registry=metrics_registry())
+    logger.info(
+        "Metrics exporter listening on %s:%s (multiprocess=%s)",
+        addr, port, is_multiprocess()
+    )
+
@@ -0,0 +1,163 @@
+"""Low-overhead statistical profiling and event-loop lag monitoring.
+
+``SamplingProfiler`` snapshots the stacks of every thread at a fixed
+interval from a background thread (via ``sys._current_frames``) and
+aggregates them into the collapsed-stack format understood by
+flamegraph.pl, speedscope and inferno. Nothing is traced per call, so the
+overhead is bounded by the sampling rate.
+
+``EventLoopLagMonitor`` measures how late the event loop wakes a
+scheduled callback and exports it as ``event_loop_lag_seconds``.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from prometheus_client import Gauge, Histogram
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+
+# Upper bound for a single profiling run
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+event_loop_lag = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between when an event loop callback was due and when it ran',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+event_loop_lag_max = Gauge(
+    'event_loop_lag_max_seconds',
+    'Largest event loop lag seen in the last monitoring window',
+    multiprocess_mode='livemax'
+)
+
+
+def _frame_label(frame) -> str:
+    """Format a frame as ``function (file:line)``."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Statistical wall-clock profiler producing collapsed stacks."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples (default 5ms)
+            max_depth: Maximum frames recorded per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+
+    def _sample(self, skip_thread: int, thread_names: Dict[int, str]):
+        """Record the current stack of every thread except the sampler."""
+        for thread_id, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if thread_id == skip_thread:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def run(self, seconds: float) -> str:
+        """
+        Sample for ``seconds`` (blocking the calling thread only).
+
+        Args:
+            seconds: Profiling duration, capped at PROFILER_MAX_SECONDS
+
+        Returns:
+            str: Collapsed stacks, one ``frame;frame;frame count`` per line
+        """
+        seconds = min(max(seconds, self.interval), MAX_PROFILE_SECONDS)
+        me = threading.get_ident()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            self._sample(me, thread_names)
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        logger.info(
+            "Profiling finished",
+            extra={"seconds": seconds, "samples": self.sample_count, "stacks": len(self.samples)}
+        )
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        """Return the collected samples in collapsed-stack format."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+async def profile_async(seconds: float, interval: float = 0.005) -> str:
+    """Profile the current process without blocking the event loop."""
+    profiler = SamplingProfiler(interval=interval)
+    return await asyncio.to_thread(profiler.run, seconds)
+
+
+class EventLoopLagMonitor:
+    """Periodically measures event loop scheduling delay."""
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between probes (EVENT_LOOP_LAG_INTERVAL, default 0.25)
+        """
+        self.interval = interval or float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.25"))
+        self._task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        """Start monitoring on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop monitoring."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Probe loop: sleep for ``interval`` and measure how late we woke up."""
+        loop = asyncio.get_running_loop()
+        window_start = loop.time()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - scheduled - self.interval, 0.0)
+            self.last_lag = lag
+            event_loop_lag.observe(lag)
+            if loop.time() - window_start >= 10.0:
+                self.max_lag = 0.0
+                window_start = loop.time()
+            self.max_lag = max(self.max_lag, lag)
+            event_loop_lag_max.set(self.max_lag)
+
+
+# Process-wide monitor for the API event loop
+loop_lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,54 @@
+"""Redis clients for REDIS_URL (the Celery broker).
+
+``redis`` is imported on first use. asyncio connections belong to the
+event loop that opened them, and Celery tasks run each upload on a fresh
+loop, so services keep their asyncio clients in ``LoopClients``.
+"""
+
+import asyncio
+import os
+import weakref
+from typing import Any, Callable, Optional
+
+
+def redis_url() -> str:
+    """Redis server shared by the API workers and Celery."""
+    return os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+def sync_redis():
+    """Synchronous Redis client (for a thread or a Celery child)."""
+    import redis  # pylint: disable=import-outside-toplevel
+    return redis.Redis.from_url(redis_url(), socket_timeout=2, decode_responses=True)
+
+
+def async_redis():
+    """asyncio Redis client (use through ``LoopClients``)."""
+    import redis.asyncio  # pylint: disable=import-outside-toplevel
+    return redis.asyncio.Redis.from_url(redis_url(), socket_connect_timeout=2, socket_timeout=5)
+
+
+class LoopClients:
+    """One asyncio Redis client per running event loop."""
+
+    def __init__(self, factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            factory: Returns an asyncio Redis client (defaults to ``async_redis``)
+        """
+        self._factory = factory or async_redis
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def get(self):
+        """Client of the running loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = self._factory()
+        return client
+
+    async def close(self):
+        """Close the client of the running loop (call before closing a short-lived loop)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
@@ -0,0 +1,308 @@
+"""Typed runtime settings that can change without a restart.
+
+``RuntimeSettings`` holds the settings worth tuning under load (log level,
+CORS origins, token lifetime, OpenAI models, database pool size). They
+are read from the environment as before, and can be overridden while the
+process runs from a live source:
+
+* ``SETTINGS_FILE`` - a JSON object, e.g. ``{"LOG_LEVEL": "DEBUG"}``
+* ``SETTINGS_REDIS_KEY`` - a Redis hash in ``REDIS_URL`` (wins over the file)
+
+``live_settings`` polls the sources every ``SETTINGS_RELOAD_SECONDS``. API
+workers do this in a background task (``start``/``stop``), and Celery
+children do it before each task (``reload_if_due``). Removing an override
+restores the environment value.
+
+A change is applied atomically. The new values are validated as a whole
+(an invalid source is rejected and the current settings are kept), then
+``current`` is swapped and the subscribers of the changed fields run on
+the same thread, so no request sees a half-applied change. If a
+subscriber raises, the ones that already ran are called again with the
+old settings and the change is rolled back.
+
+Read ``live_settings.current`` once per operation for a consistent
+snapshot; do not copy single values into module constants.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter
+from pydantic import Field, ValidationError, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+from app.utils.redis_clients import sync_redis
+
+# Always allowed besides FRONTEND_URL and ALLOWED_ORIGINS
+DEFAULT_ORIGINS = [
+    "http://localhost",
+    "http://localhost:8080",
+    "https://yourdomain.com",  # Update with production domain
+]
+
+settings_reloads = Counter(
+    'settings_reloads_total',
+    'Runtime settings reloads by outcome (applied, invalid, rolled_back, source_error)',
+    ['outcome']
+)
+
+Subscriber = Callable[["RuntimeSettings", "RuntimeSettings"], None]
+
+
+class RuntimeSettings(BaseSettings):
+    """Settings that can be changed while the process runs (environment names, case-insensitive)."""
+
+    model_config = SettingsConfigDict(frozen=True, extra="ignore")
+
+    log_level: str = "INFO"
+    frontend_url: str = "http://localhost:8080"
+    allowed_origins: str = ""  # Extra CORS origins, comma-separated
+    jwt_access_token_expire_minutes: int = Field(30, ge=1)
+    openai_model: str = "gpt-4"
+    openai_fallback_model: str = "gpt-3.5-turbo"
+    db_pool_size: Optional[int] = Field(None, ge=1)  # None: derived from DB_CONNECTION_BUDGET
+    db_max_overflow: Optional[int] = Field(None, ge=0)
+
+    @field_validator("log_level")
+    @classmethod
+    def _known_level(cls, value: str) -> str:
+        level = value.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"unknown log level {value}")
+        return level
+
+    @field_validator("allowed_origins")
+    @classmethod
+    def _no_wildcard(cls, value: str) -> str:
+        # Credentials are allowed, so origins must be listed explicitly
+        if "*" in value:
+            raise ValueError("wildcard origins are not allowed")
+        return value
+
+    @property
+    def cors_origins(self) -> List[str]:
+        """Allowed CORS origins: FRONTEND_URL, the defaults and ALLOWED_ORIGINS."""
+        extra = [origin.strip() for origin in self.allowed_origins.split(",") if origin.strip()]
+        return list(dict.fromkeys([self.frontend_url] + DEFAULT_ORIGINS + extra))
+
+
+def _read_file(path: str) -> Dict[str, Any]:
+    """Overrides from a JSON settings file (missing file: none)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path} must contain a JSON object")
+    return overrides
+
+
+class LiveSettings:
+    """Current ``RuntimeSettings`` plus live overrides and change subscribers."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        redis_key: Optional[str] = None,
+        interval: Optional[float] = None,
+        client_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize live settings from the environment.
+
+        Args:
+            path: JSON overrides file (SETTINGS_FILE; unset disables)
+            redis_key: Redis hash of overrides (SETTINGS_REDIS_KEY; unset disables)
+            interval: Seconds between polls of the sources (SETTINGS_RELOAD_SECONDS, default 10)
+            client_factory: Returns a synchronous Redis client (defaults to REDIS_URL)
+        """
+        self.path = path if path is not None else os.getenv("SETTINGS_FILE", "")
+        self.redis_key = redis_key if redis_key is not None else os.getenv("SETTINGS_REDIS_KEY", "")
+        self.interval = interval or float(os.getenv("SETTINGS_RELOAD_SECONDS", "10"))
+        self._client_factory = client_factory or sync_redis
+        self._client: Any = None
+
+        self.current = RuntimeSettings()
+        self.overrides: Dict[str, Any] = {}
+        self.changed_at: Optional[float] = None
+        self._subscribers: List[Tuple[Set[str], Subscriber]] = []
+        self._next_poll = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a live source is configured."""
+        return bool(self.path or self.redis_key)
+
+    def subscribe(self, callback: Subscriber, *fields: str) -> Subscriber:
+        """
+        Call ``callback(old, new)`` after a change to any of ``fields`` (any field when none given).
+
+        Callbacks run synchronously on the thread applying the change and
+        must not block; raising rolls the whole change back.
+        """
+        unknown = set(fields) - set(RuntimeSettings.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        self._subscribers.append((set(fields), callback))
+        return callback
+
+    def unsubscribe(self, callback: Subscriber):
+        """Stop calling ``callback``."""
+        self._subscribers = [(fields, cb) for fields, cb in self._subscribers if cb is not callback]
+
+    def read_sources(self) -> Dict[str, Any]:
+        """
+        Overrides from the file and Redis, keyed by field name (blocking I/O).
+
+        Raises:
+            OSError, ValueError, redis.RedisError: A source could not be read
+        """
+        overrides: Dict[str, Any] = {}
+        if self.path:
+            overrides.update(_read_file(self.path))
+        if self.redis_key:
+            if self._client is None:
+                self._client = self._client_factory()
+            overrides.update(self._client.hgetall(self.redis_key))
+        return {key.lower(): value for key, value in overrides.items()}
+
+    def apply(self, overrides: Dict[str, Any]) -> Set[str]:
+        """
+        Replace the overrides and notify subscribers of changed fields.
+
+        Returns:
+            set: Names of the fields that changed (empty if the overrides
+            were invalid or a subscriber rolled the change back)
+        """
+        unknown = set(overrides) - set(RuntimeSettings.model_fields)
+        if unknown:
+            logger.warning("Ignoring unknown runtime settings", extra={"settings": sorted(unknown)})
+        overrides = {key: value for key, value in overrides.items() if key not in unknown}
+        if overrides == self.overrides:
+            return set()
+        try:
+            new = RuntimeSettings(**overrides)
+        except ValidationError as e:
+            settings_reloads.labels(outcome="invalid").inc()
+            logger.error("Rejected invalid runtime settings", extra={"error": str(e)})
+            self.overrides = overrides  # Not retried until the source changes again
+            return set()
+
+        old = self.current
+        changed = {name for name in RuntimeSettings.model_fields if getattr(old, name) != getattr(new, name)}
+        self.overrides = overrides
+        if not changed:
+            return set()
+
+        self.current = new
+        notified: List[Subscriber] = []
+        for fields, callback in list(self._subscribers):
+            if fields and not fields & changed:
+                continue
+            try:
+                callback(old, new)
+            except Exception as e:  # pylint: disable=broad-except
+                self.current = old
+                for applied in reversed(notified):
+                    try:
+                        applied(new, old)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Failed to roll back runtime settings subscriber")
+                settings_reloads.labels(outcome="rolled_back").inc()
+                logger.error(
+                    "Runtime settings change rolled back",
+                    extra={"settings": sorted(changed), "error": str(e)}
+                )
+                return set()
+            notified.append(callback)
+
+        self.changed_at = time.time()
+        settings_reloads.labels(outcome="applied").inc()
+        logger.info("Runtime settings changed", extra={"settings": sorted(changed)})
+        return changed
+
+    def reload(self) -> Set[str]:
+        """Read the sources and apply them (blocking; for Celery children and tests)."""
+        try:
+            overrides = self.read_sources()
+        except Exception as e:  # pylint: disable=broad-except
+            settings_reloads.labels(outcome="source_error").inc()
+            logger.warning("Failed to read runtime settings", extra={"error": str(e)})
+            return set()
+        return self.apply(overrides)
+
+    def reload_if_due(self) -> Set[str]:
+        """``reload()`` at most once per interval."""
+        if not self.enabled or time.monotonic() < self._next_poll:
+            return set()
+        self._next_poll = time.monotonic() + self.interval
+        return self.reload()
+
+    def start(self):
+        """Poll the sources from the running event loop."""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self):
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll(self):
+        """Read the sources in a thread and apply them on the loop, so requests see old or new."""
+        while True:
+            try:
+                overrides = await asyncio.to_thread(self.read_sources)
+            except Exception as e:  # pylint: disable=broad-except
+                settings_reloads.labels(outcome="source_error").inc()
+                logger.warning("Failed to read runtime settings", extra={"error": str(e)})
+            else:
+                self.apply(overrides)
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values, overrides and sources (for the admin endpoint)."""
+        return {
+            "settings": self.current.model_dump(),
+            "overrides": dict(self.overrides),
+            "changed_at": self.changed_at,
+            "sources": {"file": self.path or None, "redis_key": self.redis_key or None},
+            "reload_seconds": self.interval,
+        }
+
+
+class LiveCORSMiddleware(CORSMiddleware):
+    """CORS middleware whose allowed origins follow ``live_settings``."""
+
+    def __init__(self, app: ASGIApp, settings: Optional[LiveSettings] = None, **kwargs: Any):
+        settings = settings or live_settings
+        super().__init__(app, allow_origins=settings.current.cors_origins, **kwargs)
+        settings.subscribe(self._update_origins, "frontend_url", "allowed_origins")
+
+    def _update_origins(self, old: RuntimeSettings, new: RuntimeSettings):  # pylint: disable=unused-argument
+        self.allow_origins = new.cors_origins
+
+
+def _apply_log_level(old: RuntimeSettings, new: RuntimeSettings):  # pylint: disable=unused-argument
+    logging.getLogger().setLevel(new.log_level)
+
+
+# Process-wide settings
+live_settings = LiveSettings()
+live_settings.subscribe(_apply_log_level, "log_level")
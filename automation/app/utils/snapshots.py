@@ -0,0 +1,108 @@
+"""JSON snapshot files shared by several worker processes.
+
+Every gunicorn worker snapshots the same files. ``update_json`` holds an
+exclusive lock on ``<path>.lock`` while it reads the current snapshot,
+merges this process's changes into it and writes the result, so workers
+add to each other's snapshots instead of replacing them. The result goes
+to its own temporary file and is renamed over the target, so a reader
+always sees one complete snapshot. Periodic snapshots taken while
+handling a request are merged from a thread, so the event loop only pays
+for copying the changes.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+import tempfile
+from typing import Any, Callable, Set
+
+from app.utils.logging import logger
+
+# Background writes in flight (referenced so they are not garbage collected)
+_pending: Set[asyncio.Task] = set()
+
+
+def write_json(path: str, data: Any):
+    """Write ``data`` to ``path`` atomically through a unique temporary file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp", delete=False
+    ) as f:
+        tmp_path = f.name
+        try:
+            json.dump(data, f)
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def update_json(path: str, update: Callable[[Any], Any]):
+    """
+    Replace the snapshot at ``path`` with ``update(current)`` under a file lock.
+
+    ``current`` is None when there is no readable snapshot yet.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    current = json.load(f)
+            except FileNotFoundError:
+                current = None
+            except ValueError as e:
+                logger.warning("Replacing unreadable snapshot", extra={"path": path, "error": str(e)})
+                current = None
+            write_json(path, update(current))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _log_failure(name: str, error: BaseException):
+    logger.error("Failed to write snapshot", extra={"snapshot": name, "error": str(error)})
+
+
+def update_json_later(path: str, update: Callable[[Any], Any], name: str):
+    """
+    ``update_json`` without blocking the event loop.
+
+    ``update`` runs in a thread and must not touch state the loop modifies
+    (close over a copy). Outside a running loop (Celery, scripts) the file
+    is updated right away.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            update_json(path, update)
+        except (OSError, TypeError, ValueError) as e:
+            _log_failure(name, e)
+        return
+
+    task = loop.create_task(asyncio.to_thread(update_json, path, update))
+    _pending.add(task)
+
+    def _done(done: asyncio.Task):
+        _pending.discard(done)
+        if not done.cancelled() and done.exception() is not None:
+            _log_failure(name, done.exception())
+
+    task.add_done_callback(_done)
+
+
+async def wait_pending():
+    """Wait for background snapshot writes (before a final synchronous save)."""
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
@@ -0,0 +1,148 @@
+"""Stage-level latency instrumentation.
+
+``stage()`` times one step of a larger operation (queue wait, event-loop
+setup, platform API call, callback, ...) and records it in the
+``stage_duration_seconds`` histogram. When OpenTelemetry is installed and
+``OTEL_EXPORTER_OTLP_ENDPOINT`` is set, each stage is also exported as a
+span to the collector, nested under the enclosing stage.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import Histogram
+
+from app.utils import metrics  # noqa: F401
+from app.utils.logging import logger
+
+# Message header carrying the publish time of a Celery task
+ENQUEUED_AT_HEADER = 'enqueued_at'
+
+stage_duration = Histogram(
+    'stage_duration_seconds',
+    'Duration of individual processing stages in seconds',
+    ['operation', 'stage', 'status'],
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0]
+)
+
+_TRACER: Any = None
+_TRACER_READY = False
+
+
+def _get_tracer():
+    """Configure the OpenTelemetry tracer on first use (None when disabled)."""
+    global _TRACER, _TRACER_READY  # pylint: disable=global-statement
+    if _TRACER_READY:
+        return _TRACER
+    _TRACER_READY = True
+
+    endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')
+    if not endpoint:
+        return None
+    try:
+        from opentelemetry import trace  # pylint: disable=import-outside-toplevel
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (  # pylint: disable=import-outside-toplevel
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.resources import Resource  # pylint: disable=import-outside-toplevel
+        from opentelemetry.sdk.trace import TracerProvider  # pylint: disable=import-outside-toplevel
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        logger.warning(
+            "OpenTelemetry not available - install with: "
+            "pip install opentelemetry-sdk opentelemetry-exporter-otlp"
+        )
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({
+            'service.name': os.getenv('OTEL_SERVICE_NAME', 'socialtrend-automation')
+        })
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint, insecure=True)))
+    trace.set_tracer_provider(provider)
+    _TRACER = trace.get_tracer('socialtrend.automation')
+    logger.info("OpenTelemetry tracing enabled", extra={"endpoint": endpoint})
+    return _TRACER
+
+
+def observe_stage(operation: str, stage_name: str, duration: float, status: str = 'success'):
+    """Record an already-measured stage duration."""
+    stage_duration.labels(operation=operation, stage=stage_name, status=status).observe(max(duration, 0.0))
+
+
+@contextmanager
+def stage(operation: str, stage_name: str, **attributes: Any) -> Iterator[None]:
+    """
+    Time a processing stage.
+
+    Args:
+        operation: Operation the stage belongs to (e.g. ``auto_upload``)
+        stage_name: Stage within the operation (e.g. ``platform_api``)
+        attributes: Extra span attributes (OpenTelemetry only)
+
+    Example:
+        with stage('auto_upload', 'callback', platform=platform):
+            send_callback()
+    """
+    tracer = _get_tracer()
+    span_cm = tracer.start_as_current_span(f'{operation}.{stage_name}') if tracer else None
+    span = span_cm.__enter__() if span_cm else None
+    if span is not None:
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value if isinstance(value, (str, int, float, bool)) else str(value))
+
+    start = time.perf_counter()
+    status = 'success'
+    try:
+        yield
+    except BaseException as e:
+        status = 'failed'
+        if span is not None:
+            span.record_exception(e)
+        raise
+    finally:
+        observe_stage(operation, stage_name, time.perf_counter() - start, status)
+        if span_cm:
+            span_cm.__exit__(None, None, None)
+
+
+def queue_wait_seconds(request: Any, now: Optional[float] = None) -> Optional[float]:
+    """
+    Time a Celery task spent waiting in the queue.
+
+    Measured from the ``enqueued_at`` header set at publish time, or from
+    the ETA when the task was scheduled for later (retries with countdown).
+
+    Args:
+        request: ``task.request`` of the running task
+        now: Current UNIX time (defaults to ``time.time()``)
+
+    Returns:
+        float: Seconds waited, or None when the header is missing
+    """
+    enqueued_at = getattr(request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is None:
+        return None
+    now = time.time() if now is None else now
+    ready_at = float(enqueued_at)
+
+    eta = getattr(request, 'eta', None)
+    if eta:
+        try:
+            eta_dt = eta if isinstance(eta, datetime) else datetime.fromisoformat(str(eta))
+            if eta_dt.tzinfo is None:
+                eta_dt = eta_dt.replace(tzinfo=timezone.utc)
+            ready_at = max(ready_at, eta_dt.timestamp())
+        except ValueError:
+            pass
+    return max(now - ready_at, 0.0)
+
+
+def add_enqueue_header(headers: Dict[str, Any]):
+    """Stamp the publish time into outgoing Celery message headers (retries included)."""
+    headers[ENQUEUED_AT_HEADER] = time.time()
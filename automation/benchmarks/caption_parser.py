@@ -0,0 +1,41 @@
+"""
+Throughput benchmark for the caption completion parser.
+
+Parses the recorded completions from ``tests/fixtures`` repeatedly and
+reports the mean time per completion.
+
+Usage:
+    python -m benchmarks.caption_parser --iterations 20000
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.services.caption_parser import parse_completion
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "caption_completions.json"
+
+
+def main():
+    """Time parsing of each recorded completion."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--iterations", type=int, default=20000, help="Parses per completion")
+    args = parser.parse_args()
+
+    cases = json.loads(FIXTURES.read_text(encoding="utf-8"))
+    print(f"{'completion':<40}{'us/parse':>10}")
+    total = 0.0
+    for case in cases:
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            parse_completion(case["completion"])
+        elapsed = (time.perf_counter() - start) / args.iterations
+        total += elapsed
+        print(f"{case['name']:<40}{elapsed * 1e6:>10.2f}")
+    print(f"{'mean':<40}{total / len(cases) * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark broker bandwidth and Redis memory for Celery serializers.
+
+Encodes a large batch of ``tasks.auto_upload`` messages and their results
+with each serializer setting and reports the bytes that would cross the
+broker and sit in the result backend. When ``--redis-url`` is given the
+results are also written to Redis and ``used_memory`` is sampled.
+
+Usage:
+    python -m benchmarks.celery_serialization --count 10000
+    python -m benchmarks.celery_serialization --redis-url redis://localhost:6379/15
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+from kombu.serialization import dumps
+
+from app.services import celery_serialization
+from app.services.celery_serialization import COMPACT_SERIALIZER, register_compact_serializer
+
+SETTINGS = [
+    ("json", "json", None),
+    ("compact (no compression)", COMPACT_SERIALIZER, 10 ** 9),
+    ("compact", COMPACT_SERIALIZER, celery_serialization.COMPRESSION_THRESHOLD),
+]
+
+
+def build_upload(i: int) -> tuple:
+    """Build a realistic auto_upload message body (args, kwargs, embed)."""
+    content = (
+        f"Post {i}: our new product launch is live! "
+        + "Read more about what the team has been building this quarter. " * 20
+    )
+    kwargs = {
+        "scheduled_post_id": i,
+        "platform": "instagram" if i % 2 else "linkedin",
+        "content": content,
+        "media_urls": [f"https://cdn.example.com/media/{i}/{n}.jpg" for n in range(4)],
+        "callback_url": "https://backend.example.com/api/upload/callback",
+    }
+    embed = {"callbacks": None, "errbacks": None, "chain": None, "chord": None}
+    return (), kwargs, embed
+
+
+def build_result(i: int) -> dict:
+    """Build the result meta the Redis backend stores for a finished upload."""
+    return {
+        "status": "SUCCESS",
+        "result": {
+            "status": "posted",
+            "post_url": f"https://instagram.com/p/{uuid.uuid4().hex[:11]}",
+            "message": "Post uploaded successfully to Instagram",
+            "scheduled_post_id": i,
+            "platform": "instagram",
+        },
+        "traceback": None,
+        "children": [],
+        "date_done": datetime.utcnow().isoformat(),
+        "task_id": str(uuid.uuid4()),
+    }
+
+
+def measure_redis(redis_url: str, payloads: list) -> int:
+    """Write payloads to Redis and return the used_memory delta in bytes."""
+    import redis  # pylint: disable=import-outside-toplevel
+
+    client = redis.Redis.from_url(redis_url)
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    before = client.info("memory")["used_memory"]
+    pipe = client.pipeline(transaction=False)
+    for i, payload in enumerate(payloads):
+        pipe.set(f"{prefix}{i}", payload, ex=300)
+    pipe.execute()
+    after = client.info("memory")["used_memory"]
+    for i in range(0, len(payloads), 1000):
+        client.delete(*[f"{prefix}{n}" for n in range(i, min(i + 1000, len(payloads)))])
+    return after - before
+
+
+def main():
+    """Run the benchmark and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--count", type=int, default=10000, help="Number of uploads")
+    parser.add_argument("--redis-url", default=None, help="Redis URL for memory sampling")
+    args = parser.parse_args()
+
+    register_compact_serializer()
+    messages = [build_upload(i) for i in range(args.count)]
+    results = [build_result(i) for i in range(args.count)]
+
+    print(f"{args.count} uploads, msgpack available: {celery_serialization.MSGPACK_AVAILABLE}")
+    header = f"{'setting':<26}{'broker MB':>12}{'results MB':>12}{'encode ms':>12}"
+    if args.redis_url:
+        header += f"{'redis MB':>12}"
+    print(header)
+
+    for label, serializer, threshold in SETTINGS:
+        if threshold is not None:
+            celery_serialization.COMPRESSION_THRESHOLD = threshold
+
+        start = time.perf_counter()
+        encoded_messages = [dumps(m, serializer=serializer)[2] for m in messages]
+        encoded_results = [dumps(r, serializer=serializer)[2] for r in results]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        broker_mb = sum(len(m) for m in encoded_messages) / 1e6
+        results_mb = sum(len(r) for r in encoded_results) / 1e6
+        row = f"{label:<26}{broker_mb:>12.2f}{results_mb:>12.2f}{elapsed_ms:>12.1f}"
+        if args.redis_url:
+            row += f"{measure_redis(args.redis_url, encoded_results) / 1e6:>12.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Throughput benchmark for ``tasks.auto_upload`` workers.
+
+Runs the real ``celery_app`` worker with the platform upload replaced by a
+fake that only waits ``--upload-latency-ms``, and sweeps pool type,
+concurrency and prefetch multiplier. Each configuration runs in a fresh
+process: tasks are queued first, then the worker drains them while CPU
+time and RSS of the worker and its pool children are sampled from /proc
+(Linux only). Reports tasks/sec, CPU milliseconds per task and memory per
+worker process.
+
+The default ``memory://`` broker lives inside the worker process and
+needs no server. It runs Celery's synchronous consumer loop, which only
+notices slots freed by the threads pool every 2 seconds, so compare pool
+types with ``--broker redis://...`` (which also includes broker round
+trips).
+
+Usage:
+    python -m benchmarks.celery_throughput --pool prefork threads solo --concurrency 1 4 8
+    python -m benchmarks.celery_throughput --broker redis://localhost:6379/15 --prefetch 1 4 16
+    python -m benchmarks.celery_throughput --no-queue-metrics --failure-rate 0.1
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_stat(pid: int) -> List[str]:
+    """Fields of /proc/<pid>/stat after the command name."""
+    with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+        return f.read().rsplit(")", 1)[1].split()
+
+
+def _worker_pids(root: int) -> List[int]:
+    """The worker process and its direct children (pool processes)."""
+    pids = [root]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                if int(_proc_stat(int(entry))[1]) == root:
+                    pids.append(int(entry))
+            except (OSError, IndexError):
+                continue
+    return pids
+
+
+def _cpu_seconds(pids: List[int]) -> float:
+    """User + system CPU time of ``pids``."""
+    total = 0
+    for pid in pids:
+        try:
+            fields = _proc_stat(pid)
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError):
+            continue
+    return total / CLOCK_TICKS
+
+
+def _rss_bytes(pid: int) -> int:
+    """Resident set size of ``pid``."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError):
+        return 0
+
+
+def run_one(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue ``config['tasks']`` uploads, drain them with one worker and measure it."""
+    os.environ["CELERY_METRICS_PORT"] = ""  # No exporter port clashes between runs
+    from celery.signals import task_postrun, worker_ready  # pylint: disable=import-outside-toplevel
+
+    import tasks  # pylint: disable=import-outside-toplevel
+    from app.services.upload_service import UploadService  # pylint: disable=import-outside-toplevel
+
+    latency = config["upload_latency_ms"] / 1000
+    failure_rate = config["failure_rate"]
+    rng = random.Random(42)
+
+    async def fake_upload(content, media_urls):  # pylint: disable=unused-argument
+        import asyncio  # pylint: disable=import-outside-toplevel
+        await asyncio.sleep(latency)
+        if failure_rate and rng.random() < failure_rate:
+            raise RuntimeError("Simulated platform failure")
+        return {"status": "posted", "post_url": "https://instagram.com/p/bench", "message": "ok"}
+
+    UploadService._upload_to_instagram = staticmethod(fake_upload)  # pylint: disable=protected-access
+
+    app = tasks.celery_app
+    broker = config["broker"]
+    in_memory = broker.startswith("memory")
+    app.conf.update(
+        broker_url=broker,
+        result_backend="cache+memory://" if in_memory else broker,
+        # The memory transport polls; keep its idle sleep below the task latency
+        broker_transport_options={"polling_interval": 0.001} if in_memory else {},
+        worker_prefetch_multiplier=config["prefetch"],
+        worker_hijack_root_logger=False,
+        worker_redirect_stdouts=False,
+    )
+    if not config["queue_metrics"]:
+        task_postrun.disconnect(tasks.update_metrics_after_task)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    count = config["tasks"]
+    with app.connection_for_write() as conn:
+        conn.default_channel.queue_purge("uploads")
+    for i in range(count):
+        tasks.auto_upload.apply_async(
+            kwargs={"scheduled_post_id": i, "platform": "instagram", "content": f"Benchmark post {i}"},
+            queue="uploads",
+        )
+
+    # Shared with prefork children, which inherit it at fork time
+    done = multiprocessing.Value("i", 0)
+    ready = threading.Event()
+    result: Dict[str, Any] = {}
+
+    @task_postrun.connect(weak=False)
+    def count_done(**kwargs):  # pylint: disable=unused-argument
+        with done.get_lock():
+            done.value += 1
+
+    @worker_ready.connect(weak=False)
+    def mark_ready(**kwargs):  # pylint: disable=unused-argument
+        ready.set()
+
+    def monitor():
+        ready.wait()
+        me = os.getpid()
+        start = time.perf_counter()
+        cpu_start = _cpu_seconds(_worker_pids(me))
+        while done.value < count and time.perf_counter() - start < config["timeout"]:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        pids = _worker_pids(me)
+        cpu = _cpu_seconds(pids) - cpu_start
+        completed = done.value
+        result.update(
+            completed=completed,
+            seconds=elapsed,
+            tasks_per_sec=completed / elapsed if elapsed else 0.0,
+            cpu_ms_per_task=cpu * 1000 / completed if completed else 0.0,
+            parent_rss_mb=_rss_bytes(me) / 2 ** 20,
+            child_rss_mb=[_rss_bytes(pid) / 2 ** 20 for pid in pids[1:]],
+        )
+        os.kill(me, signal.SIGTERM)  # Warm shutdown of the worker
+
+    threading.Thread(target=monitor, daemon=True).start()
+    worker = app.Worker(
+        pool_cls=config["pool"],
+        concurrency=config["concurrency"],
+        queues=["uploads"],
+        loglevel="WARNING",
+        without_heartbeat=True,
+        without_mingle=True,
+        without_gossip=True,
+        quiet=True,
+    )
+    worker.start()
+    return result
+
+
+def main():
+    """Sweep worker configurations and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--broker", default="memory://", help="Broker URL (memory:// or redis://...)")
+    parser.add_argument("--pool", nargs="+", default=["prefork", "threads", "solo"],
+                        choices=["prefork", "threads", "solo"], help="Pool types to run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8],
+                        help="Worker concurrency levels")
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 4],
+                        help="worker_prefetch_multiplier values")
+    parser.add_argument("--tasks", type=int, default=500, help="Tasks per configuration")
+    parser.add_argument("--upload-latency-ms", type=float, default=20.0,
+                        help="Latency of the fake platform upload")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fraction of uploads that fail and are retried")
+    parser.add_argument("--no-queue-metrics", dest="queue_metrics", action="store_false",
+                        help="Disconnect the per-task update_queue_metrics handler")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds per configuration")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(json.loads(args.run_one))))
+        return
+
+    if args.broker.startswith("memory") and "threads" in args.pool:
+        print("note: threads pool results are throttled by the memory:// consumer loop; use --broker redis://...")
+    print(
+        f"{'pool':<9}{'conc':>5}{'prefetch':>9}{'done':>7}{'tasks/s':>9}"
+        f"{'cpu ms/task':>12}{'parent MB':>10}{'MB/child':>9}"
+    )
+    for pool, concurrency, prefetch in itertools.product(args.pool, args.concurrency, args.prefetch):
+        if pool == "solo" and concurrency > 1:
+            continue  # solo always runs one task at a time
+        config = {
+            "broker": args.broker,
+            "pool": pool,
+            "concurrency": concurrency,
+            "prefetch": prefetch,
+            "tasks": args.tasks,
+            "upload_latency_ms": args.upload_latency_ms,
+            "failure_rate": args.failure_rate,
+            "queue_metrics": args.queue_metrics,
+            "timeout": args.timeout,
+        }
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.celery_throughput", "--run-one", json.dumps(config)],
+            capture_output=True, text=True, check=False,
+            env=dict(os.environ, LOGSTASH_ENABLED="false"),
+        )
+        try:
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            print(f"{pool:<9}{concurrency:>5}{prefetch:>9}  failed: {proc.stderr.strip()[-300:]}")
+            continue
+        children = r["child_rss_mb"]
+        per_child = sum(children) / len(children) if children else 0.0
+        print(
+            f"{pool:<9}{concurrency:>5}{prefetch:>9}{r['completed']:>7}{r['tasks_per_sec']:>9.1f}"
+            f"{r['cpu_ms_per_task']:>12.2f}{r['parent_rss_mb']:>10.1f}{per_child:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
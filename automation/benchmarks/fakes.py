@@ -0,0 +1,110 @@
+"""
+Local fake upstream servers with configurable latency.
+
+Used by the load-test harness so that benchmarks measure the automation
+service itself, not OpenAI or the backend webhook. Each fake is a small
+FastAPI app served by uvicorn on a background thread.
+"""
+
+import asyncio
+import random
+import socket
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+CANNED_COMPLETION = (
+    "Big things are happening in AI this week - here is what you need to know!\n\n"
+    "#AI #MachineLearning #Tech #Innovation #FutureOfWork"
+)
+
+
+def free_port() -> int:
+    """Return a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Latency:
+    """Injected response delay: ``base`` seconds plus up to ``jitter`` seconds."""
+
+    def __init__(self, base: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        self.base = base
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+
+    async def wait(self):
+        """Sleep for one sampled delay."""
+        delay = self.base + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def create_openai_app(latency: Latency) -> FastAPI:
+    """Fake of the OpenAI chat completions API (``OPENAI_BASE_URL=<url>/v1``)."""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        await latency.wait()
+        return {
+            "id": f"chatcmpl-fake-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": CANNED_COMPLETION},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 40, "completion_tokens": 30, "total_tokens": 70},
+        }
+
+    return app
+
+
+def create_webhook_app(latency: Latency) -> FastAPI:
+    """Fake of the backend webhook receiving upload callbacks."""
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/callback")
+    async def callback():
+        app.state.requests += 1
+        await latency.wait()
+        return {"received": True}
+
+    return app
+
+
+class FakeServer:
+    """Serve an ASGI app on localhost from a background thread."""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.app = app
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Fake server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
@@ -0,0 +1,57 @@
+"""
+Lookup latency benchmark for the hashtag recommendation index.
+
+Builds an index from synthetic trend batches and reports mean and p99
+``top_k`` latency.
+
+Usage:
+    python -m benchmarks.hashtag_index --trends 50000 --lookups 10000
+"""
+
+import argparse
+import random
+import time
+
+from app.services.hashtag_index import HashtagIndex
+
+WORDS = [
+    "ai", "machine", "learning", "data", "cloud", "startup", "fitness", "travel",
+    "food", "fashion", "music", "gaming", "crypto", "design", "marketing", "health",
+    "python", "coffee", "summer", "photography", "art", "science", "space", "news",
+]
+
+
+def main():
+    """Build the index and time lookups."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--trends", type=int, default=50000, help="Trends to index")
+    parser.add_argument("--lookups", type=int, default=10000, help="Lookups to time")
+    parser.add_argument("--k", type=int, default=15, help="Hashtags per lookup")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = HashtagIndex()
+    start = time.perf_counter()
+    for _ in range(args.trends // 20):
+        batch = [
+            {"keyword": " ".join(rng.sample(WORDS, rng.randint(1, 3))), "score": rng.randint(1, 100000)}
+            for _ in range(20)
+        ]
+        index.add_trends(batch)
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.lookups):
+        topic = " ".join(rng.sample(WORDS, 2))
+        start = time.perf_counter()
+        index.top_k(topic, args.k)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(f"indexed {args.trends} trends ({len(index)} tokens) in {build_s:.2f}s")
+    print(f"top_k mean: {sum(latencies) / len(latencies) * 1e6:.1f}us")
+    print(f"top_k p99:  {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
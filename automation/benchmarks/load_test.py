@@ -0,0 +1,292 @@
+"""
+Load test for the automation API against local upstream fakes.
+
+Starts the app (single uvicorn process, or gunicorn with ``--workers``
+preloaded uvicorn workers) with OpenAI and the backend webhook replaced by
+local fakes (with injected latency), drives each endpoint at the requested
+concurrency levels and reports p50/p95/p99 latency and requests per second.
+Any non-2xx response counts as an error. Results can be saved as a JSON
+baseline; when compared against one, the run fails on regressions beyond
+the tolerance.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 1 10 50 --duration 10
+    python -m benchmarks.load_test --server gunicorn --workers 4 --concurrency 50
+    python -m benchmarks.load_test --save-baseline benchmarks/baselines/load_test.json
+    python -m benchmarks.load_test --baseline benchmarks/baselines/load_test.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import jwt
+
+from benchmarks.fakes import FakeServer, Latency, create_openai_app, create_webhook_app, free_port
+
+JWT_SECRET = "load-test-secret"
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scenarios(callback_url: str) -> Dict[str, Dict[str, Any]]:
+    """Requests driven by the load test, keyed by scenario name."""
+    return {
+        "ai_caption": {
+            "path": "/api/ai/caption",
+            "json": {"topic": "AI", "trend": ["machine learning", "automation"], "style": "casual"},
+        },
+        "generate_caption": {
+            "path": "/api/generate_caption",
+            "json": {"content": "Product launch", "platform": "instagram"},
+        },
+        "trends_fetch": {
+            "path": "/api/trends/fetch",
+            "json": {"platform": "google", "keywords": ["ai"]},
+        },
+        "upload": {
+            "path": "/api/upload",
+            "json": {
+                "platform": "instagram",
+                "content": "Benchmark post",
+                "scheduled_post_id": 1,
+                "callback_url": callback_url,
+            },
+        },
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def drive(
+    base_url: str,
+    token: str,
+    scenario: Dict[str, Any],
+    concurrency: int,
+    duration: float
+) -> Dict[str, Any]:
+    """Send requests from ``concurrency`` workers for ``duration`` seconds."""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.post(scenario["path"], json=scenario["json"])
+                ok = response.is_success
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=30.0,
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    results: Dict[str, Dict[str, Any]],
+    tolerance: float
+) -> List[str]:
+    """
+    Compare a run against a baseline.
+
+    Returns:
+        list: One message per regression (empty when the run passes)
+    """
+    regressions = []
+    for key, result in results.items():
+        if result["errors"]:
+            regressions.append(f"{key}: {result['errors']} failed requests")
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: p95 {result['p95_ms']:.1f}ms > baseline {base['p95_ms']:.1f}ms"
+            )
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {result['rps']:.1f} req/s < baseline {base['rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def start_app(
+    port: int,
+    openai_url: str,
+    data_dir: str,
+    extra_args: List[str],
+    log_file=subprocess.DEVNULL,
+    server: str = "uvicorn",
+    workers: int = 1
+) -> subprocess.Popen:
+    """Start the API (uvicorn or gunicorn) and wait until /health answers."""
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-load-test",
+        OPENAI_BASE_URL=f"{openai_url}/v1",
+        JWT_SECRET_KEY=JWT_SECRET,
+        LOGSTASH_ENABLED="false",
+        LOG_LEVEL="WARNING",
+        HF_WARMUP="false",
+        HASHTAG_INDEX_PATH=os.path.join(data_dir, "hashtag_index.json"),
+        POSTING_TIME_ENABLED="false",
+        WEB_CONCURRENCY=str(workers),
+    )
+    if server == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+            "--bind", f"127.0.0.1:{port}",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ]
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [*command, *extra_args],
+        cwd=APP_DIR,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).is_success:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API did not become healthy within 60s")
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    """Print results as an aligned table."""
+    print(f"{'scenario':<28}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for key, r in results.items():
+        print(
+            f"{key:<28}{r['requests']:>9}{r['errors']:>8}{r['rps']:>9.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50],
+                        help="Concurrency levels to run")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and level")
+    parser.add_argument("--scenario", nargs="+", help="Scenarios to run (default: all)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0,
+                        help="Base latency of the fake upstreams")
+    parser.add_argument("--upstream-jitter-ms", type=float, default=20.0,
+                        help="Random extra latency of the fake upstreams")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression of p95 and req/s")
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn",
+                        help="Single uvicorn process or gunicorn with uvicorn workers")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--uvicorn-arg", action="append", default=[],
+                        help="Extra argument passed to the server command (repeatable)")
+    parser.add_argument("--app-log", help="Write the API's log output to this file")
+    args = parser.parse_args(argv)
+
+    latency = Latency(args.upstream_latency_ms / 1000, args.upstream_jitter_ms / 1000, seed=42)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with FakeServer(create_openai_app(latency)) as openai_fake, \
+            FakeServer(create_webhook_app(latency)) as webhook_fake, \
+            tempfile.TemporaryDirectory() as data_dir:
+        port = free_port()
+        log_file = open(args.app_log, "w", encoding="utf-8") if args.app_log else subprocess.DEVNULL  # pylint: disable=consider-using-with
+        app_process = start_app(
+            port, openai_fake.url, data_dir, args.uvicorn_arg, log_file, args.server, args.workers
+        )
+        try:
+            token = jwt.encode(
+                {"sub": "load-test", "exp": datetime.utcnow() + timedelta(hours=1)},
+                JWT_SECRET,
+                algorithm="HS256",
+            )
+            all_scenarios = scenarios(f"{webhook_fake.url}/callback")
+            for name in args.scenario or list(all_scenarios):
+                for concurrency in args.concurrency:
+                    results[f"{name}@{concurrency}"] = asyncio.run(drive(
+                        f"http://127.0.0.1:{port}", token, all_scenarios[name],
+                        concurrency, args.duration
+                    ))
+        finally:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+            if args.app_log:
+                log_file.close()
+
+    print_table(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "recorded_at": datetime.utcnow().isoformat() + "Z",
+                "upstream_latency_ms": args.upstream_latency_ms,
+                "results": results,
+            }, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
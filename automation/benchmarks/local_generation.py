@@ -0,0 +1,60 @@
+"""
+Throughput benchmark for the local caption generation engine.
+
+Fires concurrent requests at ``LocalGenerationEngine`` and reports requests
+per second for each maximum batch size. Uses the configured HuggingFace
+model when transformers is installed, otherwise (or with ``--fake``) a
+synthetic backend whose cost grows sub-linearly with batch size.
+
+Usage:
+    python -m benchmarks.local_generation --requests 256
+    python -m benchmarks.local_generation --fake
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from app.services.local_generation import TRANSFORMERS_AVAILABLE, LocalGenerationEngine
+
+BATCH_SIZES = [1, 8, 32]
+
+
+def fake_generate(prompts: List[str]) -> List[str]:
+    """Synthetic model: fixed per-batch overhead plus a small per-prompt cost."""
+    time.sleep(0.02 + 0.002 * len(prompts))
+    return [f"Generated caption for: {prompt}" for prompt in prompts]
+
+
+async def run(engine: LocalGenerationEngine, total: int) -> float:
+    """Send ``total`` concurrent requests and return requests per second."""
+    await engine.warm_up()
+    start = time.perf_counter()
+    await asyncio.gather(*(engine.generate(f"Write a caption about topic {i}") for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmark for each batch size."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--requests", type=int, default=256, help="Requests per batch size")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Batching window")
+    parser.add_argument("--fake", action="store_true", help="Use the synthetic backend")
+    args = parser.parse_args()
+
+    use_fake = args.fake or not TRANSFORMERS_AVAILABLE
+    print(f"backend: {'fake' if use_fake else 'transformers'}, requests: {args.requests}")
+    print(f"{'batch size':>10}{'req/s':>12}")
+    for batch_size in BATCH_SIZES:
+        engine = LocalGenerationEngine(
+            generate_fn=fake_generate if use_fake else None,
+            batch_window_ms=args.window_ms,
+            max_batch_size=batch_size,
+        )
+        rps = asyncio.run(run(engine, args.requests))
+        print(f"{batch_size:>10}{rps:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
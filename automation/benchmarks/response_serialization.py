@@ -0,0 +1,106 @@
+"""
+Serialization and compression benchmark for trends responses.
+
+Builds trends payloads of increasing size and times each way of turning
+one into a response body: FastAPI's default path (``jsonable_encoder`` plus
+``json.dumps``), validating against the route's ``response_model`` first,
+``FastJSONResponse`` (orjson when installed) and pydantic's
+``model_dump_json``. Then reports the gzip (and brotli, when installed)
+size and time at the levels ``CompressionMiddleware`` uses.
+
+Usage:
+    python -m benchmarks.response_serialization --sizes 1000,100000,5000000
+"""
+
+import argparse
+import json
+import time
+import zlib
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.routes.trends import FetchTrendsResponse
+from app.utils.responses import BROTLI_AVAILABLE, BROTLI_QUALITY, GZIP_LEVEL, FastJSONResponse
+
+TREND = {
+    "keyword": "artificial intelligence",
+    "score": 87,
+    "source": "google",
+    "related_queries": ["ai tools", "machine learning", "chatgpt"],
+    "timestamp": "2024-01-01T12:00:00",
+}
+TREND_SIZE = len(json.dumps(TREND)) + 2
+
+
+def _payload(size: int) -> dict:
+    """A fetch-trends response of roughly ``size`` bytes."""
+    trends = [
+        dict(TREND, keyword=f"{TREND['keyword']} {i}", score=i % 100)
+        for i in range(max(size // TREND_SIZE, 1))
+    ]
+    return {
+        "success": True,
+        "data": {"platform": "google", "trends": trends, "timeframe": "now 7-d"},
+        "message": f"Fetched {len(trends)} trends from google",
+    }
+
+
+def _gzip(body: bytes) -> bytes:
+    """Gzip ``body`` the way ``CompressionMiddleware`` does."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _timed(func, repeat: int) -> float:
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    """Time serialization and compression per payload size."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument(
+        "--sizes", default="1000,10000,100000,1000000,5000000",
+        help="Comma-separated payload sizes in bytes"
+    )
+    parser.add_argument("--repeat", type=int, default=0, help="Runs per measurement (default: by size)")
+    args = parser.parse_args()
+
+    print(
+        f"{'bytes':>9}{'default':>10}{'validate':>10}{'fast':>10}{'dump_json':>10}"
+        f"{'gzip ms':>10}{'gzip %':>8}{'br ms':>8}{'br %':>7}"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        payload = _payload(size)
+        repeat = args.repeat or max(3, 2_000_000 // size)
+
+        default = _timed(lambda: json.dumps(jsonable_encoder(payload)).encode(), repeat)
+        validate = _timed(
+            lambda: json.dumps(jsonable_encoder(FetchTrendsResponse.model_validate(payload))).encode(),
+            repeat,
+        )
+        fast = _timed(lambda: FastJSONResponse(payload).body, repeat)
+        model = FetchTrendsResponse.model_validate(payload)
+        dump_json = _timed(model.model_dump_json, repeat)
+
+        body = FastJSONResponse(payload).body
+        gzip_ms = _timed(lambda: _gzip(body), repeat)
+        gzip_ratio = len(_gzip(body)) / len(body) * 100
+
+        br_ms = br_ratio = "-"
+        if BROTLI_AVAILABLE:
+            import brotli  # pylint: disable=import-outside-toplevel,import-error
+            br_ms = f"{_timed(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat):.2f}"
+            br_ratio = f"{len(brotli.compress(body, quality=BROTLI_QUALITY)) / len(body) * 100:.1f}"
+
+        print(
+            f"{len(body):>9}{default:>10.2f}{validate:>10.2f}{fast:>10.2f}{dump_json:>10.2f}"
+            f"{gzip_ms:>10.2f}{gzip_ratio:>8.1f}{br_ms:>8}{br_ratio:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
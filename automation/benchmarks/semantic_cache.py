@@ -0,0 +1,47 @@
+"""
+Lookup latency of the semantic caption cache.
+
+Fills caches of increasing size with distinct captions and times lookups
+of near-duplicate requests, split into embedding and search time.
+
+Usage:
+    python -m benchmarks.semantic_cache --sizes 1000,5000,20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.services.semantic_cache import SemanticCache, cache_text
+
+
+def main():
+    """Time embedding and search per cache size."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Comma-separated cache sizes")
+    parser.add_argument("--lookups", type=int, default=500, help="Lookups per size")
+    args = parser.parse_args()
+
+    print(f"{'entries':>8}{'embed us':>10}{'lookup us':>11}{'hit %':>7}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        cache = SemanticCache(enabled=True, capacity=size)
+
+        async def run():
+            for i in range(size):
+                await cache.store(f"Topic number {i} launch", "casual", ["trend"], {"caption": str(i)})
+            start = time.perf_counter()
+            for i in range(args.lookups):
+                cache._embed(list(cache_text(f"topic numbers {i} launches", ["Trend"])))  # pylint: disable=protected-access
+            embed = (time.perf_counter() - start) / args.lookups
+            start = time.perf_counter()
+            hits = 0
+            for i in range(args.lookups):
+                hits += await cache.lookup(f"topic numbers {i} launches", "casual", ["Trend"]) is not None
+            return embed, (time.perf_counter() - start) / args.lookups, hits
+
+        embed, lookup, hits = asyncio.run(run())
+        print(f"{size:>8}{embed * 1e6:>10.0f}{lookup * 1e6:>11.0f}{hits / args.lookups * 100:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Gunicorn configuration for the production API server.
+
+Runs ``main:app`` in several uvicorn worker processes behind one listening
+socket:
+
+* ``WEB_CONCURRENCY`` workers (default: CPUs available to the container).
+  The value is exported back to the environment, where the database pool
+  sizing (``app.database.pool``) divides the connection budget by it.
+* The app is imported once in the master before forking
+  (``GUNICORN_PRELOAD``), so workers share its memory copy-on-write and a
+  broken import fails the deploy instead of crash-looping workers. Heavy
+  clients the app otherwise loads lazily (``GUNICORN_PRELOAD_MODULES``) are
+  imported in the master too, once instead of once per worker.
+* Workers use uvloop and httptools when installed (``uvicorn[standard]``).
+* Each worker is recycled after ``GUNICORN_MAX_REQUESTS`` requests plus up
+  to ``GUNICORN_MAX_REQUESTS_JITTER`` more, so workers do not all restart at
+  once, to bound memory growth.
+* On SIGTERM workers stop accepting connections and finish in-flight
+  requests for up to ``GUNICORN_GRACEFUL_TIMEOUT`` seconds; keep the
+  orchestrator's stop timeout above it.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+"""
+
+import importlib
+import math
+import os
+
+
+def cpu_count() -> int:
+    """CPUs available to this process, honouring cgroup v2 CPU quotas."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            available = min(available, max(math.ceil(int(quota) / int(period)), 1))
+    except (OSError, ValueError):
+        pass
+    return available
+
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY") or cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Imported in the master when preloading (comma separated)
+preload_modules = [
+    name.strip() for name in os.getenv("GUNICORN_PRELOAD_MODULES", "openai").split(",") if name.strip()
+]
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "25"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "warning")
+
+# Workers size their database pools from the actual worker count
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def on_starting(server):
+    """Clear metric files left by a previous run and preload heavy clients before workers fork."""
+    from app.utils.metrics import prepare_multiproc_dir  # pylint: disable=import-outside-toplevel
+    prepare_multiproc_dir()
+    if not server.cfg.preload_app:
+        return
+    for name in preload_modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            server.log.warning("Could not preload %s: %s", name, e)
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Drop live gauges of a recycled or crashed worker."""
+    from app.utils.metrics import mark_process_dead  # pylint: disable=import-outside-toplevel
+    mark_process_dead(worker.pid)
@@ -1,10 +1,12 @@
 """SocialTrend Automation API - FastAPI application for AI and auto-upload services."""
 
+import asyncio
+import importlib
 import os
+from typing import Dict
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response
 
 try:
     from prometheus_fastapi_instrumentator import Instrumentator  # type: ignore
@@ -13,14 +15,25 @@ except ImportError:
     PROMETHEUS_AVAILABLE = False
 
 # Import all modules first (PEP 8)
-from app.api.routes import ai_caption, auth, caption, trends, upload
+from app.api.routes import admin, ai_caption, auth, caption, trends, upload
+from app.database.write_buffer import write_buffer
+from app.services.circuit_breaker import breaker_states
+from app.services.hashtag_index import hashtag_index
+from app.services.local_generation import local_engine
+from app.services.posting_time import posting_time_recommender
+from app.utils.blocking import BlockingDetectorMiddleware, blocking_detector
 from app.utils.logging import logger, setup_logging
+from app.utils.metrics import is_multiprocess, mark_process_dead, render_metrics
+from app.utils.profiling import loop_lag_monitor
+from app.utils.responses import RESPONSE_COMPRESSION, CompressionMiddleware, FastJSONResponse
+from app.utils.settings import LiveCORSMiddleware, live_settings
+from app.utils.snapshots import wait_pending
 
 # Load environment variables
 load_dotenv()
 
-# Setup JSON logging
-setup_logging(os.getenv('LOG_LEVEL', 'INFO'))
+# Setup JSON logging (LOG_LEVEL can be changed at runtime, see app.utils.settings)
+setup_logging(live_settings.current.log_level)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -30,31 +43,33 @@ app = FastAPI(
     docs_url="/docs",  # Swagger UI
     redoc_url="/redoc",  # ReDoc
     openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse,  # orjson when installed
 )
 
 # CORS middleware - Production security (whitelist frontend domain)
-# Update FRONTEND_URL in .env for production
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:8080")
-ALLOWED_ORIGINS = [
-    FRONTEND_URL,
-    "http://localhost",
-    "http://localhost:8080",
-    "https://yourdomain.com",  # Update with production domain
-]
-
+# Update FRONTEND_URL (and ALLOWED_ORIGINS) in .env for production; both
+# can also be changed at runtime
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,  # Whitelist only frontend domains
+    LiveCORSMiddleware,  # Whitelist only frontend domains
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
     expose_headers=["*"],
 )
 
+# Attribute event loop stalls to the route that caused them
+LOOP_BLOCK_DETECTOR = os.getenv("LOOP_BLOCK_DETECTOR", "true").lower() == "true"
+if LOOP_BLOCK_DETECTOR:
+    app.add_middleware(BlockingDetectorMiddleware)
+
+# Compress large responses (RESPONSE_COMPRESSION_PATHS, above RESPONSE_COMPRESSION_MIN_SIZE)
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
 # Prometheus metrics instrumentation
 if PROMETHEUS_AVAILABLE:
-    Instrumentator().instrument(app).expose(app)
-    logger.info("Prometheus instrumentation enabled")
+    Instrumentator().instrument(app)
+    logger.info("Prometheus instrumentation enabled", extra={"multiprocess": is_multiprocess()})
 else:
     logger.warning(
         "Prometheus instrumentator not available - "
@@ -67,6 +82,51 @@ app.include_router(upload.router)
 app.include_router(trends.router)
 app.include_router(caption.router)
 app.include_router(ai_caption.router)
+app.include_router(admin.router)  # Profiling (ADMIN_USERNAMES only)
+
+
+# Optional subsystems warmed after startup: name -> "warming" | "ready" | "failed"
+subsystems: Dict[str, str] = {}
+
+
+async def _warm(name: str, coro):
+    """Run one warm-up step and record its state for /health."""
+    subsystems[name] = "warming"
+    try:
+        await coro
+    except Exception as e:  # pylint: disable=broad-except
+        subsystems[name] = "failed"
+        logger.error("Warm-up failed", extra={"subsystem": name, "error": str(e)})
+        return
+    subsystems[name] = "ready"
+
+
+async def _init_database():
+    """Create the automation tables (loads SQLAlchemy and the engine on first use)."""
+    from app.database.connection import init_models  # pylint: disable=import-outside-toplevel
+    await init_models()
+
+
+async def warm_up():
+    """
+    Warm optional subsystems without delaying startup.
+
+    Heavy clients are imported on first use; this loads them in the
+    background (module imports in a thread) so the first real request does
+    not pay for them, while /health already answers.
+    """
+    steps = {}
+    # Persist trends, captions and upload results in the background
+    if write_buffer.enabled:
+        steps["database"] = _init_database()
+    if os.getenv("OPENAI_API_KEY"):
+        steps["openai"] = asyncio.to_thread(importlib.import_module, "openai")
+    # Load the local caption model once per process (used without OPENAI_API_KEY)
+    elif os.getenv("HF_WARMUP", "true").lower() == "true":
+        steps["local_generation"] = local_engine.warm_up()
+    for name in steps:
+        subsystems[name] = "warming"
+    await asyncio.gather(*(_warm(name, coro) for name, coro in steps.items()))
 
 
 @app.on_event("startup")
@@ -74,12 +134,52 @@ async def startup_event():
     """Run on application startup."""
     logger.info("Starting SocialTrend Automation API", extra={"version": "1.0.0"})
 
+    # Export event loop lag so blocking calls show up immediately
+    loop_lag_monitor.start()
+    if LOOP_BLOCK_DETECTOR:
+        blocking_detector.start()
+
+    # Apply SETTINGS_FILE / SETTINGS_REDIS_KEY overrides without restarts
+    live_settings.start()
+
+    # Restore hashtags learned from previous trend fetches; posting times are
+    # shared through Redis and reloaded periodically
+    hashtag_index.load()
+    posting_time_recommender.start()
+
+    # Rows are buffered from the start; the flusher creates the engine on first flush
+    if write_buffer.enabled:
+        write_buffer.start()
+
+    if os.getenv("STARTUP_WARMUP", "true").lower() == "true":
+        app.state.warm_up_task = asyncio.get_running_loop().create_task(warm_up())
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown."""
     logger.info("Shutting down SocialTrend Automation API")
 
+    warm_up_task = getattr(app.state, "warm_up_task", None)
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+
+    await loop_lag_monitor.stop()
+    await blocking_detector.stop()
+    await live_settings.stop()
+    await write_buffer.stop()
+    await posting_time_recommender.stop()
+
+    # Stop reporting this worker's live gauges
+    mark_process_dead(os.getpid())
+
+    # Let periodic snapshots finish, then merge what this worker learned since
+    try:
+        await wait_pending()
+        await asyncio.to_thread(hashtag_index.save)
+    except OSError as e:
+        logger.error("Failed to save hashtag index snapshot", extra={"error": str(e)})
+
 
 @app.get("/")
 async def root():
@@ -92,7 +192,25 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics, aggregated across worker processes when enabled."""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 @app.get("/health")
 async def health():
-    """Health check endpoint to verify service availability."""
-    return {"status": "healthy", "service": "socialtrend-automation"}
+    """
+    Health check endpoint to verify service availability.
+
+    Ready as soon as the app serves requests; optional subsystems still
+    warming (or failed to warm) are listed under ``subsystems``, and the
+    state of each dependency's circuit breaker under ``circuit_breakers``.
+    """
+    return {
+        "status": "healthy",
+        "service": "socialtrend-automation",
+        "subsystems": subsystems,
+        "circuit_breakers": breaker_states(),
+    }
@@ -3,15 +3,32 @@
 import asyncio
 import logging
 import os
+import threading
 import time
 from typing import Any, Dict
 
-import httpx  # noqa: F401
 from celery import Celery
-from celery.signals import task_postrun, worker_ready
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+    worker_ready,
+)
+from celery.worker.control import control_command
 from dotenv import load_dotenv
+from kombu import Queue
 
 from app.services.celery_metrics import record_task_duration, update_queue_metrics
+from app.database.write_buffer import write_buffer
+from app.services.idempotency import UploadInProgressError, idempotency_store
+from app.services.posting_time import posting_time_recommender
+from app.services.celery_serialization import serialization_settings
+from app.utils.metrics import mark_process_dead, prepare_multiproc_dir, start_exporter
+from app.utils.profiling import MAX_PROFILE_SECONDS, SamplingProfiler
+from app.utils.settings import live_settings
+from app.utils.tracing import add_enqueue_header, observe_stage, queue_wait_seconds, stage
 
 # Load environment variables
 load_dotenv()
@@ -27,18 +44,54 @@ celery_app = Celery(
     backend=os.getenv('REDIS_URL', 'redis://redis:6379/0')
 )
 
+# Seconds before a duplicate upload checks the first attempt again. The first
+# attempt's claim expires after IDEMPOTENCY_LOCK_TTL, so the wait is bounded.
+DUPLICATE_RETRY_SECONDS = int(os.getenv('DUPLICATE_RETRY_SECONDS', '30'))
+
+# Serializer and result expiry are configurable via CELERY_SERIALIZER
+# and CELERY_RESULT_EXPIRES (see app.services.celery_serialization)
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    **serialization_settings(),
     timezone='UTC',
     enable_utc=True,
     task_routes={
         'tasks.auto_upload': {'queue': 'uploads'},
     },
+    # Declared so a plain `celery -A tasks worker` consumes the uploads queue too
+    task_queues=(Queue('celery'), Queue('uploads')),
+    # Report "running" for uploads polled through GET /api/upload/{task_id}
+    task_track_started=True,
 )
 
 
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):  # pylint: disable=unused-argument
+    """Record publish time in the message headers for queue-wait metrics."""
+    if headers is not None:
+        add_enqueue_header(headers)
+
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):  # pylint: disable=unused-argument
+    """Reset multiprocess metric files and serve /metrics from the worker parent."""
+    try:
+        prepare_multiproc_dir()
+        port = os.getenv('CELERY_METRICS_PORT', '9808')
+        if port:
+            start_exporter(int(port))
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Failed to start Celery metrics exporter: %s", str(e))
+
+
+@worker_process_shutdown.connect
+def cleanup_child_metrics(pid=None, **kwargs):  # pylint: disable=unused-argument
+    """Drop live gauges of an exiting pool child."""
+    try:
+        mark_process_dead(pid or os.getpid())
+    except Exception:  # pylint: disable=broad-except
+        pass  # Metrics cleanup is non-critical
+
+
 @worker_ready.connect
 def update_metrics_on_ready(**kwargs):  # pylint: disable=unused-argument
     """Update queue metrics when worker is ready."""
@@ -48,6 +101,12 @@ def update_metrics_on_ready(**kwargs):  # pylint: disable=unused-argument
         pass  # Metrics update is non-critical
 
 
+@task_prerun.connect
+def reload_runtime_settings(**kwargs):  # pylint: disable=unused-argument
+    """Apply changed runtime settings between tasks (at most every SETTINGS_RELOAD_SECONDS)."""
+    live_settings.reload_if_due()
+
+
 @task_postrun.connect
 def update_metrics_after_task(**kwargs):  # pylint: disable=unused-argument
     """Update queue metrics after task execution."""
@@ -57,10 +116,64 @@ def update_metrics_after_task(**kwargs):  # pylint: disable=unused-argument
         pass  # Metrics update is non-critical
 
 
+@control_command(
+    args=[('seconds', float)],
+    signature='[seconds=10]',
+)
+def profile(state, seconds=10.0):  # pylint: disable=unused-argument
+    """
+    Sample the worker process for N seconds into a collapsed stacks file.
+
+    Usage: celery -A tasks control profile 10
+
+    Returns the output path right away; the file is written to
+    PROFILE_OUTPUT_DIR (default /tmp) once sampling ends, so the consumer
+    keeps handling messages meanwhile. Sampling is capped at
+    PROFILER_MAX_SECONDS. Control commands run in the worker parent, so
+    task frames are only visible with the threads or solo pool; with
+    prefork this shows the consumer and pool supervision.
+    """
+    seconds = min(max(float(seconds), 0.0), MAX_PROFILE_SECONDS)
+    path = os.path.join(
+        os.getenv('PROFILE_OUTPUT_DIR', '/tmp'),
+        f"celery-{os.getpid()}-{int(time.time())}.collapsed"
+    )
+
+    def sample():
+        profiler = SamplingProfiler()
+        collapsed = profiler.run(seconds)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(collapsed)
+        except OSError as e:
+            logger.error("Failed to write profile: %s", str(e))
+            return
+        logger.info("Profile written to %s (%d samples)", path, profiler.sample_count)
+
+    # Sample from a daemon thread so the consumer's own stack is included
+    # and the command does not hold up the consumer
+    threading.Thread(target=sample, name='profiler', daemon=True).start()
+    return {'ok': {'path': path, 'seconds': seconds}}
+
+
+def _post_callback(callback_url: str, payload: Dict[str, Any]):
+    """Deliver an upload outcome to the backend webhook (failures are logged, not raised)."""
+    try:
+        import httpx  # pylint: disable=import-outside-toplevel  # only needed for callbacks
+        with stage('auto_upload', 'callback'):
+            httpx.post(callback_url, json=payload, timeout=10.0)
+    except Exception as callback_error:  # pylint: disable=broad-except
+        logger.error(
+            "Failed to send %s callback",
+            payload.get("status"),
+            extra={"error": str(callback_error)}
+        )
+
+
 @celery_app.task(name='tasks.auto_upload', bind=True, max_retries=3)
 def auto_upload(
     self, scheduled_post_id: int, platform: str, content: str,
-    media_urls: list = None, callback_url: str = None
+    media_urls: list = None, callback_url: str = None, duplicate_waits: int = 0
 ):
     """
     Background task for auto-uploading content to social media platforms.
@@ -73,6 +186,8 @@ def auto_upload(
         content: Text content to upload
         media_urls: List of media URLs to attach
         callback_url: URL to send callback when done
+        duplicate_waits: Retries spent waiting for a duplicate (not counted
+            against ``max_retries``)
 
     Returns:
         dict: Status and details of the upload operation
@@ -80,6 +195,10 @@ def auto_upload(
     task_start = time.time()
     task_name = 'tasks.auto_upload'
 
+    queue_wait = queue_wait_seconds(self.request, now=task_start)
+    if queue_wait is not None:
+        observe_stage('auto_upload', 'queue_wait', queue_wait)
+
     logger.info(
         "Processing auto-upload for scheduled post %s to %s",
         scheduled_post_id,
@@ -96,21 +215,27 @@ def auto_upload(
         from app.services.upload_service import UploadService  # pylint: disable=import-outside-toplevel  # type: ignore
 
         # Create event loop for async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        with stage('auto_upload', 'loop_setup'):
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
 
         try:
             # Call async upload service
-            result = loop.run_until_complete(
-                UploadService.upload_to_platform(
-                    platform=platform,
-                    content=content,
-                    media_urls=media_urls or [],
-                    scheduled_post_id=scheduled_post_id,
-                    callback_url=callback_url,
+            with stage('auto_upload', 'upload', platform=platform):
+                result = loop.run_until_complete(
+                    UploadService.upload_to_platform(
+                        platform=platform,
+                        content=content,
+                        media_urls=media_urls or [],
+                        scheduled_post_id=scheduled_post_id,
+                        callback_url=callback_url,
+                    )
                 )
-            )
         finally:
+            # Persist the upload outcome before the loop and its connections go away
+            loop.run_until_complete(write_buffer.close())
+            loop.run_until_complete(idempotency_store.close())
+            loop.run_until_complete(posting_time_recommender.close())
             loop.close()
 
         task_duration = time.time() - task_start
@@ -126,8 +251,33 @@ def auto_upload(
             }
         )
 
+        if callback_url:
+            _post_callback(callback_url, {
+                "scheduled_post_id": scheduled_post_id,
+                "status": result.get("status", "posted"),
+                "message": result.get("message"),
+                "post_url": result.get("post_url"),
+            })
+
         return result
 
+    except UploadInProgressError as e:
+        # Another attempt is still uploading this post: check again later for
+        # its result instead of failing the post
+        record_task_duration(task_name, time.time() - task_start, 'duplicate')
+        logger.info(
+            "Scheduled post %s is already being uploaded, checking again in %ss",
+            scheduled_post_id,
+            DUPLICATE_RETRY_SECONDS,
+            extra={"scheduled_post_id": scheduled_post_id, "platform": platform}
+        )
+        raise self.retry(
+            exc=e,
+            kwargs=dict(self.request.kwargs or {}, duplicate_waits=duplicate_waits + 1),
+            countdown=DUPLICATE_RETRY_SECONDS,
+            max_retries=None,
+        )
+
     except Exception as e:
         task_duration = time.time() - task_start
         record_task_duration(task_name, task_duration, 'failed')
@@ -143,31 +293,63 @@ def auto_upload(
         )
 
         # Retry if needed
-        if self.request.retries < self.max_retries:
-            raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+        failures = self.request.retries - duplicate_waits
+        if failures < self.max_retries:
+            raise self.retry(
+                exc=e, countdown=60 * (failures + 1), max_retries=self.max_retries + duplicate_waits
+            )
 
         # Send failure callback
         if callback_url:
-            try:
-                httpx.post(
-                    callback_url,
-                    json={
-                        "scheduled_post_id": scheduled_post_id,
-                        "status": "failed",
-                        "error": str(e),
-                    },
-                    timeout=10.0
-                )
-            except Exception as callback_error:  # pylint: disable=broad-except
-                logger.error(
-                    "Failed to send failure callback",
-                    extra={"error": str(callback_error)}
-                )
+            _post_callback(callback_url, {
+                "scheduled_post_id": scheduled_post_id,
+                "status": "failed",
+                "error": str(e),
+            })
 
         raise
 
 
-@celery_app.task(name='tasks.ai_process')
+@celery_app.task(name='tasks.auto_upload_bulk', bind=True, acks_late=True, max_retries=5, ignore_result=True)
+def auto_upload_bulk(self, uploads: list):
+    """
+    Fan a bulk upload request out into ``auto_upload`` tasks.
+
+    Published once by ``POST /api/upload/bulk``; each item carries the
+    task ID already returned to the caller, so the items can be polled at
+    ``GET /api/upload/{task_id}``. All items are published over one
+    producer connection.
+
+    The message is acknowledged only after the fan-out, so a worker lost
+    midway redelivers it. If publishing fails, the task is retried with
+    just the items not yet published; items republished after a lost
+    worker are deduplicated by ``scheduled_post_id`` (see
+    ``app.services.idempotency``).
+
+    Args:
+        uploads: ``auto_upload`` keyword arguments plus ``task_id`` per upload
+    """
+    published = 0
+    try:
+        with celery_app.producer_or_acquire() as producer:
+            for upload in uploads:
+                kwargs = dict(upload)
+                task_id = kwargs.pop('task_id')
+                auto_upload.apply_async(kwargs=kwargs, task_id=task_id, queue='uploads', producer=producer)
+                published += 1
+    except Exception as e:  # pylint: disable=broad-except
+        remaining = uploads[published:]
+        logger.error(
+            "Bulk upload fan-out failed after %s of %s uploads",
+            published,
+            len(uploads),
+            extra={"error": str(e), "remaining": len(remaining)}
+        )
+        raise self.retry(exc=e, kwargs={'uploads': remaining}, countdown=10 * (self.request.retries + 1))
+    logger.info("Fanned out %s bulk uploads", len(uploads))
+
+
+@celery_app.task(name='tasks.ai_process', ignore_result=True)
 def ai_process(content_data: Dict[str, Any]):
     """
     Background task for AI content processing.
@@ -0,0 +1,130 @@
+"""
+Event loop blocking detector tests
+
+test_api_does_not_block_event_loop is the CI guard: it fails when a
+request handler stalls the event loop longer than the detector threshold.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app as api_app
+from app.services import ai_caption
+from app.services.auth_service import create_access_token
+from app.services.hashtag_index import hashtag_index
+from app.services.posting_time import posting_time_recommender
+from app.utils.blocking import BACKGROUND_ROUTE, BlockingDetector, BlockingDetectorMiddleware, blocking_detector
+
+
+def _blocking_app(detector):
+    app = FastAPI()
+    app.add_middleware(BlockingDetectorMiddleware, detector=detector)
+
+    @app.on_event("startup")
+    async def startup():
+        detector.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await detector.stop()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        time.sleep(0.2)  # Blocks the event loop
+        return {"item_id": item_id}
+
+    @app.get("/fine")
+    async def fine():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    return app
+
+
+def test_detector_attributes_stall_to_route():
+    """Test that a blocking handler is reported with its route and stack"""
+    detector = BlockingDetector(threshold=0.05)
+    with TestClient(_blocking_app(detector)) as client:
+        assert client.get("/items/1").status_code == 200
+        time.sleep(0.05)
+
+    assert len(detector.events) == 1
+    event = detector.events[0]
+    assert event.route == "/items/{item_id}"
+    assert event.duration >= 0.1
+    assert "read_item" in event.stack
+
+
+def test_detector_ignores_awaiting_handlers():
+    """Test that awaiting handlers do not count as stalls"""
+    detector = BlockingDetector(threshold=0.05)
+    with TestClient(_blocking_app(detector)) as client:
+        assert client.get("/fine").status_code == 200
+
+    assert not detector.events
+
+
+def test_detector_reports_background_stalls():
+    """Test that stalls outside a request are attributed to background"""
+    detector = BlockingDetector(threshold=0.05)
+
+    async def run():
+        detector.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)
+        await asyncio.sleep(0.05)
+        await detector.stop()
+
+    asyncio.run(run())
+    assert [event.route for event in detector.events] == [BACKGROUND_ROUTE]
+
+
+class SlowOpenAI:  # pylint: disable=too-few-public-methods
+    """Synchronous stand-in for openai.OpenAI whose requests take a while"""
+
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @staticmethod
+    def create(**kwargs):  # pylint: disable=unused-argument
+        time.sleep(0.2)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=40, completion_tokens=20),
+            choices=[SimpleNamespace(finish_reason="stop", message=SimpleNamespace(content="Caption #ai #ml"))],
+        )
+
+
+def test_api_does_not_block_event_loop(monkeypatch, tmp_path):
+    """Test that API requests, including the OpenAI caption path, never stall the event loop"""
+    monkeypatch.setattr(hashtag_index, "snapshot_path", str(tmp_path / "hashtags.json"))
+    monkeypatch.setattr(posting_time_recommender, "enabled", False)  # No Redis in tests
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_caption.importlib, "import_module", lambda name: SimpleNamespace(OpenAI=SlowOpenAI))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'guard'})}"}
+
+    with TestClient(api_app, raise_server_exceptions=False) as client:
+        blocking_detector.events.clear()
+        statuses = {
+            "/": client.get("/").status_code,
+            "/health": client.get("/health").status_code,
+            "/metrics": client.get("/metrics").status_code,
+            "/automation/me": client.get("/automation/me", headers=headers).status_code,
+        }
+        caption = client.post("/api/ai/caption", json={"topic": "AI"}, headers=headers)
+        statuses["/api/ai/caption"] = caption.status_code
+        statuses["/api/generate_caption"] = client.post(
+            "/api/generate_caption", json={"content": "Launch"}, headers=headers
+        ).status_code
+        time.sleep(blocking_detector.threshold)
+        events = list(blocking_detector.events)
+
+    assert set(statuses.values()) == {200}, statuses
+    assert caption.json()["caption"].startswith("Caption")  # Came from the (slow) OpenAI client
+    assert not events, "\n\n".join(
+        f"{event.route} blocked the event loop for {event.duration * 1000:.0f}ms:\n{event.stack}"
+        for event in events
+    )
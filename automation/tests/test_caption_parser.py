@@ -0,0 +1,40 @@
+"""
+Caption completion parser tests
+"""
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from app.services.caption_parser import MAX_HASHTAGS, parse_completion
+
+FIXTURES = json.loads(
+    (Path(__file__).parent / "fixtures" / "caption_completions.json").read_text(encoding="utf-8")
+)
+
+
+@pytest.mark.parametrize("case", FIXTURES, ids=[case["name"] for case in FIXTURES])
+def test_recorded_completions(case):
+    """Test parsing of recorded model completions"""
+    parsed = parse_completion(case["completion"])
+    assert parsed.caption == case["caption"]
+    assert parsed.hashtags == case["hashtags"]
+    assert parsed.recommended_time == case["recommended_time"]
+
+
+def test_fuzz_completions():
+    """Test that arbitrary completions parse without errors or duplicate tags"""
+    rng = random.Random(1234)
+    pieces = [
+        "#", "#AI", "#ai", " ", "\n", ":", "{", "}", "\"caption\"", "Best time to post",
+        "9:00 AM", "12:75 pm", "Hashtags:", "Caption -", ",", "post", "é", "##", "word",
+    ]
+    for _ in range(2000):
+        completion = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+        parsed = parse_completion(completion)
+        lowered = [tag.lower() for tag in parsed.hashtags]
+        assert len(lowered) == len(set(lowered))
+        assert len(parsed.hashtags) <= MAX_HASHTAGS
+        assert all(tag.startswith("#") and len(tag) > 1 for tag in parsed.hashtags)
@@ -0,0 +1,36 @@
+"""
+Celery serialization tests
+"""
+
+from app.services import celery_serialization
+from app.services.celery_serialization import (
+    FLAG_COMPRESSED,
+    compact_dumps,
+    compact_loads,
+    serialization_settings,
+)
+
+
+def test_compact_round_trip():
+    """Test that compact payloads decode back to the original data"""
+    payload = {"scheduled_post_id": 1, "platform": "instagram", "media_urls": ["a", "b"]}
+    assert compact_loads(compact_dumps(payload)) == payload
+
+
+def test_compact_compresses_large_payloads():
+    """Test that payloads above the threshold are compressed"""
+    small = compact_dumps({"content": "hi"})
+    large = compact_dumps({"content": "x" * (celery_serialization.COMPRESSION_THRESHOLD * 4)})
+    assert not small[0] & FLAG_COMPRESSED
+    assert large[0] & FLAG_COMPRESSED
+    assert len(large) < celery_serialization.COMPRESSION_THRESHOLD
+
+
+def test_serialization_settings_from_env(monkeypatch):
+    """Test that serializer and result expiry are read from the environment"""
+    monkeypatch.setenv("CELERY_SERIALIZER", "compact")
+    monkeypatch.setenv("CELERY_RESULT_EXPIRES", "120")
+    settings = serialization_settings()
+    assert settings["task_serializer"] == "compact"
+    assert settings["result_expires"] == 120
+    assert "json" in settings["accept_content"]
@@ -0,0 +1,225 @@
+"""
+Circuit breaker tests
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import ai_caption
+from app.services.ai_caption import AICaptionService
+from app.services.auth_service import get_current_active_user
+from app.services.caption_service import CaptionService
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.services import trends_service
+from app.services.trends_service import RecentTrends, TrendsService
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock=None, **kwargs):
+    settings = {
+        "timeout_seconds": 0, "slow_call_seconds": 1, "failure_rate": 0.5, "slow_call_rate": 0.5,
+        "window": 4, "min_calls": 4, "open_seconds": 30, "half_open_calls": 2,
+    }
+    settings.update(kwargs)
+    return CircuitBreaker("test", clock=clock or FakeClock(), **settings)
+
+
+async def _ok():
+    return "ok"
+
+
+async def _fail():
+    raise ConnectionError("down")
+
+
+def _run(breaker, func):
+    try:
+        return asyncio.run(breaker.call(func))
+    except (ConnectionError, CircuitOpenError, asyncio.TimeoutError) as e:
+        return e
+
+
+def _opened(clock=None):
+    breaker = _breaker(clock, min_calls=1)
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_breaker_opens_at_failure_rate_and_rejects_immediately():
+    """Test that the breaker opens once the failure share reaches the threshold"""
+    breaker = _breaker()
+    for func in (_ok, _fail, _ok):
+        _run(breaker, func)
+    assert breaker.state == CLOSED  # Fewer than min_calls recorded
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+
+    calls = []
+
+    async def tracked():
+        calls.append(1)
+
+    error = _run(breaker, tracked)
+    assert isinstance(error, CircuitOpenError)
+    assert error.retry_after == 30
+    assert not calls
+
+
+def test_breaker_opens_on_slow_calls():
+    """Test that calls slower than the latency threshold open the breaker"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    async def slow():
+        clock.now += 2
+
+    for func in (slow, _ok, slow, _ok):
+        _run(breaker, func)
+    assert breaker.state == OPEN
+
+
+def test_timeouts_count_as_failures():
+    """Test that a call exceeding the timeout is cancelled and recorded as failed"""
+    breaker = _breaker(timeout_seconds=0.01, min_calls=1)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    assert isinstance(_run(breaker, hang), asyncio.TimeoutError)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probes_close_or_reopen_the_breaker():
+    """Test half-open probing after the open period"""
+    clock = FakeClock()
+    breaker = _opened(clock)
+    clock.now += 31
+    assert breaker.allows_request()
+    assert breaker.state == HALF_OPEN
+    _run(breaker, _ok)
+    assert breaker.state == HALF_OPEN
+    _run(breaker, _ok)
+    assert breaker.state == CLOSED
+
+    breaker = _opened(clock)
+    clock.now += 31
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+    assert breaker.retry_after == 30
+
+
+def test_half_open_limits_concurrent_probes():
+    """Test that only half_open_calls probes run while half-open"""
+    clock = FakeClock()
+    breaker = _opened(clock)
+    clock.now += 31
+
+    async def probe_concurrently():
+        release = asyncio.Event()
+
+        async def wait():
+            await release.wait()
+
+        probes = [asyncio.create_task(breaker.call(wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+        release.set()
+        await asyncio.gather(*probes)
+
+    asyncio.run(probe_concurrently())
+    assert breaker.state == CLOSED
+
+
+def test_ignored_errors_are_not_recorded():
+    """Test that errors marked as request errors leave the breaker closed"""
+    breaker = _breaker(min_calls=1, ignore=lambda e: isinstance(e, ConnectionError))
+    for _ in range(5):
+        _run(breaker, _fail)
+    assert breaker.state == CLOSED
+
+
+def test_settings_from_environment(monkeypatch):
+    """Test that per-dependency variables beat arguments, which beat global variables"""
+    monkeypatch.setenv("CIRCUIT_TEST_OPEN_SECONDS", "5")
+    monkeypatch.setenv("CIRCUIT_OPEN_SECONDS", "60")
+    monkeypatch.setenv("CIRCUIT_WINDOW", "50")
+    breaker = CircuitBreaker("test", open_seconds=10, window=None)
+    assert breaker.open_seconds == 5
+    assert breaker.window == 50
+    assert CircuitBreaker("other", open_seconds=10).open_seconds == 10
+
+
+def test_open_openai_breaker_goes_straight_to_fallback(monkeypatch):
+    """Test that an open OpenAI breaker skips the client entirely"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_caption, "openai_breaker", _opened())
+    monkeypatch.setattr(ai_caption.importlib, "import_module", pytest.fail)
+    result = asyncio.run(AICaptionService.generate_caption("AI", ["ml"]))
+    assert result["provider"] == "fallback"
+
+
+def test_caption_stub_does_not_feed_openai_breaker(monkeypatch):
+    """Test that the OpenAI stub of /api/generate_caption is not recorded by the OpenAI breaker"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def call(*args, **kwargs):  # pylint: disable=unused-argument
+        pytest.fail("stub went through the OpenAI breaker")
+
+    monkeypatch.setattr(ai_caption.openai_breaker, "call", call)
+    assert asyncio.run(CaptionService.generate_caption("AI"))["provider"] == "openai"
+
+
+@pytest.mark.parametrize("error, attempts", [
+    (asyncio.TimeoutError(), 1),
+    (type("NotFoundError", (Exception,), {"status_code": 404})(), 2),
+])
+def test_second_model_only_tried_for_request_errors(monkeypatch, error, attempts):
+    """Test that an outage does not wait out a second model's timeout"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    models = []
+
+    async def complete(client, model, *args):  # pylint: disable=unused-argument
+        models.append(model)
+        raise error
+
+    monkeypatch.setattr(AICaptionService, "_complete", staticmethod(complete))
+    result = asyncio.run(AICaptionService.generate_caption("AI", ["ml"]))
+    assert result["provider"] == "fallback"
+    assert len(models) == attempts
+
+
+def test_open_trends_breaker_serves_cached_trends(client, monkeypatch):
+    """Test cached trends while a provider is down, and 503 without a cache"""
+    client.app.dependency_overrides[get_current_active_user] = lambda: {"username": "test", "disabled": False}
+    breaker = _opened()
+    monkeypatch.setattr(TrendsService, "breaker", staticmethod(lambda platform: breaker))
+    recent_trends = RecentTrends()
+    monkeypatch.setattr(trends_service, "recent_trends", recent_trends)
+    try:
+        unavailable = client.post("/api/trends/fetch", json={"platform": "reddit"})
+        assert unavailable.status_code == 503
+        assert unavailable.headers["retry-after"] == "30"
+        assert client.get("/api/trends/export", params={"platform": "reddit"}).status_code == 503
+
+        recent_trends.put("reddit", [], "today 12-m", {"platform": "reddit", "trends": [{"subreddit": "ai"}]})
+        cached = client.post("/api/trends/fetch", json={"platform": "reddit"})
+        assert cached.status_code == 200
+        assert cached.json()["data"] == {"platform": "reddit", "trends": [{"subreddit": "ai"}], "cached": True}
+
+        # Another request's trends are not served as a cache hit
+        other = client.post("/api/trends/fetch", json={"platform": "reddit", "keywords": ["python"]})
+        assert other.status_code == 503
+    finally:
+        client.app.dependency_overrides.clear()
@@ -0,0 +1,75 @@
+"""
+Database pool sizing and instrumentation tests
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import NullPool
+
+from app.database.connection import run_with_retry
+from app.database.pool import InstrumentedQueuePool, checkout_wait, pool_settings, process_type
+
+
+def test_api_pool_splits_budget_across_workers():
+    """Test that API workers share what Celery children leave of the budget"""
+    settings = pool_settings("api", {
+        "DB_CONNECTION_BUDGET": "40", "WEB_CONCURRENCY": "4", "CELERY_CONCURRENCY": "4",
+    })
+    assert settings["poolclass"] is InstrumentedQueuePool
+    assert settings["pool_size"] + settings["max_overflow"] == 9
+    assert settings["pool_size"] == 6
+    assert settings["pool_pre_ping"] is False
+    assert settings["pool_recycle"] == 1800
+
+
+def test_pool_overrides_and_celery_null_pool():
+    """Test explicit overrides and that Celery children do not pool"""
+    settings = pool_settings("api", {
+        "DB_POOL_SIZE": "3", "DB_MAX_OVERFLOW": "0", "DB_POOL_PRE_PING": "true", "CELERY_CONCURRENCY": "1",
+    })
+    assert (settings["pool_size"], settings["max_overflow"], settings["pool_pre_ping"]) == (3, 0, True)
+    assert pool_settings("celery", {})["poolclass"] is NullPool
+    assert process_type({"DB_PROCESS_TYPE": "Celery"}) == "celery"
+
+
+def test_instrumented_pool_tracks_checkouts():
+    """Test that checkouts are timed and overflow is reported"""
+    before = checkout_wait._sum.get()  # pylint: disable=protected-access
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=1)
+    first, second = pool.connect(), pool.connect()
+    assert (pool.checkedout(), pool.overflow()) == (2, 1)
+    first.close()
+    second.close()
+    assert pool.checkedout() == 0
+    assert checkout_wait._sum.get() > before  # pylint: disable=protected-access
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def test_run_with_retry_retries_dropped_connections():
+    """Test that invalidated connections are retried once and other errors are not"""
+    calls = []
+
+    async def flaky(_session):
+        calls.append(1)
+        if len(calls) == 1:
+            raise DBAPIError("SELECT 1", None, ConnectionError("closed"), connection_invalidated=True)
+        return "ok"
+
+    assert asyncio.run(run_with_retry(flaky, _Session, retries=1)) == "ok"
+    assert len(calls) == 2
+
+    async def broken(_session):
+        raise DBAPIError("SELECT 1", None, ValueError("bad"))
+
+    with pytest.raises(DBAPIError):
+        asyncio.run(run_with_retry(broken, _Session, retries=1))
@@ -0,0 +1,84 @@
+"""
+Hashtag index tests
+"""
+import asyncio
+import os
+
+from app.services.hashtag_index import DEFAULT_HASHTAGS, HashtagIndex, normalize_tokens
+from app.utils.snapshots import wait_pending
+
+
+def test_normalize_tokens():
+    """Test that tokens are lowercased, split and de-pluralized"""
+    assert normalize_tokens("AI Trends") == ["ai", "trend"]
+    assert normalize_tokens("#MachineLearning") == ["machine", "learning"]
+
+
+def test_top_k_uses_trend_data():
+    """Test that lookups return hashtags indexed from trends"""
+    index = HashtagIndex()
+    index.add_trends([
+        {"keyword": "Machine Learning", "score": 87},
+        {"keyword": "AI", "score": 95},
+        {"subreddit": "cooking", "score": 10},
+    ])
+    assert index.top_k("machine learning tips", 2)[0] == "#machinelearning"
+    # Co-occurring trends are recommended together
+    assert "#ai" in index.top_k("machine learning", 5)
+    assert "#cooking" not in index.top_k("machine learning", 1)
+
+
+def test_recommend_pads_with_defaults_when_index_empty():
+    """Test that an empty index still returns usable hashtags"""
+    hashtags = HashtagIndex().recommend("Technology", ["AI Trends"])
+    assert hashtags[:2] == ["#technology", "#aitrends"]
+    assert set(DEFAULT_HASHTAGS) <= set(hashtags)
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that the index survives a save and load"""
+    path = str(tmp_path / "index.json")
+    index = HashtagIndex(snapshot_path=path)
+    index.add_trends([{"hashtag": "#AI", "tweet_count": 50000}])
+    index.save()
+
+    restored = HashtagIndex(snapshot_path=path)
+    assert restored.load()
+    assert restored.top_k("ai", 1) == ["#ai"]
+
+
+def test_periodic_snapshot_is_written_off_the_loop(tmp_path):
+    """Test that periodic snapshots are written in the background through unique temp files"""
+    path = str(tmp_path / "index.json")
+    index = HashtagIndex(snapshot_path=path, snapshot_interval=0)
+    index.add_trends([{"hashtag": "#AI", "tweet_count": 50000}])
+
+    async def run():
+        index.snapshot_if_due()
+        await wait_pending()
+
+    asyncio.run(run())
+    restored = HashtagIndex(snapshot_path=path)
+    assert restored.load()
+    assert restored.top_k("ai", 1) == ["#ai"]
+
+    index.save()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_workers_merge_their_snapshots(tmp_path):
+    """Test that each worker adds what it learned to the shared snapshot instead of replacing it"""
+    path = str(tmp_path / "index.json")
+    first, second = HashtagIndex(snapshot_path=path), HashtagIndex(snapshot_path=path)
+    first.add_trends([{"hashtag": "#AI", "tweet_count": 50000}])
+    second.add_trends([{"subreddit": "Python", "score": 100}])
+    second.add_trends([{"hashtag": "#AI", "tweet_count": 50000}])
+
+    first.save()
+    second.save()
+    first.save()  # Nothing new: scores are not added twice
+
+    restored = HashtagIndex(snapshot_path=path)
+    assert restored.load()
+    assert restored.top_k("python", 1) == ["#python"]
+    assert restored._postings["ai"]["#ai"] == 2 * first._postings["ai"]["#ai"]  # pylint: disable=protected-access
@@ -0,0 +1,134 @@
+"""
+Upload idempotency tests (duplicate suppression keyed on scheduled_post_id)
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.idempotency import IdempotencyStore, UploadInProgressError
+
+
+class FakeRedis:
+    """The subset of the asyncio Redis client used by the store"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    async def set(self, key, value, nx=False, ex=None):  # pylint: disable=unused-argument
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def eval(self, script, numkeys, key, token):  # pylint: disable=unused-argument
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def aclose(self):
+        pass
+
+
+def _store(redis, **kwargs):
+    return IdempotencyStore(client_factory=lambda: redis, enabled=True, poll_interval=0.01, **kwargs)
+
+
+def test_key_covers_post_and_content():
+    """Test that keys change with the content and are skipped without a scheduled post"""
+    key = IdempotencyStore.key(7, "Instagram", "hello", ["a.jpg"])
+    assert key == IdempotencyStore.key(7, "instagram", "hello", ["a.jpg"])
+    assert key != IdempotencyStore.key(7, "instagram", "hello!", ["a.jpg"])
+    assert key != IdempotencyStore.key(8, "instagram", "hello", ["a.jpg"])
+    assert IdempotencyStore.key(None, "instagram", "hello") is None
+
+
+def test_completed_upload_is_replayed():
+    """Test that a finished upload is returned without uploading again"""
+    store = _store(FakeRedis())
+    calls = []
+
+    async def upload():
+        calls.append(1)
+        return {"status": "posted", "post_url": "https://x"}
+
+    async def run():
+        first = await store.run("k", upload)
+        second = await store.run("k", upload)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert "duplicate" not in first
+    assert second == {"status": "posted", "post_url": "https://x", "duplicate": True}
+
+
+def test_concurrent_duplicate_waits_for_first_result():
+    """Test that a duplicate arriving mid-upload waits for and shares its result"""
+    store = _store(FakeRedis())
+    calls = []
+
+    async def upload():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "posted"}
+
+    async def run():
+        return await asyncio.gather(store.run("k", upload), store.run("k", upload))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(bool(r.get("duplicate")) for r in results) == [False, True]
+
+
+def test_failed_attempt_releases_key_for_retry():
+    """Test that a failed upload can be retried under the same key"""
+    store = _store(FakeRedis())
+
+    async def fail():
+        raise RuntimeError("platform error")
+
+    async def succeed():
+        return {"status": "posted"}
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await store.run("k", fail)
+        return await store.run("k", succeed)
+
+    assert asyncio.run(run()) == {"status": "posted"}
+
+
+def test_duplicate_gives_up_after_wait_timeout():
+    """Test that a duplicate raises when the first attempt keeps running"""
+    store = _store(FakeRedis(), wait_timeout=0.05)
+
+    async def slow():
+        await asyncio.sleep(0.5)
+        return {"status": "posted"}
+
+    async def run():
+        first = asyncio.ensure_future(store.run("k", slow))
+        await asyncio.sleep(0.01)
+        with pytest.raises(UploadInProgressError):
+            await store.run("k", slow)
+        await first
+
+    asyncio.run(run())
+
+
+def test_unavailable_redis_does_not_block_uploads():
+    """Test that uploads proceed without deduplication when Redis is down"""
+    store = _store(FakeRedis(fail=True))
+
+    async def upload():
+        return {"status": "posted"}
+
+    assert asyncio.run(store.run("k", upload)) == {"status": "posted"}
@@ -0,0 +1,177 @@
+"""
+LLM token accounting, budget and max_tokens tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services import ai_caption, llm_usage
+from app.services.ai_caption import AICaptionService
+from app.services.auth_service import get_current_active_user
+from app.services.llm_usage import OutputLengths, TokenBudget, TokenBudgetExceeded, cost, record_usage
+
+
+class FakeRedis:
+    """The subset of the asyncio Redis client used by the budget"""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    async def mget(self, keys):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        return [self.data.get(key) for key in keys]
+
+    async def incrby(self, key, amount):
+        self.data[key] = self.data.get(key, 0) + amount
+        return self.data[key]
+
+    async def expire(self, key, seconds):  # pylint: disable=unused-argument
+        return True
+
+    async def aclose(self):
+        pass
+
+
+class FakeClock:
+    """Manually advanced wall clock"""
+
+    def __init__(self):
+        self.now = 6000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _budget(redis=None, clock=None, **kwargs):
+    settings = {"global_budget": 0, "user_budget": 0, "window_seconds": 60}
+    settings.update(kwargs)
+    redis = redis or FakeRedis()
+    return TokenBudget(client_factory=lambda: redis, enabled=True, clock=clock or FakeClock(), **settings)
+
+
+def _completion(prompt_tokens=40, completion_tokens=25, finish_reason="stop", content="Caption #ai #ml"):
+    return SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+        choices=[SimpleNamespace(finish_reason=finish_reason, message=SimpleNamespace(content=content))],
+    )
+
+
+def test_global_budget_slides_with_the_window():
+    """Test that spent tokens block calls until they leave the window"""
+    clock = FakeClock()
+    budget = _budget(clock=clock, global_budget=100)
+
+    async def scenario():
+        await budget.consume(60, "alice")
+        clock.now += 30
+        await budget.consume(50, "bob")
+        with pytest.raises(TokenBudgetExceeded) as excinfo:
+            await budget.check("carol")
+        assert excinfo.value.scope == "global"
+        assert 30 <= excinfo.value.retry_after <= 31  # Until the first 60 tokens leave
+        clock.now += excinfo.value.retry_after
+        await budget.check("carol")
+
+    asyncio.run(scenario())
+
+
+def test_user_budgets_are_separate():
+    """Test that one user's spending does not block another user"""
+    budget = _budget(user_budget=50)
+
+    async def scenario():
+        await budget.consume(50, "alice")
+        with pytest.raises(TokenBudgetExceeded) as excinfo:
+            await budget.check("alice")
+        assert excinfo.value.scope == "user"
+        await budget.check("bob")
+        await budget.check(None)  # Unattributed calls only count globally
+
+    asyncio.run(scenario())
+
+
+def test_budget_fails_open_without_redis():
+    """Test that calls go ahead when Redis is unreachable"""
+    budget = _budget(FakeRedis(fail=True), global_budget=1)
+    asyncio.run(budget.check("alice"))
+
+
+def test_max_tokens_learned_per_style():
+    """Test max_tokens from observed completion lengths, within bounds"""
+    lengths = OutputLengths(default=300, minimum=64, percentile=0.95, headroom=1.25, min_samples=20)
+    for tokens in range(60, 100):
+        lengths.observe("casual", tokens)
+    assert lengths.max_tokens("casual") == 123  # 95th percentile (98) times 1.25, rounded up
+    assert lengths.max_tokens("professional") == 300
+
+    for _ in range(40):
+        lengths.observe("short", 10)
+    assert lengths.max_tokens("short") == 64
+    assert lengths.max_tokens("anything else") == 64  # Unknown styles share one "other" limit
+    assert set(lengths._samples) == {"casual", "other"}  # pylint: disable=protected-access
+
+    for _ in range(5):
+        lengths.observe("casual", 120, truncated=True)
+    assert lengths.max_tokens("casual") == 300
+
+
+def test_record_usage_counts_tokens_cost_and_budget(monkeypatch):
+    """Test that usage is read from the response and charged to the user"""
+    redis = FakeRedis()
+    monkeypatch.setattr(llm_usage, "token_budget", _budget(redis, user_budget=1000))
+    # Request styles outside LLM_KNOWN_STYLES are labelled "other"
+    labels = {"model": "gpt-4", "style": "other", "route": "ai_caption", "kind": "completion"}
+    before = REGISTRY.get_sample_value("llm_tokens_total", labels) or 0
+
+    asyncio.run(record_usage(_completion(), "gpt-4", "witty", "ai_caption", 1.2, 300, "alice"))
+
+    assert REGISTRY.get_sample_value("llm_tokens_total", labels) == before + 25
+    assert sum(redis.data.values()) == 65
+    assert cost("gpt-4", 1000, 1000) == pytest.approx(0.09)
+    assert cost("unknown-model", 1000, 1000) == 0
+
+
+def test_openai_caption_uses_learned_max_tokens_and_budget(client, monkeypatch):
+    """Test the OpenAI path end to end with a fake client"""
+    calls = []
+
+    class FakeOpenAI:  # pylint: disable=too-few-public-methods
+        """Stand-in for openai.OpenAI"""
+
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+        @staticmethod
+        def create(**kwargs):
+            calls.append(kwargs)
+            return _completion(completion_tokens=30)
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_caption.importlib, "import_module", lambda name: SimpleNamespace(OpenAI=FakeOpenAI))
+    lengths = OutputLengths(default=300, minimum=64, headroom=1.25, min_samples=1)
+    lengths.observe("professional", 100)
+    monkeypatch.setattr(ai_caption, "output_lengths", lengths)
+    monkeypatch.setattr(llm_usage, "output_lengths", lengths)
+    budget = _budget(user_budget=100)
+    monkeypatch.setattr(ai_caption, "token_budget", budget)
+    monkeypatch.setattr(llm_usage, "token_budget", budget)
+
+    result = asyncio.run(AICaptionService.generate_caption("AI", ["ml"], user="alice"))
+    assert result["provider"] == "openai"
+    assert calls[0]["max_tokens"] == 125
+
+    client.app.dependency_overrides[get_current_active_user] = lambda: {"username": "alice", "disabled": False}
+    try:
+        response = client.post("/api/ai/caption", json={"topic": "AI"})
+        assert response.status_code == 200
+        response = client.post("/api/ai/caption", json={"topic": "AI"})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+    finally:
+        client.app.dependency_overrides.clear()
+    assert len(calls) == 2
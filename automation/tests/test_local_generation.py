@@ -0,0 +1,95 @@
+"""
+Local generation engine tests
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import caption_service, local_generation
+from app.services.caption_service import CaptionService
+from app.services.local_generation import LocalGenerationEngine
+
+
+def test_concurrent_requests_are_batched():
+    """Test that requests within the window run as a single batch"""
+    batches = []
+
+    def generate(prompts):
+        batches.append(list(prompts))
+        return [prompt.upper() for prompt in prompts]
+
+    engine = LocalGenerationEngine(generate_fn=generate, batch_window_ms=20, max_batch_size=8)
+
+    async def run():
+        return await asyncio.gather(*(engine.generate(f"p{i}") for i in range(5)))
+
+    results = asyncio.run(run())
+    assert results == ["P0", "P1", "P2", "P3", "P4"]
+    assert len(batches) == 1
+
+
+def test_batch_size_is_capped():
+    """Test that batches never exceed the maximum batch size"""
+    batches = []
+
+    def generate(prompts):
+        batches.append(len(prompts))
+        return prompts
+
+    engine = LocalGenerationEngine(generate_fn=generate, batch_window_ms=20, max_batch_size=4)
+
+    async def run():
+        return await asyncio.gather(*(engine.generate(str(i)) for i in range(10)))
+
+    asyncio.run(run())
+    assert max(batches) <= 4
+    assert sum(batches) == 10
+
+
+def test_failed_model_load_is_not_retried_per_request(monkeypatch):
+    """Test that a model that cannot load is tried once and requests get the template caption"""
+    loads = []
+
+    def load_model():
+        loads.append(1)
+        raise OSError("model not found")
+
+    monkeypatch.setattr(local_generation, "TRANSFORMERS_AVAILABLE", True)
+    engine = LocalGenerationEngine(batch_window_ms=0)
+    monkeypatch.setattr(engine, "_load_model", load_model)
+    monkeypatch.setattr(caption_service, "local_engine", engine)
+
+    async def run():
+        with pytest.raises(OSError):
+            await engine.generate("first")
+        return await asyncio.gather(*(
+            CaptionService._generate_with_huggingface(  # pylint: disable=protected-access
+                f"topic {i}", None, "instagram", "casual"
+            )
+            for i in range(2)
+        ))
+
+    results = asyncio.run(run())
+    assert len(loads) == 1
+    assert not engine.available
+    assert [result["caption"] for result in results] == [
+        "Check out this amazing content! topic 0",
+        "Check out this amazing content! topic 1",
+    ]
+
+    engine._load_failed_at -= engine.load_retry_seconds  # pylint: disable=protected-access
+    assert engine.available
+
+
+def test_generation_errors_fall_back_to_template(monkeypatch):
+    """Test that a failing batch returns the template caption instead of an error"""
+    def generate(prompts):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(caption_service, "local_engine", LocalGenerationEngine(generate_fn=generate))
+
+    result = asyncio.run(CaptionService._generate_with_huggingface(  # pylint: disable=protected-access
+        "AI", None, "instagram", "casual"
+    ))
+    assert result["caption"] == "Check out this amazing content! AI"
@@ -0,0 +1,46 @@
+"""
+Multiprocess metrics helper tests
+"""
+
+import os
+
+from app.utils import metrics
+
+DEAD_PID = 99999999
+
+
+def test_cleanup_removes_live_gauges_of_dead_processes(tmp_path, monkeypatch):
+    """Test that live gauge files of dead processes are removed"""
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    dead_gauge = tmp_path / f"gauge_livemax_{DEAD_PID}.db"
+    dead_counter = tmp_path / f"counter_{DEAD_PID}.db"
+    own_gauge = tmp_path / f"gauge_livemax_{os.getpid()}.db"
+    for path in (dead_gauge, dead_counter, own_gauge):
+        path.write_bytes(b"")
+
+    assert metrics.cleanup_dead_processes() == 1
+    assert not dead_gauge.exists()
+    # Counters are kept so totals do not go backwards
+    assert dead_counter.exists()
+    assert own_gauge.exists()
+
+
+def test_prepare_multiproc_dir_clears_stale_files(tmp_path, monkeypatch):
+    """Test that stale files from other processes are removed on startup"""
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    stale = tmp_path / f"histogram_{DEAD_PID}.db"
+    own = tmp_path / f"counter_{os.getpid()}.db"
+    stale.write_bytes(b"")
+    own.write_bytes(b"")
+
+    metrics.prepare_multiproc_dir()
+    assert not stale.exists()
+    assert own.exists()
+
+
+def test_render_metrics_single_process(monkeypatch):
+    """Test that the default registry is used without a multiprocess directory"""
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", None)
+    content, content_type = metrics.render_metrics()
+    assert content_type.startswith("text/plain")
+    assert isinstance(content, bytes)
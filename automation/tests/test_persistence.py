@@ -0,0 +1,180 @@
+"""
+Persistence layer tests (repositories and write-behind buffer)
+"""
+
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DataError
+
+from app.database.repositories import TrendRepository
+from app.database.rows import caption_row, trend_rows, upload_row
+from app.database.write_buffer import TABLES, WriteBehindBuffer
+from app import models
+from app.models import TrendSnapshot
+
+
+class _Dialect:
+    driver = "test"
+
+
+class _Connection:
+    dialect = _Dialect()
+
+
+class _Result:
+    def all(self):
+        return []
+
+
+class FakeSession:
+    """Records executed statements instead of talking to a database"""
+
+    def __init__(self, log, fail=False, reject=None):
+        self.log = log
+        self.fail = fail
+        self.reject = reject
+        self.queries = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def connection(self):
+        return _Connection()
+
+    async def execute(self, statement, rows):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        if self.reject and any(self.reject(row) for row in rows):
+            raise DataError("INSERT", {}, ValueError("value too long"))
+        self.log.append((statement.table.name, list(rows)))
+
+    async def scalars(self, query):
+        self.queries.append(query)
+        return _Result()
+
+    async def commit(self):
+        self.log.append("commit")
+
+
+def test_trend_rows_normalize_provider_formats():
+    """Test that trend rows are built from every provider's format"""
+    rows = trend_rows("Twitter", [
+        {"hashtag": "#AI", "tweet_count": 50000},
+        {"subreddit": "technology", "score": 12345},
+        {"unknown": "skipped"},
+    ])
+    assert [(r["platform"], r["keyword"], r["score"]) for r in rows] == [
+        ("twitter", "#AI", 50000.0),
+        ("twitter", "technology", 12345.0),
+    ]
+    assert rows[0]["fetched_at"] == rows[1]["fetched_at"]
+
+
+def test_buffer_table_labels_match_models():
+    """Test that the buffer's metric labels name the real tables"""
+    for name, table in TABLES.items():
+        assert getattr(models, name).__tablename__ == table
+
+
+def test_trend_history_query_uses_index_columns():
+    """Test that trend history filters and sorts on the (platform, keyword, time) index"""
+    index = next(
+        i for i in TrendSnapshot.__table__.indexes
+        if i.name == "ix_trend_snapshots_platform_keyword_time"
+    )
+    assert [c.name for c in index.columns] == ["platform", "keyword", "fetched_at"]
+
+    session = FakeSession([])
+    asyncio.run(TrendRepository.history(session, "Google", "AI", limit=10))
+    sql = str(session.queries[0].compile(dialect=postgresql.dialect()))
+    assert "automation_trend_snapshots.platform = " in sql
+    assert "automation_trend_snapshots.keyword = " in sql
+    assert "ORDER BY automation_trend_snapshots.fetched_at DESC" in sql
+
+
+def test_buffer_flushes_one_bulk_insert_per_table():
+    """Test that buffered rows are grouped per table and committed once"""
+    log = []
+    buffer = WriteBehindBuffer(session_factory=lambda: FakeSession(log), enabled=True)
+    buffer.add("TrendSnapshot", trend_rows("google", [{"keyword": "AI", "score": 1}] * 3))
+    buffer.add("GeneratedCaption", caption_row({"caption": "hi", "provider": "fallback"}))
+    buffer.add("UploadResult", upload_row("instagram", "posted", 7))
+
+    written = asyncio.run(buffer.flush())
+
+    assert written == 5
+    assert len(buffer) == 0
+    assert [entry[0] if entry != "commit" else entry for entry in log] == [
+        "automation_trend_snapshots",
+        "automation_generated_captions",
+        "automation_upload_results",
+        "commit",
+    ]
+    assert len(log[0][1]) == 3
+
+
+def test_buffer_keeps_rows_when_flush_fails():
+    """Test that a failed flush keeps rows, bounded by max_pending"""
+    buffer = WriteBehindBuffer(
+        session_factory=lambda: FakeSession([], fail=True), enabled=True, max_pending=4
+    )
+    buffer.add("UploadResult", [upload_row("linkedin", "failed", i) for i in range(6)])
+    assert len(buffer) == 4
+
+    assert asyncio.run(buffer.flush()) == 0
+    assert len(buffer) == 4
+    assert [row["scheduled_post_id"] for _, row in buffer._pending] == [2, 3, 4, 5]  # pylint: disable=protected-access
+
+
+def test_caption_row_clips_request_fields():
+    """Test that client-controlled values are cut to their column lengths"""
+    row = caption_row({"caption": "hi", "style": "s" * 100, "model": "m" * 100}, "t" * 300, "p" * 100)
+    assert (len(row["platform"]), len(row["topic"]), len(row["style"]), len(row["model"])) == (32, 255, 32, 64)
+
+
+def test_buffer_drops_rows_the_database_rejects():
+    """Test that one bad row is isolated and dropped instead of blocking every later flush"""
+    log = []
+    buffer = WriteBehindBuffer(
+        session_factory=lambda: FakeSession(log, reject=lambda row: row.get("scheduled_post_id") == 3),
+        enabled=True
+    )
+    buffer.add("UploadResult", [upload_row("linkedin", "posted", i) for i in range(6)])
+    buffer.add("GeneratedCaption", caption_row({"caption": "hi", "provider": "fallback"}))
+
+    assert asyncio.run(buffer.flush()) == 6
+    assert len(buffer) == 0
+    written = [row.get("scheduled_post_id") for entry in log if entry != "commit" for row in entry[1]]
+    assert sorted(i for i in written if i is not None) == [0, 1, 2, 4, 5]
+
+    buffer.add("UploadResult", upload_row("linkedin", "posted", 7))
+    assert asyncio.run(buffer.flush()) == 1
+
+
+def test_buffer_background_flush_on_batch_size():
+    """Test that a full batch is flushed without waiting for the interval"""
+    log = []
+    buffer = WriteBehindBuffer(
+        session_factory=lambda: FakeSession(log), enabled=True, flush_interval=60, batch_size=2
+    )
+
+    async def run():
+        buffer.start()
+        buffer.add("UploadResult", [upload_row("instagram", "posted", i) for i in range(2)])
+        await asyncio.sleep(0.05)
+        flushed = len(log)
+        await buffer.stop()
+        return flushed
+
+    assert asyncio.run(run()) == 2
+
+
+def test_disabled_buffer_ignores_rows():
+    """Test that nothing is queued when persistence is disabled"""
+    buffer = WriteBehindBuffer(enabled=False)
+    buffer.add("UploadResult", upload_row("instagram", "posted"))
+    assert len(buffer) == 0
@@ -0,0 +1,135 @@
+"""
+Posting time recommender tests
+"""
+import asyncio
+from datetime import datetime
+
+from app.services.posting_time import PostingTimeRecommender, format_slot, hour_of_week
+
+
+class FakePipeline:
+    """Queues commands and runs them on execute"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis unavailable")
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    """The subset of the asyncio Redis client used by the recommender (bytes replies)"""
+
+    def __init__(self):
+        self.sets = {}
+        self.hashes = {}
+        self.fail = False
+
+    def pipeline(self, transaction=True):  # pylint: disable=unused-argument
+        return FakePipeline(self)
+
+    async def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member.encode())
+
+    async def smembers(self, key):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        return set(self.sets.get(key, ()))
+
+    async def hincrbyfloat(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field.encode()] = str(float(values.get(field.encode(), 0)) + amount).encode()
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def aclose(self):
+        pass
+
+
+def _record(recommender, *args, **kwargs):
+    asyncio.run(recommender.record(*args, **kwargs))
+
+
+def test_format_slot():
+    """Test slot formatting matches the API time format"""
+    assert format_slot(9) == ("Monday", "09:00 AM")
+    assert format_slot(24 + 19) == ("Tuesday", "07:00 PM")
+    assert format_slot(0) == ("Monday", "12:00 AM")
+
+
+def test_best_slot_follows_engagement():
+    """Test that the best slot moves to where engagement is highest"""
+    recommender = PostingTimeRecommender(enabled=False)
+    thursday_3pm = datetime(2024, 1, 4, 15, 30)
+    for _ in range(10):
+        _record(recommender, "instagram", thursday_3pm, engagement=50)
+
+    assert recommender.best_slot("instagram") == {
+        "recommended_day": "Thursday",
+        "recommended_time": "03:00 PM",
+    }
+    # Other platforms and audiences are tracked separately
+    assert recommender.best_slot("linkedin")["recommended_day"] != "Thursday"
+
+
+def test_best_slot_recovers_when_leader_drops():
+    """Test that the leader is replaced once its engagement falls"""
+    recommender = PostingTimeRecommender(enabled=False)
+    slot_time = datetime(2024, 1, 4, 15, 0)
+    _record(recommender, "instagram", slot_time, engagement=100)
+    for _ in range(200):
+        _record(recommender, "instagram", slot_time, engagement=0)
+    assert recommender.best_slot("instagram")["recommended_time"] != "03:00 PM"
+    assert hour_of_week(slot_time) == 3 * 24 + 15
+
+
+def test_histograms_are_shared_through_redis():
+    """Test that engagement recorded by one process reaches another on refresh"""
+    redis = FakeRedis()
+    worker = PostingTimeRecommender(enabled=True, client_factory=lambda: redis)
+    api = PostingTimeRecommender(enabled=True, client_factory=lambda: redis)
+
+    async def run():
+        for _ in range(10):
+            await worker.record("linkedin", datetime(2024, 1, 6, 10, 0), engagement=500, audience="b2b")
+        await worker.record_upload_result({"status": "posted", "platform": "linkedin"})
+        return await api.refresh()
+
+    assert asyncio.run(run())
+    assert api.best_slot("linkedin", "b2b") == {"recommended_day": "Saturday", "recommended_time": "10:00 AM"}
+    # A post without engagement is counted but does not move the recommendation
+    assert api.best_slot("linkedin") == {"recommended_day": "Monday", "recommended_time": "09:00 AM"}
+    assert sorted(api._histograms) == [("linkedin", "b2b"), ("linkedin", "default")]  # pylint: disable=protected-access
+
+
+def test_redis_errors_keep_local_histograms():
+    """Test that recording and refreshing tolerate an unavailable Redis"""
+    redis = FakeRedis()
+    recommender = PostingTimeRecommender(enabled=True, client_factory=lambda: redis)
+    redis.fail = True
+
+    async def run():
+        await recommender.record("instagram", datetime(2024, 1, 4, 15, 0), engagement=500)
+        return await recommender.refresh()
+
+    assert not asyncio.run(run())
+    assert recommender.best_slot("instagram")["recommended_time"] == "03:00 PM"
+
+
+def test_best_slot_does_not_create_histograms():
+    """Test that recommendations for unseen platforms and audiences are read-only"""
+    recommender = PostingTimeRecommender(enabled=False)
+    _record(recommender, "instagram", datetime(2024, 1, 4, 15, 30), engagement=500)
+
+    # Unknown audiences use the platform's default audience, unknown platforms the prior
+    assert recommender.best_slot("Instagram", "night owls") == recommender.best_slot("instagram")
+    assert recommender.best_slot("myspace-" * 10, "anyone") == recommender.best_slot("tiktok")
+    assert recommender.best_slot("linkedin")["recommended_time"] == "09:00 AM"
+    assert list(recommender._histograms) == [("instagram", "default")]  # pylint: disable=protected-access
@@ -0,0 +1,71 @@
+"""
+Profiling endpoint and sampler tests
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from app.utils.profiling import EventLoopLagMonitor, SamplingProfiler
+
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collects_collapsed_stacks():
+    """Test that the sampler records stacks of running threads"""
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        collapsed = SamplingProfiler(interval=0.002).run(0.1)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = [line for line in collapsed.splitlines() if line]
+    assert any(line.startswith("busy;") and "_busy_worker" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_loop_lag_monitor_detects_blocking():
+    """Test that a blocking call shows up as event loop lag"""
+    monitor = EventLoopLagMonitor(interval=0.01)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # Block the loop
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor.max_lag >= 0.05
+
+
+def test_profile_endpoint_requires_authentication(client):
+    """Test that the profiling endpoint requires authentication"""
+    response = client.post("/api/admin/profile?seconds=1")
+    assert response.status_code == 401
+
+
+def test_celery_profile_command_returns_before_sampling_ends(tmp_path, monkeypatch):
+    """Test that the worker profile command is capped and writes its file in the background"""
+    import tasks  # pylint: disable=import-outside-toplevel
+    monkeypatch.setenv("PROFILE_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(tasks, "MAX_PROFILE_SECONDS", 0.2)
+
+    started = time.perf_counter()
+    reply = tasks.profile(None, 3600)["ok"]
+    assert time.perf_counter() - started < 0.1
+    assert reply["seconds"] == 0.2
+
+    for _ in range(100):
+        if os.path.exists(reply["path"]):
+            break
+        time.sleep(0.05)
+    assert os.path.dirname(reply["path"]) == str(tmp_path)
+    assert os.path.exists(reply["path"])
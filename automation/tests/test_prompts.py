@@ -0,0 +1,106 @@
+"""
+Tests for the prompt template registry
+"""
+from collections import Counter
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from app.services import prompts as prompts_module
+from app.services.prompts import ANY, PromptRegistry, PromptTemplate, observe, registry
+
+
+def _registry(versions=None):
+    prompts = PromptRegistry(versions or {})
+    prompts.register(PromptTemplate("demo", "v1", system="Old {style}.", user="About {topic}"))
+    prompts.register(PromptTemplate("demo", "v2", system="Any {style}.", user="Topic: {topic}{trends}",
+                                    trends_clause=" ({})"))
+    prompts.register(PromptTemplate("demo", "v2", system="Tweet {style}.", user="Topic: {topic}", platform="twitter"))
+    prompts.register(PromptTemplate("demo", "v2", system="Funny tweet.", user="{topic}", style="humorous",
+                                    platform="twitter"))
+    return prompts
+
+
+def test_render_fills_request_fields():
+    """Test that rendering fills the system and user messages"""
+    prompt = _registry().get("demo").render("AI", ["ML", "LLM"], style="casual")
+
+    assert prompt.messages == [
+        {"role": "system", "content": "Any casual."},
+        {"role": "user", "content": "Topic: AI (ML, LLM)"},
+    ]
+    assert (prompt.template, prompt.version) == ("demo", "v2")
+
+
+def test_most_specific_template_wins():
+    """Test that style and platform specific templates take precedence"""
+    prompts = _registry()
+
+    assert prompts.get("demo", "humorous", "twitter").render("x").messages[0]["content"] == "Funny tweet."
+    assert prompts.get("demo", "casual", "twitter").render("x", style="casual").messages[0]["content"] == "Tweet casual."
+    assert prompts.get("demo", "casual", "linkedin").platform == ANY
+
+
+def test_system_message_shared_across_requests():
+    """Test that requests of one style and platform share the same prefix"""
+    template = registry.get("ai_caption", "casual", "instagram")
+    first = template.render("AI trends", ["ML"], style="casual", platform="instagram")
+    second = template.render("Coffee", None, style="casual", platform="instagram")
+    other = template.render("AI trends", ["ML"], style="professional", platform="instagram")
+    as_json = template.render("AI trends", ["ML"], style="casual", platform="instagram", json_output=True)
+
+    assert first.messages[0] is second.messages[0]
+    assert first.prefix_id == second.prefix_id
+    assert len({first.prefix_id, other.prefix_id, as_json.prefix_id}) == 3
+    assert '"hashtags"' in as_json.messages[0]["content"]
+
+
+def test_version_split_is_stable():
+    """Test that the A/B split follows the weights and is stable per key"""
+    prompts = _registry({"demo": {"v1": 0.25, "v2": 0.75}})
+
+    versions = Counter(prompts.version_for("demo", f"user{i}") for i in range(4000))
+    assert 800 < versions["v1"] < 1200
+    assert all(prompts.version_for("demo", "alice") == prompts.version_for("demo", "alice") for _ in range(5))
+    assert prompts.get("demo", key="alice").version == prompts.version_for("demo", "alice")
+
+
+def test_latest_version_is_default():
+    """Test that templates without a split serve their latest version"""
+    assert _registry().version_for("demo", "anyone") == "v2"
+    assert registry.version_for("ai_caption") == "v2"
+
+
+def test_compact_version_is_shorter():
+    """Test that the default caption prompt uses fewer characters than the original"""
+    def size(version):
+        prompts = PromptRegistry({"ai_caption": {version: 1.0}})
+        prompts._templates = registry._templates  # pylint: disable=protected-access
+        prompt = prompts.get("ai_caption", "professional", "instagram").render(
+            "AI trends", ["ML", "LLM"], style="professional", platform="instagram"
+        )
+        return sum(len(message["content"]) for message in prompt.messages)
+
+    assert size("v2") < size("v1") * 0.8
+
+
+def test_observe_records_per_version_metrics():
+    """Test that completions are counted per template version"""
+    prompt = _registry().get("demo").render("AI")
+    labels = {"template": "demo", "version": "v2"}
+    before = REGISTRY.get_sample_value("prompt_template_tokens_total", dict(labels, kind="prompt")) or 0
+
+    observe(prompt, 0.4, SimpleNamespace(prompt_tokens=30, completion_tokens=12))
+
+    assert REGISTRY.get_sample_value("prompt_template_tokens_total", dict(labels, kind="prompt")) == before + 30
+    assert REGISTRY.get_sample_value("prompt_template_requests_total", labels) >= 1
+
+
+def test_compiled_system_messages_are_bounded(monkeypatch):
+    """Test that arbitrary request styles do not grow the compiled cache"""
+    monkeypatch.setattr(prompts_module, "MAX_COMPILED", 4)
+    template = _registry().get("demo")
+    for i in range(10):
+        prompt = template.render("AI", style=f"style{i}")
+        assert prompt.messages[0]["content"] == f"Any style{i}."
+    assert len(template._compiled) == 4  # pylint: disable=protected-access
@@ -0,0 +1,104 @@
+"""
+Response serialization and compression tests
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.api.routes.ai_caption import AICaptionResponse
+from app.api.routes.caption import GenerateCaptionResponse
+from app.api.routes.trends import FetchTrendsResponse
+from app.services.auth_service import get_current_active_user
+from app.utils.responses import CompressionMiddleware, FastJSONResponse
+
+
+@pytest.fixture
+def user_client(client):
+    """Test client authenticated as a test user"""
+    client.app.dependency_overrides[get_current_active_user] = lambda: {"username": "test", "disabled": False}
+    yield client
+    client.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("platform", ["google", "reddit", "twitter"])
+def test_trends_payload_matches_response_model(user_client, platform):
+    """Test that the unvalidated fast path still returns the declared model"""
+    response = user_client.post("/api/trends/fetch", json={"platform": platform, "keywords": ["ai"]})
+    assert response.status_code == 200
+    FetchTrendsResponse.model_validate(response.json())
+
+
+def test_caption_payloads_match_response_models(user_client, monkeypatch):
+    """Test caption endpoints (fallback providers) against their models"""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    response = user_client.post("/api/generate_caption", json={"content": "Launch"})
+    GenerateCaptionResponse.model_validate(response.json())
+    response = user_client.post("/api/ai/caption", json={"topic": "AI", "trend": ["ml"]})
+    AICaptionResponse.model_validate(response.json())
+
+
+def _compressed_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, paths=["/api/trends"])
+
+    @app.get("/api/trends/big")
+    def big():
+        return FastJSONResponse({"trends": [{"keyword": f"k{i}", "score": i} for i in range(200)]})
+
+    @app.get("/api/trends/small")
+    def small():
+        return FastJSONResponse({"ok": True})
+
+    @app.get("/api/trends/stream")
+    def stream():
+        return StreamingResponse((json.dumps({"i": i}) + "\n" for i in range(50)), media_type="application/x-ndjson")
+
+    @app.get("/other")
+    def other():
+        return FastJSONResponse({"trends": ["x"] * 200})
+
+    return TestClient(app)
+
+
+def test_large_responses_are_gzipped():
+    """Test gzip above the threshold and plain responses below it or elsewhere"""
+    client = _compressed_app()
+    big = client.get("/api/trends/big", headers={"Accept-Encoding": "gzip"})
+    assert big.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in big.headers["vary"]
+    assert len(big.json()["trends"]) == 200  # decoded by the client
+    assert int(big.headers["content-length"]) < len(big.content)
+
+    assert "content-encoding" not in client.get("/api/trends/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/other", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/api/trends/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_streaming_responses_are_compressed_incrementally():
+    """Test that streamed chunks are flushed as a valid gzip stream"""
+    client = _compressed_app()
+    with client.stream("GET", "/api/trends/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = b"".join(response.iter_raw())
+    lines = gzip.decompress(body).decode().splitlines()
+    assert len(lines) == 50
+    # Every chunk ends on a flush point, so a partial download decodes too
+    partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body[: len(body) // 2])
+    assert partial.startswith(b'{"i": 0}')
+
+
+def test_brotli_preferred_when_available():
+    """Test that brotli is used when installed and accepted"""
+    brotli = pytest.importorskip("brotli")
+    client = _compressed_app()
+    with client.stream("GET", "/api/trends/big", headers={"Accept-Encoding": "gzip, br"}) as response:
+        assert response.headers["content-encoding"] == "br"
+        body = b"".join(response.iter_raw())
+    assert len(json.loads(brotli.decompress(body))["trends"]) == 200
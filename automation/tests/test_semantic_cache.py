@@ -0,0 +1,175 @@
+"""
+Semantic caption cache tests
+"""
+
+import asyncio
+
+import numpy as np
+from prometheus_client import REGISTRY
+
+from app.services import ai_caption
+from app.services.ai_caption import AICaptionService
+from app.services.prompts import registry as prompt_registry
+from app.services.semantic_cache import HashingVectorizer, SemanticCache, cache_text
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(**kwargs):
+    return SemanticCache(enabled=True, threshold=0.9, capacity=8, ttl=60, **kwargs)
+
+
+def _caption(text):
+    return {"caption": text, "hashtags": ["#ai"], "provider": "openai", "model": "gpt-4"}
+
+
+def test_cache_text_normalizes_case_plurals_and_trend_order():
+    """Test that trivially different requests produce the same text"""
+    assert cache_text("AI trends", ["Machine learning", "NLP"]) == cache_text("ai trend", ["nlp", "machine learning"])
+    assert cache_text("AI trends", ["NLP"]) == ("ai trend", "nlp")
+
+
+def test_hashing_vectors_are_unit_length_and_deterministic():
+    """Test the fallback vectorizer"""
+    vectors = HashingVectorizer(64).embed(["ai trend | ml", "summer fashion |", ""])
+    assert vectors.shape == (3, 64)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert not vectors[2].any()
+    assert np.array_equal(vectors[0], HashingVectorizer(64).embed(["ai trend | ml"])[0])
+
+
+def test_near_duplicates_hit_and_different_requests_miss():
+    """Test hits for trivial variants only, within the same style"""
+    cache = _cache()
+
+    async def scenario():
+        await cache.store("AI trends", "casual", ["ML"], _caption("first"))
+        hit = await cache.lookup("ai trend", "casual", ["ml"])
+        assert hit == dict(_caption("first"), cached=True)
+        assert await cache.lookup("Summer fashion", "casual", ["beach"]) is None
+        assert await cache.lookup("AI trends", "professional", ["ML"]) is None
+
+    asyncio.run(scenario())
+
+
+def test_distinct_topics_with_shared_trends_miss():
+    """Test that different topics do not match on the trend list they share"""
+    cache = _cache()
+    trends = ["Black Friday", "Holiday shopping", "Gift ideas", "Cyber Monday", "Small business"]
+    pairs = [
+        ("Summer sale 20% off", "Summer sale 50% off"),
+        ("Huge summer clearance sale on all shoes 20% off", "Huge summer clearance sale on all shoes 50% off"),
+        ("Election results Texas", "Election results Ohio"),
+        ("vegan menu", "keto menu"),
+    ]
+
+    async def scenario():
+        for stored, _ in pairs:
+            await cache.store(stored, "casual", trends, _caption(stored))
+        for stored, other in pairs:
+            assert await cache.lookup(other, "casual", trends) is None, other
+            assert (await cache.lookup(stored.lower(), "casual", trends))["caption"] == stored
+        assert await cache.lookup("vegan menu", "casual", ["Veganuary"]) is None
+        assert await cache.lookup("vegan menu", "casual", []) is None
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_and_oldest_are_replaced():
+    """Test the TTL and the ring-buffer eviction"""
+    clock = FakeClock()
+    cache = _cache(clock=clock)
+
+    async def scenario():
+        await cache.store("topic zero", "casual", [], _caption("0"))
+        clock.now += 61
+        assert await cache.lookup("topic zero", "casual") is None
+        for i in range(1, 10):
+            await cache.store(f"topic {i}", "casual", [], _caption(str(i)))
+        assert len(cache) == 8
+        assert await cache.lookup("topic 1", "casual") is None  # Overwritten by topic 9
+        assert (await cache.lookup("topic 9", "casual"))["caption"] == "9"
+
+    asyncio.run(scenario())
+
+
+def test_custom_embedding_function():
+    """Test that a model-style embedding callable can replace the vectorizer"""
+    calls = []
+
+    def embed(texts):
+        calls.append(texts)
+        return np.array([[1.0, 0.0] if "ai" in text else [0.0, 1.0] for text in texts], dtype=np.float32)
+
+    cache = _cache(embed=embed)
+
+    async def scenario():
+        await cache.store("AI", "casual", [], _caption("ai"))
+        assert (await cache.lookup("AI news", "casual"))["caption"] == "ai"
+        assert await cache.lookup("cooking", "casual") is None
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+
+def test_ai_caption_served_from_cache(monkeypatch):
+    """Test that a near-duplicate request does not call OpenAI again"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_caption, "caption_cache", _cache())
+    calls = []
+
+    async def generate(topic, trend, style, api_key, user=None, platform=None):  # pylint: disable=unused-argument
+        calls.append(topic)
+        return dict(_caption(f"About {topic}"), recommended_time="09:00", style=style)
+
+    monkeypatch.setattr(AICaptionService, "_generate_with_openai", staticmethod(generate))
+    hits_before = REGISTRY.get_sample_value("semantic_cache_requests_total", {"outcome": "hit"}) or 0
+
+    first = asyncio.run(AICaptionService.generate_caption("AI trends", ["ML"], style="casual"))
+    second = asyncio.run(AICaptionService.generate_caption("ai trend", ["ml"], style="casual", audience="b2b"))
+
+    assert calls == ["AI trends"]
+    assert second["caption"] == first["caption"] == "About AI trends"
+    assert second["cached"] is True
+    assert "recommended_day" in second  # Posting time is still computed per request
+    assert REGISTRY.get_sample_value("semantic_cache_requests_total", {"outcome": "hit"}) == hits_before + 1
+
+    # Another platform gets its own caption
+    asyncio.run(AICaptionService.generate_caption("ai trend", ["ml"], style="casual", platform="linkedin"))
+    assert calls == ["AI trends", "ai trend"]
+
+    # Free-form styles are generated but never cached
+    for _ in range(2):
+        asyncio.run(AICaptionService.generate_caption("ai trend", ["ml"], style="sarcastic pirate"))
+    assert calls == ["AI trends", "ai trend", "ai trend", "ai trend"]
+
+
+def test_ai_caption_cache_is_per_prompt_version(monkeypatch):
+    """Test that users on different prompt versions never share cached captions"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai_caption, "caption_cache", _cache())
+    monkeypatch.setattr(prompt_registry, "versions", {"ai_caption": {"v1": 0.5, "v2": 0.5}})
+    users = {prompt_registry.version_for("ai_caption", f"user{i}"): f"user{i}" for i in range(50)}
+    calls = []
+
+    async def generate(topic, trend, style, api_key, user=None, platform=None):  # pylint: disable=unused-argument
+        calls.append(user)
+        return dict(_caption(f"{prompt_registry.version_for('ai_caption', user)} caption"), style=style)
+
+    monkeypatch.setattr(AICaptionService, "_generate_with_openai", staticmethod(generate))
+
+    results = [
+        asyncio.run(AICaptionService.generate_caption("AI trends", ["ML"], style="casual", user=users[version]))
+        for version in ("v1", "v2", "v1")
+    ]
+
+    assert calls == [users["v1"], users["v2"]]
+    assert [result["caption"] for result in results] == ["v1 caption", "v2 caption", "v1 caption"]
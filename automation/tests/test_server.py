@@ -0,0 +1,63 @@
+"""
+Production server configuration tests (gunicorn with uvicorn workers)
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import runpy
+
+from app.utils import logging as app_logging
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+def test_config_from_environment(monkeypatch):
+    """Test worker count, preloading and recycling settings"""
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("GUNICORN_MAX_REQUESTS", "500")
+    monkeypatch.setenv("GUNICORN_PRELOAD_MODULES", "openai, json")
+    config = runpy.run_path(CONFIG)
+
+    assert config["workers"] == 3
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert config["preload_app"] is True
+    assert config["preload_modules"] == ["openai", "json"]
+    assert config["max_requests"] == 500
+    assert config["max_requests_jitter"] > 0
+    assert config["graceful_timeout"] < 30  # below the compose stop_grace_period
+
+
+def test_workers_default_to_cpus(monkeypatch):
+    """Test that the worker count follows the CPUs and is exported for pool sizing"""
+    monkeypatch.setenv("WEB_CONCURRENCY", "")  # unset (and restored afterwards)
+    config = runpy.run_path(CONFIG)
+
+    assert config["workers"] == config["cpu_count"]() >= 1
+    assert os.environ["WEB_CONCURRENCY"] == str(config["workers"])
+
+
+def test_logstash_listener_restarted_after_fork(monkeypatch):
+    """Test that a forked child gets a new listener and queue for Logstash records"""
+    shipped = []
+
+    class Sink(logging.Handler):
+        def emit(self, record):
+            shipped.append(record.getMessage())
+
+    parent_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(parent_queue, Sink())
+    queue_handler = logging.handlers.QueueHandler(parent_queue)
+    root = logging.getLogger()
+    monkeypatch.setattr(app_logging, "_logstash_listener", listener)
+    monkeypatch.setattr(root, "handlers", [queue_handler])
+
+    app_logging._restart_logstash_listener()  # pylint: disable=protected-access
+    try:
+        assert app_logging._logstash_listener is not listener  # pylint: disable=protected-access
+        assert queue_handler.queue is not parent_queue
+        root.warning("from the child")
+    finally:
+        app_logging._logstash_listener.stop()  # pylint: disable=protected-access
+    assert shipped == ["from the child"]
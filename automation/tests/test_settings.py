@@ -0,0 +1,159 @@
+"""
+Tests for hot-reloadable runtime settings
+"""
+import asyncio
+import json
+import sqlite3
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.database.pool import InstrumentedQueuePool, pool_settings
+from app.utils.settings import LiveCORSMiddleware, LiveSettings
+
+
+class FakeRedis:
+    """Synchronous Redis stand-in with hashes."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+def _settings(tmp_path, redis=None, **kwargs):
+    return LiveSettings(
+        path=str(tmp_path / "settings.json"),
+        redis_key="settings" if redis is not None else "",
+        client_factory=lambda: redis,
+        **kwargs
+    )
+
+
+def test_file_overrides_apply_and_revert(tmp_path, monkeypatch):
+    """Test that file overrides are applied, notify subscribers and revert to the environment"""
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+    settings = _settings(tmp_path)
+    model_changes, any_changes = [], []
+    settings.subscribe(lambda old, new: model_changes.append((old.openai_model, new.openai_model)), "openai_model")
+    settings.subscribe(lambda old, new: any_changes.append(new.log_level))
+
+    assert settings.current.openai_model == "gpt-4o"
+    assert settings.reload() == set()  # No file yet
+
+    (tmp_path / "settings.json").write_text(json.dumps({"LOG_LEVEL": "debug"}))
+    assert settings.reload() == {"log_level"}
+    assert settings.current.log_level == "DEBUG"
+    assert model_changes == [] and any_changes == ["DEBUG"]
+    assert settings.reload() == set()  # Unchanged source
+
+    (tmp_path / "settings.json").write_text(json.dumps({"OPENAI_MODEL": "gpt-4o-mini"}))
+    assert settings.reload() == {"log_level", "openai_model"}
+    assert settings.current.log_level == "INFO"
+    assert model_changes == [("gpt-4o", "gpt-4o-mini")]
+
+
+def test_invalid_overrides_are_rejected(tmp_path):
+    """Test that an invalid change keeps the current settings"""
+    settings = _settings(tmp_path)
+    before = REGISTRY.get_sample_value("settings_reloads_total", {"outcome": "invalid"}) or 0
+
+    for overrides in ({"LOG_LEVEL": "LOUD"}, {"JWT_ACCESS_TOKEN_EXPIRE_MINUTES": 0}, {"ALLOWED_ORIGINS": "*"}):
+        assert settings.apply({key.lower(): value for key, value in overrides.items()}) == set()
+
+    assert settings.current.log_level == "INFO"
+    assert settings.current.jwt_access_token_expire_minutes == 30
+    assert REGISTRY.get_sample_value("settings_reloads_total", {"outcome": "invalid"}) == before + 3
+
+
+def test_failing_subscriber_rolls_back(tmp_path):
+    """Test that a raising subscriber undoes the subscribers that already ran"""
+    settings = _settings(tmp_path)
+    applied = []
+    settings.subscribe(lambda old, new: applied.append(new.db_pool_size), "db_pool_size")
+
+    def reject(old, new):  # pylint: disable=unused-argument
+        raise RuntimeError("cannot resize")
+
+    settings.subscribe(reject, "db_pool_size")
+
+    assert settings.apply({"db_pool_size": "8"}) == set()
+    assert settings.current.db_pool_size is None
+    assert applied == [8, None]
+
+    settings.unsubscribe(reject)
+    assert settings.apply({"db_pool_size": "9"}) == {"db_pool_size"}
+    assert applied[-1] == 9
+
+
+def test_redis_overrides_win_and_source_errors_keep_settings(tmp_path):
+    """Test that the Redis hash wins over the file and read errors are tolerated"""
+    redis = FakeRedis()
+    settings = _settings(tmp_path, redis=redis)
+    (tmp_path / "settings.json").write_text(json.dumps({"OPENAI_MODEL": "from-file", "LOG_LEVEL": "WARNING"}))
+    redis.hashes["settings"] = {"OPENAI_MODEL": "from-redis"}
+
+    assert settings.reload() == {"openai_model", "log_level"}
+    assert settings.current.openai_model == "from-redis"
+
+    (tmp_path / "settings.json").write_text("[1, 2]")
+    assert settings.reload() == set()
+    assert settings.current.log_level == "WARNING"
+
+
+def test_reload_if_due_polls_once_per_interval(tmp_path):
+    """Test that Celery children poll at most once per interval"""
+    settings = _settings(tmp_path, interval=3600)
+    (tmp_path / "settings.json").write_text(json.dumps({"LOG_LEVEL": "ERROR"}))
+    assert settings.reload_if_due() == {"log_level"}
+
+    (tmp_path / "settings.json").write_text(json.dumps({"LOG_LEVEL": "DEBUG"}))
+    assert settings.reload_if_due() == set()
+    assert settings.current.log_level == "ERROR"
+    assert LiveSettings(path="", redis_key="").reload_if_due() == set()
+
+
+def test_background_poll_applies_on_the_loop(tmp_path):
+    """Test that the API poller picks up changes"""
+    settings = _settings(tmp_path, interval=0.01)
+    (tmp_path / "settings.json").write_text(json.dumps({"JWT_ACCESS_TOKEN_EXPIRE_MINUTES": "5"}))
+
+    async def run():
+        settings.start()
+        for _ in range(100):
+            if settings.current.jwt_access_token_expire_minutes == 5:
+                break
+            await asyncio.sleep(0.01)
+        await settings.stop()
+
+    asyncio.run(run())
+    assert settings.current.jwt_access_token_expire_minutes == 5
+    assert settings.snapshot()["overrides"] == {"jwt_access_token_expire_minutes": "5"}
+
+
+def test_cors_origins_follow_settings(tmp_path):
+    """Test that CORS preflights use the current origins"""
+    settings = _settings(tmp_path)
+    app = FastAPI()
+    app.add_middleware(LiveCORSMiddleware, settings=settings, allow_credentials=True, allow_methods=["GET"])
+    client = TestClient(app)
+    preflight = {"Origin": "https://new.example", "Access-Control-Request-Method": "GET"}
+
+    assert client.options("/", headers=preflight).status_code == 400
+    settings.apply({"allowed_origins": "https://new.example, https://other.example"})
+    response = client.options("/", headers=preflight)
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "https://new.example"
+
+
+def test_pool_resize_keeps_connection_settings():
+    """Test that explicit sizes win and a resized pool keeps its other settings"""
+    settings = pool_settings("api", {"DB_POOL_SIZE": "3", "CELERY_CONCURRENCY": "1"}, size=7, overflow=1)
+    assert (settings["pool_size"], settings["max_overflow"]) == (7, 1)
+
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=2, max_overflow=0, recycle=60)
+    resized = pool.resized(5, 2)
+    assert (resized.size(), resized._max_overflow, resized._recycle) == (5, 2, 60)  # pylint: disable=protected-access
+    resized.connect().close()
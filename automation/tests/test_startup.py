@@ -0,0 +1,59 @@
+"""
+Cold start tests: import time budget and lazily loaded dependencies
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds allowed for importing an entry point in a fresh interpreter
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "3.0"))
+
+# Only loaded on first use (or by the background warm-up)
+LAZY_MODULES = [
+    "openai", "sqlalchemy", "asyncpg", "httpx", "redis", "transformers", "torch",
+    "pytrends", "praw", "tweepy",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def _import(module):
+    """Import ``module`` in a fresh interpreter; return its import time and loaded heavy modules."""
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=APP_DIR,
+        env=dict(os.environ, LOGSTASH_ENABLED="false", CELERY_METRICS_PORT=""),
+        capture_output=True, text=True, check=True, timeout=60,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_is_lazy_and_within_budget():
+    """Test that importing the API loads no heavy clients and stays within the budget"""
+    result = _import("main")
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET
+
+
+def test_worker_import_is_lazy_and_within_budget():
+    """Test that importing the Celery app loads no heavy clients and stays within the budget"""
+    result = _import("tasks")
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET
+
+
+def test_health_reports_warming_subsystems(client):
+    """Test that /health answers while optional subsystems are listed separately"""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert isinstance(response.json()["subsystems"], dict)
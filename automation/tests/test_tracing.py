@@ -0,0 +1,53 @@
+"""
+Stage latency instrumentation tests
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.tracing import ENQUEUED_AT_HEADER, add_enqueue_header, queue_wait_seconds, stage
+
+
+def _stage_count(operation, stage_name, status):
+    return REGISTRY.get_sample_value(
+        "stage_duration_seconds_count",
+        {"operation": operation, "stage": stage_name, "status": status},
+    ) or 0.0
+
+
+def test_stage_records_success_and_failure():
+    """Test that stages are recorded with their outcome"""
+    before_ok = _stage_count("test_op", "step", "success")
+    before_failed = _stage_count("test_op", "step", "failed")
+
+    with stage("test_op", "step"):
+        pass
+    with pytest.raises(RuntimeError):
+        with stage("test_op", "step"):
+            raise RuntimeError("boom")
+
+    assert _stage_count("test_op", "step", "success") == before_ok + 1
+    assert _stage_count("test_op", "step", "failed") == before_failed + 1
+
+
+def test_queue_wait_from_enqueue_header():
+    """Test queue wait is measured from the publish timestamp"""
+    headers = {}
+    add_enqueue_header(headers)
+    request = SimpleNamespace(**{ENQUEUED_AT_HEADER: headers[ENQUEUED_AT_HEADER], "eta": None})
+    assert queue_wait_seconds(request, now=headers[ENQUEUED_AT_HEADER] + 2.5) == pytest.approx(2.5)
+
+
+def test_queue_wait_starts_at_eta():
+    """Test that a countdown is not counted as queue wait"""
+    eta = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    request = SimpleNamespace(**{ENQUEUED_AT_HEADER: eta.timestamp() - 60, "eta": eta.isoformat()})
+    assert queue_wait_seconds(request, now=eta.timestamp() + 1) == pytest.approx(1.0)
+
+
+def test_queue_wait_without_header():
+    """Test that messages from older producers are skipped"""
+    assert queue_wait_seconds(SimpleNamespace()) is None
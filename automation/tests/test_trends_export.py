@@ -0,0 +1,139 @@
+"""
+Streaming trends export tests
+"""
+
+import asyncio
+import csv
+import io
+import json
+import random
+import tracemalloc
+
+import pytest
+
+from app.api.routes import trends as trends_routes
+from app.services.auth_service import get_current_active_user
+from app.services.trends_export import TrendsExport
+from app.services.trends_service import TrendsService
+
+KEYWORDS = [f"keyword{i}" for i in range(23)]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Fake provider: two records per keyword, batches finishing out of order"""
+    stats = {"running": 0, "max_running": 0, "calls": 0, "fail_at": None}
+
+    async def fetch_batch(platform, keywords=None, timeframe="today 12-m"):  # pylint: disable=unused-argument
+        stats["calls"] += 1
+        if keywords and keywords[0] == stats["fail_at"]:
+            raise RuntimeError("provider down")
+        stats["running"] += 1
+        stats["max_running"] = max(stats["max_running"], stats["running"])
+        await asyncio.sleep(random.uniform(0, 0.005))
+        stats["running"] -= 1
+        trends = [{"keyword": k, "score": n} for k in keywords for n in range(2)]
+        return {"platform": platform, "trends": trends}
+
+    monkeypatch.setattr(TrendsService, "fetch_batch", fetch_batch)
+    return stats
+
+
+@pytest.fixture
+def user_client(client):
+    """Test client authenticated as a test user"""
+    client.app.dependency_overrides[get_current_active_user] = lambda: {"username": "test", "disabled": False}
+    yield client
+    client.app.dependency_overrides.clear()
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_records_in_keyword_order(user_client, provider):
+    """Test that concurrent batch fetches are written out in keyword order"""
+    response = user_client.get("/api/trends/export", params={"platform": "google", "keywords": KEYWORDS})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = _ndjson(response)
+    assert [(r["keyword"], r["score"]) for r in records] == [(k, n) for k in KEYWORDS for n in range(2)]
+    assert provider["calls"] == 5
+    assert 1 < provider["max_running"] <= 4
+
+
+@pytest.mark.parametrize("position", [0, 1, 9, 10, 27, 44])
+def test_export_resumes_from_any_cursor(user_client, provider, position):  # pylint: disable=unused-argument
+    """Test that resuming after a record returns exactly the records after it"""
+    body = {"platform": "google", "keywords": KEYWORDS}
+    full = _ndjson(user_client.post("/api/trends/export", json=body))
+    resumed = _ndjson(user_client.post("/api/trends/export", json=dict(body, cursor=full[position]["cursor"])))
+    assert resumed == full[position + 1:]
+
+
+def test_csv_export_writes_header_only_on_first_request(user_client, provider):  # pylint: disable=unused-argument
+    """Test the CSV columns and that a resumed download can be appended"""
+    params = {"platform": "google", "keywords": KEYWORDS[:4], "format": "csv"}
+    response = user_client.get("/api/trends/export", params=params)
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == ["cursor", "keyword", "score"]
+    assert len(rows) == 8
+
+    resumed = user_client.get("/api/trends/export", params=dict(params, cursor=rows[2]["cursor"]))
+    appended = list(csv.DictReader(io.StringIO(response.text.split("\n", 1)[0] + "\n" + resumed.text)))
+    assert appended == rows[3:]
+
+
+def test_export_rejects_bad_requests(user_client, provider, monkeypatch):  # pylint: disable=unused-argument
+    """Test platform, cursor and size validation happen before streaming"""
+    other = TrendsExport("google", ["other"]).cursor(0, 1)
+    assert user_client.get("/api/trends/export", params={"platform": "myspace"}).status_code == 400
+    assert user_client.get("/api/trends/export", params={"platform": "google", "cursor": "x"}).status_code == 400
+    assert user_client.get(
+        "/api/trends/export", params={"platform": "google", "keywords": ["AI"], "cursor": other}
+    ).status_code == 400
+    monkeypatch.setattr(trends_routes, "EXPORT_MAX_KEYWORDS", 3)
+    response = user_client.post("/api/trends/export", json={"platform": "google", "keywords": KEYWORDS})
+    assert response.status_code == 413
+
+
+def test_export_requires_authentication(client):
+    """Test that the export endpoint requires authentication"""
+    assert client.get("/api/trends/export", params={"platform": "google"}).status_code == 401
+
+
+def test_export_stops_at_failed_batch(provider):
+    """Test that a provider error ends the stream after the batches before it"""
+    provider["fail_at"] = KEYWORDS[10]
+    export = TrendsExport("google", KEYWORDS)
+
+    async def consume():
+        received = []
+        with pytest.raises(RuntimeError):
+            async for records in export.records():
+                received.extend(records)
+        return received
+
+    received = asyncio.run(consume())
+    assert [r["keyword"] for r in received] == [k for k in KEYWORDS[:10] for _ in range(2)]
+
+
+def test_export_memory_stays_flat(provider):  # pylint: disable=unused-argument
+    """Test that peak memory does not grow with the number of keywords"""
+
+    def peak(count):
+        export = TrendsExport("google", [f"keyword{i}" for i in range(count)])
+
+        async def consume():
+            async for _ in export.ndjson():
+                pass
+
+        tracemalloc.start()
+        asyncio.run(consume())
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_bytes
+
+    peak(100)  # Warm up imports and caches
+    assert peak(5000) < 2 * peak(500)
@@ -1,6 +1,7 @@
 """
 Upload endpoint tests
 """
+import pytest
 
 
 def test_upload_endpoint_requires_authentication(client):
@@ -30,3 +31,230 @@ def test_upload_endpoint_with_valid_data(client, headers):
     }, headers=headers)
     # May return 200 or 500 depending on actual implementation
     assert response.status_code in [200, 400, 500]
+
+
+def _as_user(app):
+    """Authenticate every request as a test user"""
+    from app.services.auth_service import get_current_active_user  # pylint: disable=import-outside-toplevel
+    app.dependency_overrides[get_current_active_user] = lambda: {"username": "test", "disabled": False}
+
+
+def test_async_upload_returns_202_with_task_handle(client, monkeypatch):
+    """Test that Prefer: respond-async enqueues the upload instead of running it"""
+    from app.services.upload_queue import UploadQueue  # pylint: disable=import-outside-toplevel
+    from app.services.upload_service import UploadService  # pylint: disable=import-outside-toplevel
+
+    queued = []
+    monkeypatch.setattr(UploadQueue, "enqueue", staticmethod(lambda **kwargs: queued.append(kwargs) or "task-1"))
+
+    async def fail_inline(**kwargs):
+        raise AssertionError("uploaded inline")
+
+    monkeypatch.setattr(UploadService, "upload_to_platform", staticmethod(fail_inline))
+    _as_user(client.app)
+    try:
+        response = client.post("/api/upload", json={
+            "platform": "instagram",
+            "content": "Queued post",
+            "scheduled_post_id": 7,
+            "callback_url": "http://backend/api/upload/callback",
+        }, headers={"Prefer": "respond-async"})
+        invalid = client.post("/api/upload", json={
+            "platform": "myspace", "content": "x",
+        }, headers={"Prefer": "respond-async"})
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert response.status_code == 202
+    assert response.headers["Location"] == "/api/upload/task-1"
+    assert response.json()["data"]["task_id"] == "task-1"
+    assert queued[0]["scheduled_post_id"] == 7
+    assert queued[0]["callback_url"] == "http://backend/api/upload/callback"
+    assert invalid.status_code == 400
+    assert len(queued) == 1
+
+
+def test_upload_status_reports_task_state(client, monkeypatch):
+    """Test that the status endpoint maps Celery states and returns the result"""
+    from celery import Celery  # pylint: disable=import-outside-toplevel
+    from app.services import upload_queue  # pylint: disable=import-outside-toplevel
+
+    celery_app = Celery("test", broker="memory://", backend="cache+memory://")
+    monkeypatch.setattr(upload_queue, "_celery_app", lambda: celery_app)
+    celery_app.backend.store_result("done", {"status": "posted", "post_url": "https://x"}, "SUCCESS")
+    celery_app.backend.store_result("busy", None, "STARTED")
+
+    _as_user(client.app)
+    try:
+        done = client.get("/api/upload/done").json()["data"]
+        busy = client.get("/api/upload/busy").json()["data"]
+        unknown = client.get("/api/upload/unknown").json()["data"]
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert done["status"] == "succeeded"
+    assert done["result"]["post_url"] == "https://x"
+    assert busy["status"] == "running"
+    assert unknown["status"] == "queued"
+
+
+def test_bulk_upload_queues_items_in_one_call(client, monkeypatch):
+    """Test that bulk uploads are enqueued together with per-item handles"""
+    from app.services.upload_queue import UploadQueue  # pylint: disable=import-outside-toplevel
+
+    calls = []
+
+    def enqueue_many(uploads):
+        calls.append(uploads)
+        return [f"task-{i}" for i in range(len(uploads))]
+
+    monkeypatch.setattr(UploadQueue, "enqueue_many", staticmethod(enqueue_many))
+    _as_user(client.app)
+    try:
+        response = client.post("/api/upload/bulk", json=[
+            {"platform": "instagram", "content": "one", "scheduled_post_id": 1},
+            {"platform": "myspace", "content": "two", "scheduled_post_id": 2},
+            {"platform": "linkedin", "content": "three", "scheduled_post_id": 3},
+        ])
+        empty = client.post("/api/upload/bulk", json=[])
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert response.status_code == 202
+    assert len(calls) == 1
+    assert [u["scheduled_post_id"] for u in calls[0]] == [1, 3]
+    items = response.json()["data"]
+    assert [(i["index"], i["status"], i.get("task_id")) for i in items] == [
+        (0, "queued", "task-0"),
+        (1, "rejected", None),
+        (2, "queued", "task-1"),
+    ]
+    assert empty.status_code == 422
+
+
+def test_bulk_task_fans_out_with_preassigned_ids(monkeypatch):
+    """Test that the worker publishes one auto_upload per item under the returned IDs"""
+    import tasks  # pylint: disable=import-outside-toplevel
+
+    published = []
+    monkeypatch.setattr(tasks.celery_app.conf, "broker_url", "memory://")
+    monkeypatch.setattr(
+        tasks.auto_upload, "apply_async",
+        lambda kwargs, task_id, **options: published.append((task_id, kwargs["scheduled_post_id"]))
+    )
+    tasks.auto_upload_bulk.run([
+        {"platform": "instagram", "content": "a", "scheduled_post_id": 1, "task_id": "t1"},
+        {"platform": "linkedin", "content": "b", "scheduled_post_id": 2, "task_id": "t2"},
+    ])
+    assert published == [("t1", 1), ("t2", 2)]
+
+
+def test_bulk_task_retries_only_unpublished_items(monkeypatch):
+    """Test that a failed fan-out is retried without republishing the items already queued"""
+    import tasks  # pylint: disable=import-outside-toplevel
+    from celery.exceptions import Retry  # pylint: disable=import-outside-toplevel
+
+    published, retried = [], []
+
+    def apply_async(kwargs, task_id, **options):  # pylint: disable=unused-argument
+        if task_id == "t2" and not retried:
+            raise ConnectionError("broker went away")
+        published.append(task_id)
+
+    def retry(exc, kwargs, countdown):  # pylint: disable=unused-argument
+        retried.append(kwargs["uploads"])
+        return Retry(exc=exc)
+
+    monkeypatch.setattr(tasks.celery_app.conf, "broker_url", "memory://")
+    monkeypatch.setattr(tasks.auto_upload, "apply_async", apply_async)
+    monkeypatch.setattr(tasks.auto_upload_bulk, "retry", retry)
+    uploads = [
+        {"platform": "instagram", "content": c, "scheduled_post_id": i, "task_id": f"t{i}"}
+        for i, c in enumerate("abc", start=1)
+    ]
+
+    with pytest.raises(Retry):
+        tasks.auto_upload_bulk.run(uploads)
+    assert tasks.auto_upload_bulk.acks_late
+    assert [item["task_id"] for item in retried[0]] == ["t2", "t3"]
+
+    tasks.auto_upload_bulk.run(retried[0])
+    assert published == ["t1", "t2", "t3"]
+
+
+def test_duplicate_upload_waits_without_failing(monkeypatch):
+    """Test that a duplicate still in progress is retried without using up retries or reporting failure"""
+    import tasks  # pylint: disable=import-outside-toplevel
+    from celery.exceptions import Retry  # pylint: disable=import-outside-toplevel
+    from app.services.idempotency import UploadInProgressError  # pylint: disable=import-outside-toplevel
+    from app.services.upload_service import UploadService  # pylint: disable=import-outside-toplevel
+
+    retries, callbacks = [], []
+    error = UploadInProgressError("Upload is already in progress")
+
+    async def upload_to_platform(**kwargs):  # pylint: disable=unused-argument
+        raise error
+
+    def retry(exc, countdown, max_retries, kwargs=None):  # pylint: disable=unused-argument
+        retries.append((kwargs, max_retries))
+        return Retry(exc=exc)
+
+    monkeypatch.setattr(UploadService, "upload_to_platform", upload_to_platform)
+    monkeypatch.setattr(tasks.auto_upload, "retry", retry)
+    monkeypatch.setattr(tasks, "_post_callback", lambda url, payload: callbacks.append(payload))
+    upload = {"scheduled_post_id": 7, "platform": "instagram", "content": "a", "callback_url": "http://backend/cb"}
+
+    # Past max_retries, a duplicate keeps waiting for the first attempt
+    tasks.auto_upload.push_request(retries=5, kwargs=dict(upload, duplicate_waits=5))
+    try:
+        with pytest.raises(Retry):
+            tasks.auto_upload.run(**upload, duplicate_waits=5)
+    finally:
+        tasks.auto_upload.pop_request()
+    assert retries == [(dict(upload, duplicate_waits=6), None)]
+
+    # Once the first attempt's claim is gone, real failures get the usual retries
+    error = ConnectionError("platform down")
+    tasks.auto_upload.push_request(retries=6, kwargs=dict(upload, duplicate_waits=6))
+    try:
+        with pytest.raises(Retry):
+            tasks.auto_upload.run(**upload, duplicate_waits=6)
+    finally:
+        tasks.auto_upload.pop_request()
+    assert retries[1] == (None, tasks.auto_upload.max_retries + 6)
+    assert not callbacks
+
+
+def test_engagement_report_feeds_posting_times(client, monkeypatch):
+    """Test that reported engagement is recorded in the post's UTC slot"""
+    from app.api.routes import upload  # pylint: disable=import-outside-toplevel
+    from app.services.posting_time import PostingTimeRecommender  # pylint: disable=import-outside-toplevel
+
+    recommender = PostingTimeRecommender(enabled=False)
+    monkeypatch.setattr(upload, "posting_time_recommender", recommender)
+    _as_user(client.app)
+    try:
+        reports = [
+            client.post("/api/upload/engagement", json={
+                "platform": "Instagram", "posted_at": "2024-01-04T17:00:00+02:00", "engagement": 900,
+            })
+            for _ in range(5)
+        ]
+        unsupported = client.post("/api/upload/engagement", json={
+            "platform": "myspace", "posted_at": "2024-01-04T15:00:00", "engagement": 1,
+        })
+    finally:
+        client.app.dependency_overrides.clear()
+
+    assert [r.status_code for r in reports] == [200] * 5
+    assert unsupported.status_code == 400
+    assert recommender.best_slot("instagram") == {"recommended_day": "Thursday", "recommended_time": "03:00 PM"}
+
+
+def test_default_worker_consumes_uploads_queue():
+    """Test that a worker started without -Q still consumes queued uploads"""
+    import tasks  # pylint: disable=import-outside-toplevel
+
+    queues = set(tasks.celery_app.amqp.queues)
+    assert {"celery", "uploads"} <= queues
+    assert tasks.celery_app.amqp.router.route({}, "tasks.auto_upload")["queue"].name in queues